@@ -0,0 +1,291 @@
+"""Benchmark de los endpoints más usados sobre una base sembrada.
+
+Uso:
+    python -m benchmarks.endpoints --reservations 100000 --iterations 200 \
+        --output benchmarks/results/base.json
+    python -m benchmarks.endpoints --server --concurrency 8
+    python -m benchmarks.endpoints --compare antes.json despues.json
+
+Por defecto usa el test client de Flask (sin red). Con --server levanta un
+servidor WSGI multihilo de Werkzeug y lo ataca con varios clientes HTTP.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.seed import load_payload_builders, seed_database, slot_for_index  # noqa: E402
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(name, latencies, elapsed, errors):
+    ordered = sorted(latencies)
+    to_ms = 1000.0
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50) * to_ms, 3) if ordered else None,
+        "p95_ms": round(percentile(ordered, 0.95) * to_ms, 3) if ordered else None,
+        "p99_ms": round(percentile(ordered, 0.99) * to_ms, 3) if ordered else None,
+        "max_ms": round(ordered[-1] * to_ms, 3) if ordered else None,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers or {})
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpTransport:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        connection = self._connection()
+        try:
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            raw = response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self._local.connection = None
+            raise
+        try:
+            data = json.loads(raw) if raw else None
+        except ValueError:
+            data = None
+        return response.status, data
+
+
+def run_scenario(name, transport, build_request, iterations, concurrency, expected_status):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(iterations))
+
+    def worker():
+        local_latencies = []
+        local_errors = 0
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            method, path, body, headers = build_request(index)
+            started = time.perf_counter()
+            try:
+                status, _data = transport.request(method, path, body, headers)
+            except Exception:
+                status = None
+            local_latencies.append(time.perf_counter() - started)
+            if status not in expected_status:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(name, latencies, time.perf_counter() - started, errors[0])
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def build_scenarios(transport, seeded, reservation_offset):
+    builders = load_payload_builders()
+
+    admin_payload = builders._admin_payload()
+    transport.request("POST", "/api/auth/register-admin", admin_payload)
+    _status, admin_login = transport.request("POST", "/api/auth/login-admin", {
+        "correo": admin_payload["correo"],
+        "contrasena": admin_payload["contrasena"],
+    })
+    admin_headers = _bearer(admin_login["token"])
+
+    correo = seeded["users"][0]
+    _status, user_login = transport.request("POST", "/api/auth/login", {
+        "correo": correo,
+        "contrasena": seeded["password"],
+    })
+    user_headers = _bearer(user_login["token"])
+
+    def login(index):
+        user = seeded["users"][index % len(seeded["users"])]
+        return "POST", "/api/auth/login", {"correo": user, "contrasena": seeded["password"]}, None
+
+    def create_reservation(index):
+        laboratorio, fecha, horario = slot_for_index(reservation_offset + index)
+        payload = builders._reservation_payload(correo)
+        payload.update({
+            "laboratorio": laboratorio,
+            "fecha_prestamo": f"{fecha.day}/{fecha.month}/{fecha.year}",
+            "horario_uso": horario,
+        })
+        return "POST", "/api/auth/laboratory", payload, user_headers
+
+    return [
+        ("login", login, (200,)),
+        ("create_reservation", create_reservation, (201,)),
+        ("admin_list_users", lambda _i: ("GET", "/api/admin/users", None, admin_headers), (200,)),
+        ("admin_list_laboratories", lambda _i: ("GET", "/api/admin/laboratories", None, admin_headers), (200,)),
+        ("reservations_dump", lambda _i: ("GET", "/api/auth/laboratory/reservations", None, user_headers), (200,)),
+        ("availability_window", lambda _i: (
+            "GET", "/api/auth/laboratory/availability?desde=1/1/2020&hasta=31/3/2020", None, user_headers,
+        ), (200,)),
+        ("admin_stats_semester", lambda _i: (
+            "GET", "/api/admin/laboratories/stats?desde=1/1/2020&hasta=29/6/2020", None, admin_headers,
+        ), (200,)),
+        ("free_slots_semester", lambda _i: (
+            "GET", "/api/auth/laboratory/free-slots?desde=1/1/2020&hasta=29/6/2020&duracion=120&limite=100",
+            None, user_headers,
+        ), (200,)),
+    ]
+
+
+def run_benchmarks(args):
+    temp_dir = tempfile.mkdtemp(prefix="bench-endpoints-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(temp_dir, 'bench.db')}"
+    # Las peticiones del benchmark no deben mezclarse con logs/transactions.log.
+    os.environ.setdefault("TRANSACTION_LOG_PATH", os.path.join(temp_dir, "transactions.log"))
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-with-32-bytes!")
+    # Todas las peticiones salen de la misma IP; el limitador las rechazaría.
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+    from server import create_app
+
+    app = create_app()
+    with app.app_context():
+        seeded = seed_database(args.users, args.reservations)
+
+    server = None
+    if args.server:
+        from werkzeug.serving import make_server
+
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        transport = HttpTransport("127.0.0.1", server.server_port)
+    else:
+        transport = TestClientTransport(app)
+
+    results = []
+    try:
+        for name, build_request, expected in build_scenarios(transport, seeded, args.reservations):
+            if args.scenarios and name not in args.scenarios:
+                continue
+            iterations = args.login_iterations if name == "login" else args.iterations
+            result = run_scenario(name, transport, build_request, iterations, args.concurrency, expected)
+            results.append(result)
+            print(
+                f"{name:>24}: p50 {result['p50_ms']} ms | p95 {result['p95_ms']} ms | "
+                f"p99 {result['p99_ms']} ms | {result['throughput_rps']} req/s | errores {result['errors']}"
+            )
+    finally:
+        if server is not None:
+            server.shutdown()
+        with app.app_context():
+            from database import db
+
+            db.session.remove()
+            db.engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "mode": "server" if args.server else "test_client",
+        "concurrency": args.concurrency,
+        "dataset": {
+            "users": seeded["users_seeded"],
+            "reservations": seeded["reservations_seeded"],
+            "seed_seconds": seeded["users_seconds"] + seeded["reservations_seconds"],
+        },
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as stream:
+            json.dump(report, stream, indent=2)
+    return report
+
+
+def compare_reports(before_path, after_path):
+    with open(before_path, encoding="utf-8") as stream:
+        before = {item["scenario"]: item for item in json.load(stream)["results"]}
+    with open(after_path, encoding="utf-8") as stream:
+        after = {item["scenario"]: item for item in json.load(stream)["results"]}
+
+    for scenario in sorted(set(before) & set(after)):
+        old, new = before[scenario], after[scenario]
+        deltas = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if old.get(key) and new.get(key) is not None:
+                deltas.append(f"{key} {old[key]} -> {new[key]} ({(new[key] - old[key]) / old[key] * 100:+.1f}%)")
+        print(f"{scenario:>24}: " + " | ".join(deltas))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de endpoints con datos sintéticos.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--reservations", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--login-iterations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--server", action="store_true", help="Usa un servidor WSGI multihilo real")
+    parser.add_argument("--scenarios", nargs="*", help="Limita la corrida a estos escenarios")
+    parser.add_argument("--output", help="Ruta del JSON de resultados")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"), help="Compara dos JSON guardados")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return None
+    return run_benchmarks(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Sembrado masivo de datos sintéticos para benchmarks.
+
+Uso:
+    python -m benchmarks.seed --users 1000 --reservations 100000
+    python -m benchmarks.seed --database /tmp/carga.db
+
+Sin --database siembra un archivo temporal nuevo e imprime su ruta. Sembrar
+database/app.db requiere además --allow-app-db.
+
+Reutiliza los constructores de payload de test/test_endpoints.py y los pasa por
+el mismo validador que la API, de modo que las filas sembradas son las que la
+aplicación habría aceptado. Correo y cédula se numeran por fila
+(seed<n>@est.ups.edu.ec) para admitir millones de usuarios únicos.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from sqlalchemy import func, insert  # noqa: E402
+
+from config.options import LABORATORIO_OPTIONS  # noqa: E402
+
+SEED_START_DATE = date(2020, 1, 1)
+SLOT_HOURS = tuple(range(7, 21))
+INSERT_CHUNK_SIZE = 5000
+APP_DATABASE_PATH = os.path.join(ROOT_DIR, "database", "app.db")
+
+
+def load_payload_builders():
+    # "test" choca con el paquete estándar homónimo; se carga el archivo directamente.
+    path = os.path.join(ROOT_DIR, "test", "test_endpoints.py")
+    spec = importlib.util.spec_from_file_location("_bench_test_endpoints", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def slot_for_index(index):
+    # Recorre (laboratorio, hora, día) de forma que cada índice sea un horario único.
+    labs = list(LABORATORIO_OPTIONS.values())
+    per_day = len(labs) * len(SLOT_HOURS)
+    day, offset = divmod(index, per_day)
+    lab_index, hour_index = divmod(offset, len(SLOT_HOURS))
+    fecha = SEED_START_DATE + timedelta(days=day)
+    hour = SLOT_HOURS[hour_index]
+    return labs[lab_index], fecha, f"{hour:02d}:00 - {hour + 1:02d}:00"
+
+
+def iter_user_rows(count, password_hash, start_index=0):
+    # _user_payload() solo tiene 6 caracteres hexadecimales de unicidad y choca
+    # con UNIQUE(correo) a partir de unos miles de filas; correo y cédula se
+    # derivan del índice de la fila.
+    payload = load_payload_builders()._user_payload()
+    for index in range(start_index, start_index + count):
+        yield {
+            "nombre": payload["nombre"],
+            "apellido": payload["apellido"],
+            "correo": f"seed{index}@est.ups.edu.ec",
+            "password_hash": password_hash,
+            "cedula": f"{index % 10_000_000_000:010d}",
+            "carrera": payload["carrera"],
+        }
+
+
+def iter_reservation_rows(count, users, start_index=0):
+    from controllers.reservation_validator import RESERVATION_VALIDATOR
+
+    builders = load_payload_builders()
+    for offset in range(count):
+        user_id, correo = users[offset % len(users)]
+        laboratorio, fecha, horario = slot_for_index(start_index + offset)
+        payload = builders._reservation_payload(correo)
+        payload.update({
+            "laboratorio": laboratorio,
+            "fecha_prestamo": f"{fecha.day}/{fecha.month}/{fecha.year}",
+            "horario_uso": horario,
+        })
+        values, errors = RESERVATION_VALIDATOR.validate(payload)
+        if errors:
+            raise ValueError(f"Payload de semilla inválido: {errors}")
+        values["user_id"] = user_id
+        yield values
+
+
+def _insert_in_chunks(connection, table, rows):
+    total = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= INSERT_CHUNK_SIZE:
+            connection.execute(insert(table), chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        connection.execute(insert(table), chunk)
+        total += len(chunk)
+    return total
+
+
+def seed_database(users=1000, reservations=10000, password="Passw0rd1"):
+    # Debe llamarse dentro de un app_context. Devuelve las credenciales de los
+    # usuarios sembrados (todas comparten la contraseña) y los tiempos.
+    if users < 1:
+        raise ValueError("Se necesita al menos un usuario para asignar las reservas")
+    from config.hashing import get_password_hasher
+    from database import db
+    from database.models import LaboratoryRequest, User
+    from database.occupancy import rebuild_occupancy
+
+    password_hash = get_password_hasher().hash(password)
+    started = time.perf_counter()
+
+    # Continúa la numeración si la base ya fue sembrada antes.
+    first_index = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    with db.engine.begin() as connection:
+        _insert_in_chunks(connection, User.__table__, iter_user_rows(users, password_hash, first_index))
+    seeded_users = db.session.query(User.id, User.correo).order_by(User.id.desc()).limit(users).all()
+
+    users_elapsed = time.perf_counter() - started
+    existing = db.session.query(LaboratoryRequest.id).count()
+
+    with db.engine.begin() as connection:
+        inserted = _insert_in_chunks(
+            connection,
+            LaboratoryRequest.__table__,
+            iter_reservation_rows(reservations, seeded_users, start_index=existing),
+        )
+    # Los INSERT de Core no pasan por el flush del ORM que mantiene los bitmaps.
+    rebuild_occupancy()
+
+    return {
+        "users": [correo for _user_id, correo in seeded_users],
+        "password": password,
+        "users_seeded": len(seeded_users),
+        "reservations_seeded": inserted,
+        "users_seconds": round(users_elapsed, 3),
+        "reservations_seconds": round(time.perf_counter() - started - users_elapsed, 3),
+    }
+
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("debe ser al menos 1")
+    return number
+
+
+def _non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError("no puede ser negativo")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Siembra usuarios y reservas sintéticas.")
+    parser.add_argument("--users", type=_positive_int, default=1000)
+    parser.add_argument("--reservations", type=_non_negative_int, default=10000)
+    parser.add_argument("--database", help="Archivo SQLite a sembrar (por defecto, uno temporal nuevo)")
+    parser.add_argument(
+        "--allow-app-db",
+        action="store_true",
+        help="Permite sembrar database/app.db, la base versionada de la aplicación",
+    )
+    args = parser.parse_args(argv)
+
+    if args.database:
+        database_path = os.path.abspath(args.database)
+    else:
+        database_path = os.path.join(tempfile.mkdtemp(prefix="bench-seed-"), "seed.db")
+    if os.path.realpath(database_path) == os.path.realpath(APP_DATABASE_PATH) and not args.allow_app_db:
+        parser.error("--database apunta a database/app.db; agregue --allow-app-db para sembrarla")
+    os.environ["DATABASE_URL"] = f"sqlite:///{database_path}"
+
+    from server import create_app
+
+    app = create_app()
+    with app.app_context():
+        summary = seed_database(args.users, args.reservations)
+    summary.pop("users")
+    summary["database"] = database_path
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Benchmark de serialización de listados: ORM + to_dict() frente a columnas.
+
+Uso:
+    python -m benchmarks.serialization --rows 100000 --repeat 3
+
+Siembra una base temporal y mide, para todas las reservas, el camino anterior
+(LaboratoryRequest.query, to_dict() y el encoder JSON de Flask) y el actual
+(consulta de columnas y RESERVATION_SERIALIZER). Antes de medir comprueba que
+ambos producen el mismo JSON.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _timed(function, repeat):
+    # Devuelve la mediana de (consulta, serialización) en segundos.
+    query_times, encode_times = [], []
+    for _ in range(repeat):
+        query_seconds, encode_seconds = function()
+        query_times.append(query_seconds)
+        encode_times.append(encode_seconds)
+    return statistics.median(query_times), statistics.median(encode_times)
+
+
+def run(rows=100000, users=1000, repeat=3):
+    temp_dir = tempfile.mkdtemp(prefix="bench-serialization-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(temp_dir, 'bench.db')}"
+
+    from benchmarks.seed import seed_database
+    from controllers.serialization import RESERVATION_SERIALIZER
+    from database import db
+    from database.models import LaboratoryRequest
+    from server import create_app
+
+    app = create_app()
+    try:
+        with app.app_context():
+            seed_database(users=users, reservations=rows)
+
+            def orm_path():
+                db.session.expunge_all()
+                started = time.perf_counter()
+                records = LaboratoryRequest.query.order_by(LaboratoryRequest.id.asc()).all()
+                queried = time.perf_counter()
+                body = app.json.dumps([record.to_dict() for record in records])
+                return queried - started, time.perf_counter() - queried, body
+
+            def column_path():
+                started = time.perf_counter()
+                records = (
+                    db.session.query(*RESERVATION_SERIALIZER.columns)
+                    .order_by(LaboratoryRequest.id.asc())
+                    .all()
+                )
+                queried = time.perf_counter()
+                body = RESERVATION_SERIALIZER.encode_rows(records)
+                return queried - started, time.perf_counter() - queried, body
+
+            if json.loads(orm_path()[2]) != json.loads(column_path()[2]):
+                raise SystemExit("Los dos caminos producen JSON distinto")
+
+            orm = _timed(lambda: orm_path()[:2], repeat)
+            columns = _timed(lambda: column_path()[:2], repeat)
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def summary(name, timings):
+        query_seconds, encode_seconds = timings
+        return {
+            "path": name,
+            "query_s": round(query_seconds, 3),
+            "encode_s": round(encode_seconds, 3),
+            "total_s": round(query_seconds + encode_seconds, 3),
+        }
+
+    results = [summary("orm_to_dict", orm), summary("columnas", columns)]
+    return {"rows": rows, "repeat": repeat, "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Ruta opcional para guardar los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args.rows, args.users, args.repeat)
+    baseline = report["results"][0]["total_s"]
+    for result in report["results"]:
+        speedup = baseline / result["total_s"] if result["total_s"] else None
+        print(
+            f"{result['path']:>12}: consulta {result['query_s']:.3f} s, "
+            f"serialización {result['encode_s']:.3f} s, total {result['total_s']:.3f} s"
+            + (f" (x{speedup:.1f})" if speedup else "")
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as stream:
+            json.dump(report, stream, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
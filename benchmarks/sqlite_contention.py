@@ -0,0 +1,166 @@
+"""Benchmark de contención de escrituras SQLite por perfil de motor.
+
+Uso:
+    python -m benchmarks.sqlite_contention --threads 8 --writes 200 --readers 4
+
+Cada hilo escritor repite el patrón de create_laboratory_request (INSERT,
+búsqueda de solapamientos y commit) contra una base temporal nueva por perfil,
+mientras los lectores consultan el listado de reservas.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def _run_profile(profile_name, threads, writes, readers):
+    temp_dir = tempfile.mkdtemp(prefix=f"bench-{profile_name}-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(temp_dir, 'bench.db')}"
+    os.environ["SQLITE_PROFILE"] = profile_name
+
+    from server import create_app
+    from database import db
+    from database.models import LaboratoryRequest, User
+    from database.schedule import find_overlapping_request
+
+    app = create_app()
+    with app.app_context():
+        user = User(
+            nombre="Bench",
+            apellido="User",
+            correo="bench@est.ups.edu.ec",
+            password_hash="x",
+            cedula="0100000000",
+            carrera="Computacion",
+        )
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    counters = {"commits": 0, "locked": 0, "conflicts": 0, "reads": 0}
+    counters_lock = threading.Lock()
+    stop_readers = threading.Event()
+
+    def bump(key):
+        with counters_lock:
+            counters[key] += 1
+
+    def writer(worker_index):
+        with app.app_context():
+            for iteration in range(writes):
+                # Slots disjuntos por hilo: solo se mide contención de bloqueo.
+                slot = worker_index * writes + iteration
+                start = 8 * 60 + (slot % 12) * 60
+                record = LaboratoryRequest(
+                    user_id=user_id,
+                    correo_institucional="bench@est.ups.edu.ec",
+                    nombres_completos="Bench",
+                    cargo="Estudiante",
+                    carrera="Computacion",
+                    nivel="7mo",
+                    discapacidad="NO",
+                    materia_motivo="Benchmark",
+                    numero_estudiantes=5,
+                    fecha_prestamo=date(2026, 1, 1) + timedelta(days=slot // 12),
+                    horario_uso=f"{start // 60:02d}:00 - {start // 60 + 1:02d}:00",
+                    inicio_minutos=start,
+                    fin_minutos=start + 60,
+                    descripcion_actividades="Carga concurrente",
+                    laboratorio="Laboratorio Networking 1",
+                    equipo="Ninguno",
+                )
+                try:
+                    db.session.add(record)
+                    db.session.flush()
+                    if find_overlapping_request(
+                        record.laboratorio, record.fecha_prestamo, start, start + 60, exclude_id=record.id
+                    ):
+                        db.session.rollback()
+                        bump("conflicts")
+                        continue
+                    db.session.commit()
+                    bump("commits")
+                except OperationalError:
+                    db.session.rollback()
+                    bump("locked")
+            db.session.remove()
+
+    def reader():
+        with app.app_context():
+            while not stop_readers.is_set():
+                try:
+                    LaboratoryRequest.query.order_by(LaboratoryRequest.created_at.desc()).limit(50).all()
+                    bump("reads")
+                except OperationalError:
+                    db.session.rollback()
+                    bump("locked")
+                finally:
+                    db.session.remove()
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(index,)) for index in range(threads)]
+
+    started = time.perf_counter()
+    for thread in reader_threads + writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop_readers.set()
+    for thread in reader_threads:
+        thread.join()
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+    return {
+        "profile": profile_name,
+        "threads": threads,
+        "writes_per_thread": writes,
+        "readers": readers,
+        "elapsed_s": round(elapsed, 3),
+        "commits": counters["commits"],
+        "locked_errors": counters["locked"],
+        "conflicts": counters["conflicts"],
+        "reads": counters["reads"],
+        "commits_per_s": round(counters["commits"] / elapsed, 1) if elapsed else None,
+        "reads_per_s": round(counters["reads"] / elapsed, 1) if elapsed else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", default=["legacy", "production"])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--output", help="Ruta opcional para guardar los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    results = [_run_profile(name, args.threads, args.writes, args.readers) for name in args.profiles]
+    for result in results:
+        print(
+            f"{result['profile']:>10}: {result['commits_per_s']:>8} commits/s, "
+            f"{result['reads_per_s']:>8} lecturas/s, {result['locked_errors']} errores 'database is locked'"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as stream:
+            json.dump(results, stream, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
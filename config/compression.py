@@ -0,0 +1,98 @@
+import os
+import zlib
+from typing import Iterable, Iterator
+
+from config.options import COMPRESSION_LEVEL, COMPRESSION_MIN_BYTES
+
+# Content-Encoding -> wbits de zlib: 31 produce el formato gzip y 15 el
+# formato zlib, que es lo que HTTP llama "deflate".
+ENCODINGS = {"gzip": 31, "deflate": 15}
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/x-ndjson")
+
+
+def _compressor(encoding: str, level: int):
+    return zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+
+
+def compress_body(data: bytes, encoding: str, level: int) -> bytes:
+    compressor = _compressor(encoding, level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, level: int, source=None) -> Iterator[bytes]:
+    # Cada bloque del generador sale comprimido con Z_SYNC_FLUSH, así el cliente
+    # puede ir procesando la exportación sin esperar al final. `source` es el
+    # iterable original, que se cierra aunque el cliente corte la descarga.
+    compressor = _compressor(encoding, level)
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+
+
+def _is_compressible(response) -> bool:
+    mimetype = response.mimetype or ""
+    return mimetype in COMPRESSIBLE_MIMETYPES or mimetype.startswith("text/")
+
+
+def _weaken_etag(response) -> None:
+    # El cuerpo comprimido ya no es idéntico byte a byte al original.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def compress_response(response, request, level: int, min_bytes: int):
+    if (
+        not request.path.startswith("/api/")
+        or request.method == "HEAD"
+        or not 200 <= response.status_code < 300
+        or response.status_code in (204, 206)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or not _is_compressible(response)
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(tuple(ENCODINGS))
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        # El tamaño no se conoce de antemano: los streams siempre se comprimen.
+        source = response.response
+        response.response = compress_stream(response.iter_encoded(), encoding, level, source)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        response.set_data(compress_body(data, encoding, level))
+
+    response.headers["Content-Encoding"] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def init_compression(app) -> None:
+    if os.environ.get("COMPRESSION_ENABLED", "1").lower() in ("0", "false", "no"):
+        return
+    level = int(os.environ.get("COMPRESSION_LEVEL", COMPRESSION_LEVEL))
+    if not 1 <= level <= 9:
+        raise ValueError(f"COMPRESSION_LEVEL debe estar entre 1 y 9: {level}")
+    app.config.setdefault("COMPRESSION_LEVEL", level)
+    app.config.setdefault("COMPRESSION_MIN_BYTES", int(os.environ.get("COMPRESSION_MIN_BYTES", COMPRESSION_MIN_BYTES)))
+
+    @app.after_request
+    def _compress_response(response):
+        from flask import request
+
+        return compress_response(
+            response, request, app.config["COMPRESSION_LEVEL"], app.config["COMPRESSION_MIN_BYTES"]
+        )
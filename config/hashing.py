@@ -0,0 +1,172 @@
+import argparse
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import bcrypt as _bcrypt
+
+from config.metrics import record_password_hash
+
+DEFAULT_ROUNDS = 10
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+DEFAULT_TARGET_MS = 250.0
+
+
+class HashingBusyError(RuntimeError):
+    pass
+
+
+def _hash_password(password: bytes, rounds: int) -> str:
+    return _bcrypt.hashpw(password, _bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def _check_password(password_hash: bytes, password: bytes) -> bool:
+    try:
+        return _bcrypt.checkpw(password, password_hash)
+    except ValueError:
+        return False
+
+
+def hash_rounds(password_hash: str) -> Optional[int]:
+    # Formato modular de bcrypt: $2b$<cost>$<salt+hash>
+    try:
+        return int(password_hash.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def calibrate_rounds(
+    target_ms: float = DEFAULT_TARGET_MS,
+    min_rounds: int = MIN_ROUNDS,
+    max_rounds: int = MAX_ROUNDS,
+    samples: int = 3,
+) -> int:
+    # Cada ronda adicional duplica el costo, así que basta medir min_rounds y
+    # extrapolar; se elige el costo más alto que no supere target_ms.
+    password = b"calibracion1"
+    timings = []
+    for _ in range(max(1, samples)):
+        started = time.perf_counter()
+        _hash_password(password, min_rounds)
+        timings.append((time.perf_counter() - started) * 1000)
+    base_ms = sorted(timings)[len(timings) // 2]
+
+    rounds = min_rounds
+    while rounds < max_rounds and base_ms * (2 ** (rounds + 1 - min_rounds)) <= target_ms:
+        rounds += 1
+    return rounds
+
+
+class PasswordHasher:
+    # Ejecuta bcrypt en un pool de procesos acotado. max_pending limita cuántas
+    # operaciones pueden esperar a la vez; si no hay cupo en queue_timeout se
+    # lanza HashingBusyError en lugar de acumular trabajo sin límite.
+    def __init__(
+        self,
+        rounds: int = DEFAULT_ROUNDS,
+        workers: int = 2,
+        max_pending: int = 32,
+        queue_timeout: float = 2.0,
+    ) -> None:
+        self.rounds = rounds
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def hash(self, password: str) -> str:
+        return self._run("hash", _hash_password, password.encode("utf-8"), self.rounds)
+
+    def check(self, password_hash: str, password: str) -> bool:
+        return self._run("check", _check_password, password_hash.encode("utf-8"), password.encode("utf-8"))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return hash_rounds(password_hash) != self.rounds
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def reset_after_fork(self) -> None:
+        # El pool de procesos del padre no es utilizable desde el hijo; se crea
+        # uno nuevo con la primera operación.
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, self.max_pending))
+
+    def _run(self, operation, func, *args):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusyError("Demasiadas operaciones de contraseña en curso")
+        try:
+            if self.workers <= 0:
+                return func(*args)
+            return self._get_executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+            record_password_hash(operation, time.perf_counter() - started)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # spawn evita heredar hilos (p. ej. el escritor del log) al hacer fork.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+
+def _configured_rounds() -> int:
+    raw = os.environ.get("PASSWORD_HASH_ROUNDS", str(DEFAULT_ROUNDS)).strip().lower()
+    if raw == "auto":
+        return calibrate_rounds(float(os.environ.get("PASSWORD_HASH_TARGET_MS", DEFAULT_TARGET_MS)))
+    return int(raw)
+
+
+_password_hasher: Optional[PasswordHasher] = None
+_password_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _password_hasher
+    if _password_hasher is None:
+        with _password_hasher_lock:
+            if _password_hasher is None:
+                _password_hasher = PasswordHasher(
+                    rounds=_configured_rounds(),
+                    workers=int(os.environ.get("PASSWORD_HASH_WORKERS", "2")),
+                    max_pending=int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "32")),
+                    queue_timeout=float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT", "2.0")),
+                )
+                atexit.register(_password_hasher.shutdown)
+    return _password_hasher
+
+
+def _reset_password_hasher_after_fork() -> None:
+    global _password_hasher_lock
+    _password_hasher_lock = threading.Lock()
+    if _password_hasher is not None:
+        _password_hasher.reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_password_hasher_after_fork)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibra el costo de bcrypt para este equipo.")
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS)
+    args = parser.parse_args()
+    recommended = calibrate_rounds(args.target_ms)
+    print(f"PASSWORD_HASH_ROUNDS={recommended}")
@@ -0,0 +1,464 @@
+"""Rotación del log de transacciones en segmentos comprimidos.
+
+El archivo activo (logs/transactions.log) se rota cuando supera un tamaño o
+cuando su primera línea es más antigua que un intervalo. La rotación solo
+renombra el archivo a logs/segments/; un hilo aparte lo comprime como varios
+miembros gzip independientes de
+~1 MiB, y un índice JSON al lado guarda, por miembro, la marca de tiempo de su
+primera línea y su offset comprimido y sin comprimir. Una consulta por rango de
+tiempo solo abre los segmentos que se solapan y solo descomprime sus miembros
+relevantes. Mientras la compresión está pendiente, las consultas leen el
+segmento .log sin comprimir.
+
+Consulta desde la línea de comandos:
+    python -m config.log_segments --desde "2024-05-06 10:00" --hasta "2024-05-06 11:00"
+
+Con varios procesos escribiendo, cada escritura toma un flock compartido sobre
+transactions.log.lock y la rotación uno exclusivo, de modo que nadie escribe en
+un archivo que ya fue renombrado.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: un solo proceso escritor
+    fcntl = None  # type: ignore
+
+TIMESTAMP_LENGTH = 19
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_BLOCK_BYTES = 1 << 20
+INDEX_SUFFIX = ".idx.json"
+SEGMENT_SUFFIX = ".log.gz"
+
+
+def _line_timestamp(line: bytes) -> Optional[str]:
+    candidate = line[:TIMESTAMP_LENGTH]
+    if len(candidate) == TIMESTAMP_LENGTH and candidate[4:5] == b"-" and candidate[13:14] == b":":
+        return candidate.decode("ascii", errors="replace")
+    return None
+
+
+def head_digest(line: bytes) -> str:
+    # Huella de la primera línea: junto con el inodo distingue un archivo de
+    # otro que reutilizó el inodo de un segmento ya borrado.
+    return hashlib.sha1(line.rstrip(b"\n")).hexdigest()[:16]
+
+
+def read_head(path: str) -> Optional[str]:
+    with open(path, "rb") as stream:
+        line = stream.readline()
+    return head_digest(line) if line.endswith(b"\n") else None
+
+
+def _block_bounds(block: bytes) -> Tuple[Optional[str], Optional[str]]:
+    first = None
+    for line in block.split(b"\n", 8):
+        first = _line_timestamp(line)
+        if first:
+            break
+    last = None
+    end = len(block.rstrip(b"\n"))
+    while end > 0 and last is None:
+        start = block.rfind(b"\n", 0, end) + 1
+        last = _line_timestamp(block[start:end])
+        end = start - 1
+    return first, last
+
+
+def read_index(segment_path: str) -> Optional[Dict]:
+    try:
+        with open(segment_path[: -len(SEGMENT_SUFFIX)] + INDEX_SUFFIX, encoding="utf-8") as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return None
+
+
+def compress_segment(raw_path: str, block_bytes: int = DEFAULT_BLOCK_BYTES, compresslevel: int = 6) -> Dict:
+    base = raw_path[: -len(".log")]
+    segment_path = base + SEGMENT_SUFFIX
+    index_path = base + INDEX_SUFFIX
+    blocks: List[List] = []
+    first = last = head = None
+    lines = 0
+    uncompressed = 0
+
+    with open(raw_path, "rb") as source, open(segment_path + ".tmp", "wb") as target:
+        while True:
+            block = source.read(block_bytes)
+            if not block:
+                break
+            if not block.endswith(b"\n"):
+                block += source.readline()
+            if head is None:
+                head = head_digest(block.split(b"\n", 1)[0])
+            block_first, block_last = _block_bounds(block)
+            first = first or block_first
+            last = block_last or last
+            blocks.append([block_first or last or "", target.tell(), uncompressed])
+            # Cada bloque es un miembro gzip propio: el archivo sigue siendo un
+            # .gz válido y se puede descomprimir a partir de cualquier miembro.
+            target.write(gzip.compress(block, compresslevel=compresslevel, mtime=0))
+            uncompressed += len(block)
+            lines += block.count(b"\n")
+        compressed_size = target.tell()
+
+    index = {
+        "segment": os.path.basename(segment_path),
+        "inode": os.stat(raw_path).st_ino,
+        "head": head,
+        "first": first,
+        "last": last,
+        "lines": lines,
+        "bytes": uncompressed,
+        "compressed_bytes": compressed_size,
+        "blocks": blocks,
+    }
+    os.replace(segment_path + ".tmp", segment_path)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as stream:
+        json.dump(index, stream)
+    os.replace(index_path + ".tmp", index_path)
+    os.remove(raw_path)
+    return index
+
+
+def iter_segment_lines(
+    segment_path: str,
+    index: Dict,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    from_offset: int = 0,
+) -> Iterator[Tuple[str, int]]:
+    # Devuelve (línea, offset sin comprimir posterior a la línea).
+    blocks = index["blocks"]
+    if not blocks:
+        return
+    first_block = 0
+    if from_offset:
+        first_block = max(0, bisect_right([block[2] for block in blocks], from_offset) - 1)
+    if start:
+        # El bloque anterior al primero que empieza después de `start` puede
+        # contener líneas de `start`.
+        first_block = max(first_block, bisect_right([block[0] for block in blocks], start) - 1)
+
+    with open(segment_path, "rb") as stream:
+        for position in range(first_block, len(blocks)):
+            block_start, compressed_offset, uncompressed_offset = blocks[position]
+            if end and block_start and block_start > end:
+                return
+            next_offset = blocks[position + 1][1] if position + 1 < len(blocks) else index["compressed_bytes"]
+            stream.seek(compressed_offset)
+            data = gzip.decompress(stream.read(next_offset - compressed_offset))
+            offset = uncompressed_offset
+            for raw in data.split(b"\n")[:-1]:
+                offset += len(raw) + 1
+                if offset <= from_offset or not _in_range(_line_timestamp(raw), start, end):
+                    continue
+                yield raw.decode("utf-8", errors="replace"), offset
+
+
+def iter_source_lines(
+    path: str,
+    index: Optional[Dict],
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    from_offset: int = 0,
+) -> Iterator[Tuple[str, int]]:
+    # Como iter_segment_lines, pero `index` None indica un segmento .log que
+    # todavía no se comprimió.
+    if index is not None:
+        yield from iter_segment_lines(path, index, start, end, from_offset)
+        return
+    try:
+        stream = open(path, "rb")
+    except FileNotFoundError:
+        # Se terminó de comprimir entre el listado y la lectura.
+        compressed = path[: -len(".log")] + SEGMENT_SUFFIX
+        index = read_index(compressed)
+        if index is not None:
+            yield from iter_segment_lines(compressed, index, start, end, from_offset)
+        return
+    with stream:
+        stream.seek(from_offset)
+        offset = from_offset
+        for raw in stream:
+            offset += len(raw)
+            if _in_range(_line_timestamp(raw), start, end):
+                yield raw.decode("utf-8", errors="replace").rstrip("\n"), offset
+
+
+def _in_range(timestamp: Optional[str], start: Optional[str], end: Optional[str]) -> bool:
+    # Las líneas sin marca de tiempo reconocible no se filtran. No se corta al
+    # ver la primera línea posterior a `end`: lotes de distintos workers pueden
+    # llegar con hasta un intervalo de flush de desorden.
+    if timestamp is None:
+        return True
+    return not ((start and timestamp < start) or (end and timestamp > end))
+
+
+def normalize_bound(value: Optional[str], upper: bool = False) -> Optional[str]:
+    # Completa "YYYY-MM-DD", "YYYY-MM-DD HH" o "YYYY-MM-DD HH:MM" hasta el
+    # formato del log; como límite superior incluye todo el día/hora/minuto.
+    if not value:
+        return None
+    template = "9999-12-31 23:59:59" if upper else "0000-01-01 00:00:00"
+    return value.strip() + template[len(value.strip()):]
+
+
+class SegmentedLog:
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 64 * 1024 * 1024,
+        rotate_seconds: float = 86400,
+        segment_dir: Optional[str] = None,
+        block_bytes: int = DEFAULT_BLOCK_BYTES,
+        background_compression: bool = True,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.segment_dir = segment_dir or os.path.join(os.path.dirname(os.path.abspath(path)), "segments")
+        self.block_bytes = block_bytes
+        self.lock_path = f"{path}.lock"
+        self.background_compression = background_compression
+        self._first_timestamps: Dict[int, Optional[float]] = {}
+        self.reset_after_fork()
+
+    def reset_after_fork(self) -> None:
+        # El hilo compresor no existe en el hijo y el lock pudo quedar tomado.
+        self._compressor: Optional[threading.Thread] = None
+        self._compressor_lock = threading.Lock()
+        self._compressor_pid = os.getpid()
+        self._compression_requested = False
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)
+
+    def _read_first_timestamp(self) -> Optional[float]:
+        try:
+            with open(self.path, "rb") as stream:
+                timestamp = _line_timestamp(stream.read(TIMESTAMP_LENGTH))
+        except OSError:
+            return None
+        if timestamp is None:
+            return None
+        return time.mktime(time.strptime(timestamp, TIMESTAMP_FORMAT))
+
+    def needs_rotation(self, now: Optional[float] = None) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if stat.st_size == 0:
+            return False
+        if self.max_bytes and stat.st_size >= self.max_bytes:
+            return True
+        if not self.rotate_seconds:
+            return False
+
+        # La primera marca de tiempo se guarda por inodo para no leer el archivo
+        # en cada lote. Un inodo liberado al comprimir un segmento puede
+        # reutilizarse para el nuevo archivo activo, así que antes de rotar por
+        # antigüedad se vuelve a leer.
+        now = now or time.time()
+        first = self._first_timestamps.get(stat.st_ino)
+        if first is None or now - first >= self.rotate_seconds:
+            first = self._read_first_timestamp()
+            self._first_timestamps = {stat.st_ino: first}
+        return first is not None and now - first >= self.rotate_seconds
+
+    def _segment_raw_path(self) -> str:
+        # El nombre ordena cronológicamente; el sufijo solo desempata rotaciones
+        # dentro del mismo microsegundo.
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        suffix = 0
+        while True:
+            base = os.path.join(self.segment_dir, f"transactions-{stamp}-{suffix:03d}")
+            if not os.path.exists(base + ".log") and not os.path.exists(base + SEGMENT_SUFFIX):
+                return base + ".log"
+            suffix += 1
+
+    def rotate(self) -> Optional[str]:
+        with self._locked(exclusive=True):
+            # Otro proceso pudo haber rotado mientras se esperaba el bloqueo.
+            if not self.needs_rotation():
+                return None
+            os.makedirs(self.segment_dir, exist_ok=True)
+            raw_path = self._segment_raw_path()
+            os.rename(self.path, raw_path)
+        # La compresión ocurre fuera del bloqueo y del hilo que escribe el log:
+        # nadie más escribe en raw_path.
+        self.schedule_compression()
+        return raw_path
+
+    def schedule_compression(self) -> None:
+        if not self.background_compression:
+            self.compress_pending()
+            return
+        if self._compressor_pid != os.getpid():
+            self.reset_after_fork()
+        with self._compressor_lock:
+            self._compression_requested = True
+            if self._compressor is None:
+                self._compressor = threading.Thread(
+                    target=self._compress_loop, name="transaction-log-compressor", daemon=True
+                )
+                self._compressor.start()
+
+    def _compress_loop(self) -> None:
+        while True:
+            with self._compressor_lock:
+                if not self._compression_requested:
+                    self._compressor = None
+                    return
+                self._compression_requested = False
+            try:
+                self.compress_pending()
+            except OSError as error:
+                # El segmento queda como .log; el siguiente intento lo retoma.
+                print(f"No se pudo comprimir un segmento del log: {error}", file=sys.stderr)
+
+    def wait_for_compression(self, timeout: Optional[float] = None) -> bool:
+        thread = self._compressor
+        if thread is None or self._compressor_pid != os.getpid():
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def compress_pending(self) -> None:
+        # También termina segmentos que quedaron sin comprimir por una caída.
+        if not os.path.isdir(self.segment_dir):
+            return
+        for name in sorted(os.listdir(self.segment_dir)):
+            if not name.endswith(".log"):
+                continue
+            raw_path = os.path.join(self.segment_dir, name)
+            if fcntl is None:
+                compress_segment(raw_path, self.block_bytes)
+                continue
+            try:
+                fd = os.open(raw_path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue  # otro proceso lo está comprimiendo
+            try:
+                if os.path.exists(raw_path):
+                    compress_segment(raw_path, self.block_bytes)
+            finally:
+                os.close(fd)
+
+    def write_batch(self, entries: List[str]) -> None:
+        payload = ("\n".join(entries) + "\n").encode("utf-8")
+        if self.needs_rotation():
+            self.rotate()
+        with self._locked(exclusive=False):
+            # Un único write() con O_APPEND por lote para que los lotes de
+            # distintos workers no se intercalen a mitad de línea.
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                written = 0
+                while written < len(payload):
+                    written += os.write(fd, payload[written:])
+            finally:
+                os.close(fd)
+
+    def segments(self) -> List[Tuple[str, Dict]]:
+        # Segmentos comprimidos con índice, del más antiguo al más reciente.
+        if not os.path.isdir(self.segment_dir):
+            return []
+        found = []
+        for name in sorted(os.listdir(self.segment_dir)):
+            if name.endswith(SEGMENT_SUFFIX):
+                path = os.path.join(self.segment_dir, name)
+                index = read_index(path)
+                if index is not None:
+                    found.append((path, index))
+        return found
+
+    def sources(self) -> List[Tuple[str, Optional[Dict]]]:
+        # Todos los segmentos en orden de rotación: (ruta .log.gz, índice) si ya
+        # se comprimió o (ruta .log, None) si la compresión está pendiente.
+        if not os.path.isdir(self.segment_dir):
+            return []
+        bases = set()
+        for name in os.listdir(self.segment_dir):
+            if name.endswith(SEGMENT_SUFFIX):
+                bases.add(name[: -len(SEGMENT_SUFFIX)])
+            elif name.endswith(".log"):
+                bases.add(name[: -len(".log")])
+        found: List[Tuple[str, Optional[Dict]]] = []
+        for base in sorted(bases):
+            path = os.path.join(self.segment_dir, base)
+            # El índice se escribe al final de compress_segment: si existe, el
+            # .log que quede es un resto a punto de borrarse.
+            index = read_index(path + SEGMENT_SUFFIX)
+            if index is not None:
+                found.append((path + SEGMENT_SUFFIX, index))
+            elif os.path.exists(path + ".log"):
+                found.append((path + ".log", None))
+        return found
+
+    def iter_range(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[str]:
+        for path, index in self.sources():
+            if index is not None and (
+                (start and index["last"] and index["last"] < start) or (end and index["first"] and index["first"] > end)
+            ):
+                continue
+            for line, _offset in iter_source_lines(path, index, start, end):
+                yield line
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as stream:
+            for raw in stream:
+                if _in_range(_line_timestamp(raw), start, end):
+                    yield raw.decode("utf-8", errors="replace").rstrip("\n")
+
+
+def main(argv=None):
+    from config.logger import get_segmented_log
+
+    parser = argparse.ArgumentParser(description="Imprime las líneas del log de transacciones en un rango de tiempo.")
+    parser.add_argument("--desde", help="Inicio, 'YYYY-MM-DD HH:MM[:SS]'")
+    parser.add_argument("--hasta", help="Fin, 'YYYY-MM-DD HH:MM[:SS]'")
+    parser.add_argument("--segmentos", action="store_true", help="Lista los segmentos y sus rangos")
+    args = parser.parse_args(argv)
+
+    segmented_log = get_segmented_log()
+    if args.segmentos:
+        for path, index in segmented_log.segments():
+            print(f"{os.path.basename(path)}  {index['first']} -> {index['last']}  {index['lines']} líneas")
+        return 0
+
+    start = normalize_bound(args.desde)
+    end = normalize_bound(args.hasta, upper=True)
+    for line in segmented_log.iter_range(start, end):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
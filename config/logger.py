@@ -1,20 +1,28 @@
+import atexit
 import os
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Callable, List, Optional
+
+from config.log_segments import SegmentedLog
 
 LOG_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
-os.makedirs(LOG_DIRECTORY, exist_ok=True)
-LOG_FILE_PATH = os.path.join(LOG_DIRECTORY, "transactions.log")
+LOG_FILE_PATH = os.environ.get("TRANSACTION_LOG_PATH") or os.path.join(LOG_DIRECTORY, "transactions.log")
+os.makedirs(os.path.dirname(LOG_FILE_PATH), exist_ok=True)
 
 _log4_logger = None
-_using_fallback_logger = False
+_log4_probed = False
+_log4_lock = threading.Lock()
+
 
-try:
-    import log4python  # type: ignore
-except ImportError:  # pragma: no cover
-    log4python = None  # type: ignore
+def _probe_log4_logger():
+    try:
+        import log4python  # type: ignore
+    except ImportError:  # pragma: no cover
+        return None
 
-if log4python is not None:  # pragma: no branch
     _factory_candidates = ("get_logger", "getLogger", "logger", "Logger", "log")
     for candidate in _factory_candidates:
         attr = getattr(log4python, candidate, None)
@@ -22,40 +30,252 @@ if log4python is not None:  # pragma: no branch
             continue
         if callable(attr):
             try:
-                _log4_logger = attr("transactions")
-                break
+                return attr("transactions")
             except TypeError:
                 try:
-                    _log4_logger = attr(name="transactions")
-                    break
+                    return attr(name="transactions")
                 except TypeError:
                     continue
-    if _log4_logger is None and hasattr(log4python, "Log4python"):
+    if hasattr(log4python, "Log4python"):
         manager = getattr(log4python, "Log4python")
         try:
             manager_instance = manager()
             if hasattr(manager_instance, "get_logger"):
-                _log4_logger = manager_instance.get_logger("transactions")
+                return manager_instance.get_logger("transactions")
+        except Exception:
+            return None
+    return None
+
+
+def get_log4_logger():
+    # El sondeo de log4python se hace con la primera transacción y no al
+    # importar el módulo, para no cargarlo durante el arranque del servidor.
+    global _log4_logger, _log4_probed
+    if not _log4_probed:
+        with _log4_lock:
+            if not _log4_probed:
+                _log4_logger = _probe_log4_logger()
+                _log4_probed = True
+    return _log4_logger
+
+
+_segmented_log = SegmentedLog(
+    LOG_FILE_PATH,
+    max_bytes=int(os.environ.get("TRANSACTION_LOG_MAX_BYTES", str(64 * 1024 * 1024))),
+    rotate_seconds=float(os.environ.get("TRANSACTION_LOG_ROTATE_SECONDS", "86400")),
+    segment_dir=os.environ.get("TRANSACTION_LOG_SEGMENT_DIR") or None,
+)
+
+
+def get_segmented_log() -> SegmentedLog:
+    return _segmented_log
+
+
+def _write_batch_to_file(entries: List[str]) -> None:
+    _segmented_log.write_batch(entries)
+
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+
+class BatchedLogWriter:
+    # Escribe las entradas desde un hilo en segundo plano para que el request no
+    # pague la E/S de disco. La cola es acotada; cuando se llena se aplica
+    # `overflow` y las entradas descartadas se cuentan en `dropped`.
+    def __init__(
+        self,
+        sink: Callable[[List[str]], None],
+        max_queue: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        overflow: str = "drop_newest",
+        block_timeout: float = 0.05,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de desborde desconocida: {overflow}")
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Protege `dropped`, `_closed` y `_producers` (productores dentro de
+        # submit); close() espera a que estos últimos salgan.
+        self._state = threading.Condition()
+        self._producers = 0
+        self._closed = False
+
+    def submit(self, entry: str) -> bool:
+        with self._state:
+            closed = self._closed
+            if not closed:
+                self._producers += 1
+        if closed:
+            self.sink([entry])
+            return True
+
+        accepted, dropped = False, 0
+        try:
+            self._ensure_started()
+            accepted, dropped = self._enqueue(entry)
+        finally:
+            with self._state:
+                self.dropped += dropped
+                self._producers -= 1
+                if not self._producers:
+                    self._state.notify_all()
+        return accepted
+
+    def _enqueue(self, entry: str):
+        # Devuelve (aceptada, descartadas).
+        if self.overflow == "block":
+            try:
+                self._queue.put(entry, timeout=self.block_timeout)
+                return True, 0
+            except queue.Full:
+                return False, 1
+
+        try:
+            self._queue.put_nowait(entry)
+            return True, 0
+        except queue.Full:
+            pass
+
+        if self.overflow == "drop_oldest":
+            # Nunca desaloja el centinela de close(): se encola recién cuando
+            # ya no queda ningún productor.
+            try:
+                self._queue.get_nowait()
+                evicted = 1
+            except queue.Empty:
+                evicted = 0
+            try:
+                self._queue.put_nowait(entry)
+                return True, evicted
+            except queue.Full:
+                # Otro productor ocupó el lugar liberado: se pierden ambas.
+                return False, evicted + 1
+
+        return False, 1
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def reset_after_fork(self) -> None:
+        # Tras fork() el hijo no hereda el hilo escritor, y la cola o los locks
+        # pueden haber quedado tomados. Las entradas pendientes pertenecen al padre.
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._state = threading.Condition()
+        self._producers = 0
+        self._closed = False
+        self.dropped = 0
+
+    def close(self, timeout: float = 5.0) -> None:
+        with self._state:
+            if self._closed:
+                return
+            self._closed = True
+            # Los productores nuevos escriben directo al sink; se espera a los
+            # que ya estaban encolando para que nadie toque la cola después.
+            self._state.wait_for(lambda: not self._producers, timeout)
+        with self._start_lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            self._drain()
+            return
+        # Bloqueante: si la cola está llena, el hilo la está vaciando.
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def _drain(self) -> None:
+        pending: List[str] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                pending.append(item)
+        if pending:
+            self._flush(pending)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._closed or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run, name="transaction-log-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        pending: List[str] = []
+        deadline = time.monotonic() + self.flush_interval
+        stop = False
+
+        while not stop:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is None:
+                    stop = True
+                else:
+                    pending.append(item)
+                    # Vacía lo que ya esté encolado sin volver a esperar.
+                    while len(pending) < self.batch_size:
+                        item = self._queue.get_nowait()
+                        if item is None:
+                            stop = True
+                            break
+                        pending.append(item)
+            except queue.Empty:
+                pass
+
+            if pending and (stop or len(pending) >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(pending)
+                pending = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+        if pending:
+            self._flush(pending)
+
+    def _flush(self, entries: List[str]) -> None:
+        try:
+            self.sink(entries)
         except Exception:
-            _log4_logger = None
+            with self._state:
+                self.dropped += len(entries)
+
 
-if _log4_logger is None:
-    import logging
+_transaction_writer = BatchedLogWriter(
+    _write_batch_to_file,
+    max_queue=int(os.environ.get("TRANSACTION_LOG_QUEUE_SIZE", "10000")),
+    batch_size=int(os.environ.get("TRANSACTION_LOG_BATCH_SIZE", "256")),
+    flush_interval=float(os.environ.get("TRANSACTION_LOG_FLUSH_SECONDS", "1.0")),
+    overflow=os.environ.get("TRANSACTION_LOG_OVERFLOW", "drop_newest"),
+)
+# atexit ejecuta en orden inverso: primero se cierra el escritor (que puede
+# rotar al vaciar la cola) y después se espera la compresión pendiente.
+atexit.register(_segmented_log.wait_for_compression, 30.0)
+atexit.register(_transaction_writer.close)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_transaction_writer.reset_after_fork)
+    os.register_at_fork(after_in_child=_segmented_log.reset_after_fork)
 
-    _using_fallback_logger = True
-    _log4_logger = logging.getLogger("transactions")
-    _log4_logger.setLevel(logging.INFO)
 
-    if not _log4_logger.handlers:
-        handler = logging.FileHandler(LOG_FILE_PATH, encoding="utf-8")
-        formatter = logging.Formatter("%(message)s")
-        handler.setFormatter(formatter)
-        _log4_logger.addHandler(handler)
+def get_transaction_writer() -> BatchedLogWriter:
+    return _transaction_writer
 
 
-def _write_to_file(entry: str) -> None:
-    with open(LOG_FILE_PATH, "a", encoding="utf-8") as stream:
-        stream.write(entry + "\n")
+def shutdown_transaction_log(timeout: float = 5.0) -> None:
+    _transaction_writer.close(timeout)
+    _segmented_log.wait_for_compression(timeout)
 
 
 def log_endpoint_transaction(
@@ -84,11 +304,11 @@ def log_endpoint_transaction(
 
     entry = " | ".join(fragments)
 
-    try:
-        _log4_logger.info(entry)
-    except Exception:
-        _write_to_file(entry)
-        return
+    log4_logger = get_log4_logger()
+    if log4_logger is not None:
+        try:
+            log4_logger.info(entry)
+        except Exception:
+            pass
 
-    if not _using_fallback_logger:
-        _write_to_file(entry)
+    _transaction_writer.submit(entry)
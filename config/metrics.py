@@ -0,0 +1,306 @@
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+DB_TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0)
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+# Cada cuántos segundos, como mucho, un proceso vuelca sus histogramas al
+# directorio compartido (ver configure_multiprocess).
+METRICS_FLUSH_SECONDS = float(os.environ.get("METRICS_FLUSH_SECONDS", 1.0))
+SNAPSHOT_PREFIX = "metrics-"
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    # Histograma con etiquetas al estilo Prometheus. observe() hace un bisect y
+    # tres incrementos bajo un lock, suficiente para dejarlo activo en producción.
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...], buckets: Iterable[float]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> List[List]:
+        with self._lock:
+            return [[list(labels), list(series[0]), series[1], series[2]] for labels, series in self._series.items()]
+
+    def render(self, snapshots: Optional[Iterable[List[List]]] = None) -> List[str]:
+        # Sin `snapshots` se muestra solo este proceso; con ellos, la suma de
+        # las series de todos los procesos.
+        if snapshots is None:
+            snapshots = [self.snapshot()]
+        merged: Dict[Tuple[str, ...], List] = {}
+        for snapshot in snapshots:
+            for labels, counts, total, count in snapshot:
+                series = merged.setdefault(tuple(labels), [[0] * (len(self.buckets) + 1), 0.0, 0])
+                if len(counts) != len(series[0]):
+                    continue  # Volcado de una versión con otros buckets.
+                series[0] = [current + extra for current, extra in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(merged.items()):
+            base_labels = ",".join(
+                f'{name}="{_escape_label(value)}"' for name, value in zip(self.label_names, label_values)
+            )
+            prefix = f"{base_labels}," if base_labels else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_number(bound)}"}} {cumulative}')
+            label_block = f"{{{base_labels}}}" if base_labels else ""
+            lines.append(f"{self.name}_sum{label_block} {_format_number(total)}")
+            lines.append(f"{self.name}_count{label_block} {count}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def reset_after_fork(self) -> None:
+        # Otro hilo del padre pudo quedar con el lock tomado en el fork().
+        self._lock = threading.Lock()
+        self._series.clear()
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones por endpoint de Flask.",
+    ("endpoint", "method", "status"),
+    LATENCY_BUCKETS,
+)
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements",
+    "Sentencias SQL ejecutadas por petición.",
+    ("endpoint",),
+    STATEMENT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Tiempo acumulado en la base de datos por petición.",
+    ("endpoint",),
+    DB_TIME_BUCKETS,
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_seconds",
+    "Duración de las operaciones bcrypt, incluida la espera del pool.",
+    ("operation",),
+    HASH_BUCKETS,
+)
+ALL_HISTOGRAMS = (REQUEST_LATENCY, REQUEST_DB_STATEMENTS, REQUEST_DB_SECONDS, PASSWORD_HASH_SECONDS)
+
+_request_state = threading.local()
+
+
+def start_request() -> None:
+    _request_state.started = time.perf_counter()
+    _request_state.statements = 0
+    _request_state.db_seconds = 0.0
+
+
+def finish_request(endpoint: Optional[str], method: str, status_code: int) -> None:
+    started = getattr(_request_state, "started", None)
+    if started is None:
+        return
+    _request_state.started = None
+    label = endpoint or "sin_endpoint"
+    REQUEST_LATENCY.observe(time.perf_counter() - started, label, method, str(status_code))
+    REQUEST_DB_STATEMENTS.observe(_request_state.statements, label)
+    REQUEST_DB_SECONDS.observe(_request_state.db_seconds, label)
+    _store.flush(force=False)
+
+
+def record_password_hash(operation: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        PASSWORD_HASH_SECONDS.observe(seconds, operation)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # El inicio se guarda en el contexto de ejecución y no en una pila de la
+    # conexión: una sentencia que falla (p. ej. IntegrityError) nunca llega a
+    # after_cursor_execute y dejaría su entrada para la siguiente.
+    if context is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    # Solo se atribuye a una petición si el hilo está dentro de una.
+    if getattr(_request_state, "started", None) is not None:
+        _request_state.statements += 1
+        _request_state.db_seconds += elapsed
+
+
+def instrument_engine(engine) -> None:
+    from sqlalchemy import event
+
+    if not METRICS_ENABLED or event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def init_metrics(app) -> None:
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def _metrics_start_request():
+        start_request()
+
+    @app.after_request
+    def _metrics_finish_request(response):
+        from flask import request
+
+        finish_request(request.endpoint, request.method, response.status_code)
+        return response
+
+
+class MultiprocessStore:
+    # Agregación entre los workers del servidor pre-fork, al estilo del modo
+    # multiproceso de prometheus_client: cada proceso vuelca sus histogramas a
+    # un archivo propio del directorio compartido y quien responde la consulta
+    # los suma. Los archivos de workers ya terminados se conservan porque sus
+    # contadores siguen siendo parte del total.
+    def __init__(self):
+        self.directory: Optional[str] = os.environ.get("METRICS_MULTIPROC_DIR") or None
+        self.reset_after_fork()
+
+    def reset_after_fork(self) -> None:
+        # El nombre lleva un sufijo aleatorio para que un pid reutilizado no
+        # pise el volcado de un worker anterior.
+        self._lock = threading.Lock()
+        self._path: Optional[str] = None
+        self._last_flush = 0.0
+
+    def _snapshot_path(self) -> str:
+        if self._path is None:
+            name = f"{SNAPSHOT_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+            self._path = os.path.join(self.directory, name)
+        return self._path
+
+    def flush(self, force: bool = True) -> None:
+        if not self.directory:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_flush < METRICS_FLUSH_SECONDS:
+                return
+            self._last_flush = now
+            path = self._snapshot_path()
+            payload = {
+                "pid": os.getpid(),
+                "histograms": {histogram.name: histogram.snapshot() for histogram in ALL_HISTOGRAMS},
+            }
+            temp_path = f"{path}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as stream:
+                    json.dump(payload, stream)
+                os.replace(temp_path, path)
+            except OSError:
+                # Una métrica sin volcar no debe hacer fallar la petición.
+                pass
+
+    def load(self) -> List[Dict]:
+        self.flush()
+        snapshots = []
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as stream:
+                    snapshots.append(json.load(stream))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+_store = MultiprocessStore()
+
+
+def configure_multiprocess(directory: Optional[str], clear: bool = False) -> None:
+    # Lo llama el maestro pre-fork antes de crear los workers; `clear` borra
+    # los volcados de una ejecución anterior.
+    _store.directory = directory
+    _store.reset_after_fork()
+    if directory and clear:
+        for name in os.listdir(directory):
+            if name.startswith(SNAPSHOT_PREFIX):
+                os.remove(os.path.join(directory, name))
+
+
+def flush_metrics() -> None:
+    if METRICS_ENABLED:
+        _store.flush()
+
+
+def _reset_after_fork() -> None:
+    # El hijo no debe volver a contar lo que el maestro ya haya observado.
+    for histogram in ALL_HISTOGRAMS:
+        histogram.reset_after_fork()
+    _store.reset_after_fork()
+
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    if _store.directory:
+        snapshots = _store.load()
+        pids = sorted({snapshot.get("pid") for snapshot in snapshots})
+        for histogram in ALL_HISTOGRAMS:
+            lines.extend(histogram.render(
+                snapshot["histograms"].get(histogram.name, []) for snapshot in snapshots
+            ))
+    else:
+        pids = [os.getpid()]
+        for histogram in ALL_HISTOGRAMS:
+            lines.extend(histogram.render())
+    lines.append(
+        '# HELP metrics_worker_info Procesos sumados en esta respuesta; responder="1" marca el que respondió.'
+    )
+    lines.append("# TYPE metrics_worker_info gauge")
+    for pid in pids:
+        responder = "1" if pid == os.getpid() else "0"
+        lines.append(f'metrics_worker_info{{pid="{pid}",responder="{responder}"}} 1')
+    return "\n".join(lines) + "\n"
+
+
+atexit.register(flush_metrics)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -61,3 +61,33 @@ EQUIPO_OPTIONS = {
 HORARIO_PATTERN = re.compile(r"^\d{2}:\d{2}\s*-\s*\d{2}:\d{2}$")
 DATE_FORMAT = "%d/%m/%Y"
 MAX_ESTUDIANTES = 35
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_AVAILABILITY_WINDOW_DAYS = 180
+# Franja del día en la que la búsqueda de horarios libres propone candidatos.
+FREE_SLOT_SEARCH_HOURS = "07:00 - 22:00"
+DEFAULT_FREE_SLOT_RESULTS = 10
+MAX_FREE_SLOT_RESULTS = 100
+STATS_CACHE_MAX_ENTRIES = 256
+MAX_IMPORT_ROWS = 5000
+# Tamaño máximo del cuerpo de una importación; se rechaza antes de leerlo.
+MAX_IMPORT_BYTES = 8 * 1024 * 1024
+IMPORT_BATCH_SIZE = 500
+MAX_BATCH_ITEMS = 5000
+BATCH_FLUSH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+# Compresión de respuestas /api/*: cuerpos menores que este tamaño (bytes) se
+# envían tal cual; el nivel va de 1 (rápido) a 9 (máxima compresión).
+COMPRESSION_MIN_BYTES = 1024
+COMPRESSION_LEVEL = 6
+
+# Token bucket por ruta pública: {identificador: (intentos en ráfaga, segundos
+# para recuperar un intento)}. "correo" se toma del cuerpo JSON e "ip" de
+# remote_addr; una petición debe tener cupo en todos sus buckets.
+RATE_LIMIT_POLICIES = {
+    "login": {"correo": (5, 12.0), "ip": (20, 3.0)},
+    "login_admin": {"correo": (3, 20.0), "ip": (10, 6.0)},
+    "register": {"correo": (3, 60.0), "ip": (10, 30.0)},
+    "register_admin": {"ip": (5, 60.0)},
+}
@@ -0,0 +1,178 @@
+import heapq
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.options import RATE_LIMIT_POLICIES
+
+# (clave, capacidad, segundos para recuperar un intento)
+BucketRequest = Tuple[str, int, float]
+# clave -> (intentos disponibles, último cálculo, momento en que se llena)
+BucketState = Tuple[float, float, float]
+
+
+def _apply(requests: Iterable[BucketRequest], states: Dict[str, BucketState], now: float):
+    # Recarga los buckets según el tiempo transcurrido y descuenta un intento de
+    # todos, o de ninguno si alguno está vacío. Devuelve (estados, retry_after).
+    refilled = []
+    retry_after = 0.0
+    for key, capacity, interval in requests:
+        tokens, updated, _full_at = states.get(key, (float(capacity), now, now))
+        tokens = min(float(capacity), tokens + (now - updated) / interval)
+        if tokens < 1.0:
+            retry_after = max(retry_after, (1.0 - tokens) * interval)
+        refilled.append((key, capacity, interval, tokens))
+
+    spend = 0.0 if retry_after else 1.0
+    updated_states = {}
+    for key, capacity, interval, tokens in refilled:
+        tokens -= spend
+        updated_states[key] = (tokens, now, now + (capacity - tokens) * interval)
+    return updated_states, retry_after
+
+
+class MemoryBucketStore:
+    # Buckets del proceso actual. Con varios workers cada uno tiene los suyos,
+    # así que el límite efectivo se multiplica por la cantidad de workers.
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        self._buckets: Dict[str, BucketState] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, requests: List[BucketRequest], now: float) -> float:
+        with self._lock:
+            states, retry_after = _apply(requests, self._buckets, now)
+            self._buckets.update(states)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return retry_after
+
+    def _prune(self, now: float) -> None:
+        # Un bucket lleno equivale a uno inexistente; se descartan primero esos
+        # y, si no alcanza, los que se llenarán antes.
+        full = [key for key, (_tokens, _updated, full_at) in self._buckets.items() if full_at <= now]
+        for key in full:
+            del self._buckets[key]
+        excess = len(self._buckets) - int(self.max_keys * 0.9)
+        if excess > 0:
+            for key, _state in heapq.nsmallest(excess, self._buckets.items(), key=lambda item: item[1][2]):
+                del self._buckets[key]
+
+
+class SQLiteBucketStore:
+    # Buckets compartidos entre procesos en un archivo SQLite propio (no la base
+    # de la aplicación), con una conexión por hilo y por proceso.
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str, busy_timeout: float = 2.0) -> None:
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._calls = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def consume(self, requests: List[BucketRequest], now: float) -> float:
+        connection = self._connection()
+        keys = [key for key, _capacity, _interval in requests]
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                f"SELECT key, tokens, updated, full_at FROM rate_limit_buckets WHERE key IN ({','.join('?' * len(keys))})",
+                keys,
+            ).fetchall()
+            states, retry_after = _apply(requests, {row[0]: row[1:] for row in rows}, now)
+            connection.executemany(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated, full_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated, "
+                "full_at = excluded.full_at",
+                [(key, *state) for key, state in states.items()],
+            )
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                connection.execute("DELETE FROM rate_limit_buckets WHERE full_at <= ?", (now,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+
+class RateLimiter:
+    def __init__(self, store, policies: Optional[Dict[str, Dict[str, Tuple[int, float]]]] = None) -> None:
+        self.store = store
+        self.policies = policies if policies is not None else RATE_LIMIT_POLICIES
+
+    def check(self, route: str, correo: Optional[str] = None, remote_addr: Optional[str] = None) -> float:
+        # Devuelve 0 si se permite la petición o los segundos a esperar.
+        policy = self.policies.get(route)
+        if not policy:
+            return 0.0
+        identifiers = {"correo": (correo or "").strip().lower(), "ip": remote_addr or ""}
+        requests = [
+            (f"{route}:{kind}:{identifiers[kind]}", capacity, interval)
+            for kind, (capacity, interval) in policy.items()
+            if identifiers.get(kind)
+        ]
+        if not requests:
+            return 0.0
+        return self.store.consume(requests, time.time())
+
+
+def create_rate_limiter() -> Optional[RateLimiter]:
+    if os.environ.get("RATE_LIMIT_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    backend = os.environ.get("RATE_LIMIT_BACKEND", "memory").lower()
+    if backend == "memory":
+        return RateLimiter(MemoryBucketStore())
+    if backend == "sqlite":
+        default_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database", "rate_limits.db")
+        return RateLimiter(SQLiteBucketStore(os.environ.get("RATE_LIMIT_SQLITE_PATH") or default_path))
+    raise ValueError(f"Backend de rate limiting desconocido: {backend}")
+
+
+def init_rate_limiter(app) -> None:
+    app.extensions["rate_limiter"] = create_rate_limiter()
+
+
+def rate_limited(route: str):
+    # Se aplica antes del controlador para no pagar bcrypt en intentos rechazados.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import current_app, jsonify, request
+
+            limiter = current_app.extensions.get("rate_limiter")
+            if limiter is not None:
+                payload = request.get_json(silent=True)
+                correo = payload.get("correo") if isinstance(payload, dict) else None
+                retry_after = limiter.check(
+                    route,
+                    correo=correo if isinstance(correo, str) else None,
+                    remote_addr=request.remote_addr,
+                )
+                if retry_after:
+                    response = jsonify({"message": "Demasiados intentos, intente más tarde"})
+                    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+                    return response, 429
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
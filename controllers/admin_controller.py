@@ -1,27 +1,23 @@
 import re
-import unicodedata
-from datetime import datetime
 
-from flask import jsonify, request
-from flask_jwt_extended import create_access_token, get_jwt
+from flask import Response, current_app, jsonify, request
+from flask_jwt_extended import create_access_token
 from sqlalchemy.exc import IntegrityError
 
-from config.options import (
-    CARGO_OPTIONS,
-    CARRERA_OPTIONS,
-    DATE_FORMAT,
-    DISCAPACIDAD_OPTIONS,
-    EMAIL_ALLOWED_DOMAINS,
-    EQUIPO_OPTIONS,
-    HORARIO_PATTERN,
-    LABORATORIO_OPTIONS,
-    MAX_ESTUDIANTES,
-    NIVEL_OPTIONS,
-)
-from database import bcrypt, db
+from config.hashing import get_password_hasher
+from config.metrics import render_prometheus
+from config.options import EMAIL_ALLOWED_DOMAINS
+from controllers.conditional import check_not_modified, with_etag
+from controllers.pagination import count_total, keyset_page, parse_page_args
+from controllers.reservation_validator import RESERVATION_VALIDATOR, error_payload
+from controllers.serialization import RESERVATION_SERIALIZER, USER_LIST_SERIALIZER, json_list_response
+from controllers.shared import require_admin_claim
+from database import db
 from database.models import Admin, LaboratoryRequest, User
+from database.occupancy import SLOT_FIELDS, is_slot_free
+from database.schedule import find_overlapping_request
+from database.user_purge import DELETE_MODES, delete_users, resolve_delete_mode, wake_purger
 
-EMAIL_ALLOWED_DOMAINS = ("@est.ups.edu.ec", "@ups.edu.ec")
 PASSWORD_PATTERN = re.compile(r"^(?=.*[A-Za-z])(?=.*\d)[A-Za-z\d]{8,12}$")
 MASKED_PASSWORD = "********"
 ADMIN_REQUIRED_FIELDS = {
@@ -35,24 +31,12 @@ ADMIN_REQUIRED_FIELDS = {
 }
 
 
-def _require_admin_claim():
-    claims = get_jwt()
-    if not claims.get("is_admin"):
-        return jsonify({"message": "Acceso solo para administradores"}), 403
-    return None
-
-
 def _mask_user_record(user):
     data = user.to_dict()
     data["password"] = MASKED_PASSWORD
     return data
 
 
-def _normalize_choice(value):
-    normalized = unicodedata.normalize("NFKD", value or "")
-    return "".join(char for char in normalized if not unicodedata.combining(char)).strip().upper()
-
-
 def login_admin():
     payload = request.get_json(silent=True) or {}
 
@@ -66,9 +50,14 @@ def login_admin():
     if not admin:
         return jsonify({"message": "Credenciales inválidas"}), 401
 
-    if not bcrypt.check_password_hash(admin.password_hash, contrasena):
+    password_hasher = get_password_hasher()
+    if not password_hasher.check(admin.password_hash, contrasena):
         return jsonify({"message": "Credenciales inválidas"}), 401
 
+    if password_hasher.needs_rehash(admin.password_hash):
+        admin.password_hash = password_hasher.hash(contrasena)
+        db.session.commit()
+
     additional_claims = {
         "correo": admin.correo,
         "nombre": admin.nombre,
@@ -106,7 +95,7 @@ def register_admin():
     if existing_admin:
         return jsonify({"message": "El correo ya está registrado en administradores"}), 409
 
-    password_hash = bcrypt.generate_password_hash(contrasena, rounds=10).decode("utf-8")
+    password_hash = get_password_hasher().hash(contrasena)
 
     admin = Admin(
         nombre=payload.get("nombre").strip(),
@@ -130,26 +119,36 @@ def register_admin():
 
 
 def list_users():
-    error = _require_admin_claim()
+    error = require_admin_claim()
     if error:
         return error
 
-    users = User.query.order_by(User.created_at.desc()).all()
+    page, error = parse_page_args()
+    if error:
+        return error
 
-    return jsonify({
-        "usuarios": [_mask_user_record(user) for user in users],
-        "total": len(users),
-    }), 200
+    # Solo las columnas que se publican, serializadas sin instanciar User.
+    active = User.eliminado_en.is_(None)
+    query = db.session.query(*USER_LIST_SERIALIZER.columns).filter(active)
+    rows, next_cursor = keyset_page(query, User, page["limit"], page["cursor"])
+
+    total, estimated = count_total(User, page["total"], active)
+    return json_list_response({
+        "total": total,
+        "total_estimado": estimated,
+        "siguiente_cursor": next_cursor,
+        "limite": page["limit"],
+    }, "usuarios", USER_LIST_SERIALIZER, rows)
 
 
 def update_user(user_id):
-    error = _require_admin_claim()
+    error = require_admin_claim()
     if error:
         return error
 
     payload = request.get_json(silent=True) or {}
 
-    user = User.query.get(user_id)
+    user = User.get_active(user_id)
     if not user:
         return jsonify({"message": "Usuario no encontrado"}), 404
 
@@ -179,40 +178,59 @@ def update_user(user_id):
     if contrasena:
         if not PASSWORD_PATTERN.fullmatch(contrasena):
             return jsonify({"message": "Contraseña inválida"}), 400
-        user.password_hash = bcrypt.generate_password_hash(contrasena, rounds=10).decode("utf-8")
+        user.password_hash = get_password_hasher().hash(contrasena)
 
     db.session.commit()
     return jsonify({"message": "Usuario actualizado", "usuario": _mask_user_record(user)}), 200
 
 
 def delete_user(user_id):
-    error = _require_admin_claim()
+    error = require_admin_claim()
     if error:
         return error
 
-    user = User.query.get(user_id)
-    if not user:
+    mode = resolve_delete_mode(current_app, request.args.get("modo"))
+    if mode is None:
+        return jsonify({"message": "Modo de eliminación inválido", "permitidos": list(DELETE_MODES)}), 400
+
+    if not db.session.query(User.id).filter(User.id == user_id, User.eliminado_en.is_(None)).scalar():
         return jsonify({"message": "Usuario no encontrado"}), 404
 
-    db.session.delete(user)
+    delete_users([user_id], mode)
     db.session.commit()
+    if mode == "diferido":
+        wake_purger(current_app)
+        return jsonify({"message": "Usuario marcado para eliminación"}), 202
     return jsonify({"message": "Usuario eliminado"}), 200
 
 
 def list_laboratories():
-    error = _require_admin_claim()
+    error = require_admin_claim()
     if error:
         return error
 
-    requests = LaboratoryRequest.query.order_by(LaboratoryRequest.created_at.desc()).all()
-    return jsonify({
-        "reservas": [req.to_dict() for req in requests],
-        "total": len(requests),
-    }), 200
+    page, error = parse_page_args()
+    if error:
+        return error
+
+    etag, not_modified = check_not_modified()
+    if not_modified:
+        return not_modified
+
+    rows, next_cursor = keyset_page(
+        db.session.query(*RESERVATION_SERIALIZER.columns), LaboratoryRequest, page["limit"], page["cursor"]
+    )
+    total, estimated = count_total(LaboratoryRequest, page["total"])
+    return with_etag(json_list_response({
+        "total": total,
+        "total_estimado": estimated,
+        "siguiente_cursor": next_cursor,
+        "limite": page["limit"],
+    }, "reservas", RESERVATION_SERIALIZER, rows), etag)
 
 
 def update_laboratory(request_id):
-    error = _require_admin_claim()
+    error = require_admin_claim()
     if error:
         return error
 
@@ -222,82 +240,52 @@ def update_laboratory(request_id):
     if not lab_request:
         return jsonify({"message": "Reserva no encontrada"}), 404
 
-    if "correo_institucional" in payload:
-        correo = (payload.get("correo_institucional") or "").lower().strip()
-        if not correo.endswith(EMAIL_ALLOWED_DOMAINS):
-            return jsonify({"message": "Correo institucional inválido"}), 400
-        lab_request.correo_institucional = correo
-
-    def _apply_choice(field, options):
-        if field in payload:
-            key = _normalize_choice(payload[field])
-            value = options.get(key)
-            if not value:
-                return jsonify({
-                    "message": f"Valor no permitido para {field}",
-                    "permitidos": sorted(options.values()),
-                }), 400
-            setattr(lab_request, field if field != "laboratorio" else "laboratorio", value)
-        return None
-
-    for field, options in (
-        ("cargo", CARGO_OPTIONS),
-        ("carrera", CARRERA_OPTIONS),
-        ("nivel", NIVEL_OPTIONS),
-        ("discapacidad", DISCAPACIDAD_OPTIONS),
-        ("laboratorio", LABORATORIO_OPTIONS),
-        ("equipo", EQUIPO_OPTIONS),
-    ):
-        error_resp = _apply_choice(field, options)
-        if error_resp:
-            return error_resp
-
-    if "nombres_completos" in payload and payload.get("nombres_completos"):
-        lab_request.nombres_completos = payload["nombres_completos"].strip()
-
-    if "materia_motivo" in payload and payload.get("materia_motivo"):
-        lab_request.materia_motivo = payload["materia_motivo"].strip()
-
-    if "descripcion_actividades" in payload and payload.get("descripcion_actividades"):
-        lab_request.descripcion_actividades = payload["descripcion_actividades"].strip()
-
-    if "horario_uso" in payload:
-        horario = payload.get("horario_uso") or ""
-        if not HORARIO_PATTERN.fullmatch(horario.strip()):
-            return jsonify({"message": "Formato de horario inválido"}), 400
-        lab_request.horario_uso = horario.strip()
-
-    if "numero_estudiantes" in payload:
-        try:
-            numero_estudiantes = int(payload.get("numero_estudiantes"))
-        except (TypeError, ValueError):
-            return jsonify({"message": "Número de estudiantes inválido"}), 400
-        if numero_estudiantes <= 0:
-            return jsonify({"message": "El número de estudiantes debe ser mayor que cero"}), 400
-        if numero_estudiantes > MAX_ESTUDIANTES:
-            return jsonify({"message": "Número de estudiantes excede la capacidad", "maximo": MAX_ESTUDIANTES}), 400
-        lab_request.numero_estudiantes = numero_estudiantes
-
-    if "fecha_prestamo" in payload:
-        try:
-            lab_request.fecha_prestamo = datetime.strptime(payload.get("fecha_prestamo"), DATE_FORMAT).date()
-        except (TypeError, ValueError):
-            return jsonify({"message": "Fecha de préstamo inválida"}), 400
-
+    values, errors = RESERVATION_VALIDATOR.validate(payload, partial=True)
+    if errors:
+        return jsonify(error_payload(errors)), 400
+
+    for field, value in values.items():
+        setattr(lab_request, field, value)
+
+    conflict_response = (jsonify({
+        "message": "Horario ya reservado",
+        "detalle": "Conflicto detectado con otra solicitud",
+    }), 409)
+    if SLOT_FIELDS.intersection(values):
+        # Los choques evidentes se responden sin escribir ni tomar el bloqueo;
+        # no_autoflush evita que la consulta escriba el cambio pendiente.
+        with db.session.no_autoflush:
+            free = is_slot_free(
+                lab_request.laboratorio,
+                lab_request.fecha_prestamo,
+                lab_request.inicio_minutos,
+                lab_request.fin_minutos,
+                exclude_id=lab_request.id,
+            )
+        if not free:
+            db.session.rollback()
+            return conflict_response
     try:
+        db.session.flush()
+        if find_overlapping_request(
+            lab_request.laboratorio,
+            lab_request.fecha_prestamo,
+            lab_request.inicio_minutos,
+            lab_request.fin_minutos,
+            exclude_id=lab_request.id,
+        ):
+            db.session.rollback()
+            return conflict_response
         db.session.commit()
     except IntegrityError:
         db.session.rollback()
-        return jsonify({
-            "message": "Horario ya reservado",
-            "detalle": "Conflicto detectado con otra solicitud",
-        }), 409
+        return conflict_response
 
     return jsonify({"message": "Reserva actualizada", "reserva": lab_request.to_dict()}), 200
 
 
 def delete_laboratory(request_id):
-    error = _require_admin_claim()
+    error = require_admin_claim()
     if error:
         return error
 
@@ -308,3 +296,10 @@ def delete_laboratory(request_id):
     db.session.delete(lab_request)
     db.session.commit()
     return jsonify({"message": "Reserva eliminada"}), 200
+
+
+def export_metrics():
+    error = require_admin_claim()
+    if error:
+        return error
+    return Response(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
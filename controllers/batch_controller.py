@@ -0,0 +1,301 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app, jsonify, request
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+
+from config.options import BATCH_FLUSH_SIZE, DATE_FORMAT, MAX_BATCH_ITEMS
+from controllers.reservation_validator import RESERVATION_VALIDATOR, error_payload
+from controllers.shared import LOOKUP_CHUNK_SIZE, chunks, require_admin_claim
+from database import db
+from database.engine import begin_immediate
+from database.models import LaboratoryRequest, User
+from database.occupancy import SLOT_FIELDS
+from database.user_purge import DELETE_MODES, delete_users, resolve_delete_mode, wake_purger
+
+OPERATIONS = ("actualizar", "eliminar")
+USER_BATCH_FIELDS = ("nombre", "apellido", "cedula", "carrera")
+
+
+def _parse_batch_request():
+    # Devuelve (operación, ids o None, filtro o None, cambios) o la respuesta de error.
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        payload = {}
+    operation = payload.get("operacion")
+    if operation not in OPERATIONS:
+        return None, (jsonify({"message": "Operación inválida", "permitidas": list(OPERATIONS)}), 400)
+
+    ids, filters = payload.get("ids"), payload.get("filtro")
+    if (ids is None) == (filters is None):
+        return None, (jsonify({"message": "Indique ids o filtro, no ambos"}), 400)
+    if ids is not None:
+        if not isinstance(ids, list) or not all(type(item) is int for item in ids):
+            return None, (jsonify({"message": "ids debe ser una lista de enteros"}), 400)
+        if len(ids) > MAX_BATCH_ITEMS:
+            return None, (jsonify({"message": "Demasiados elementos en el lote", "maximo": MAX_BATCH_ITEMS}), 413)
+        ids = list(dict.fromkeys(ids))
+    elif not isinstance(filters, dict) or not filters:
+        return None, (jsonify({"message": "filtro debe ser un objeto con al menos un criterio"}), 400)
+
+    changes = payload.get("cambios") or {}
+    if operation == "actualizar" and (not isinstance(changes, dict) or not changes):
+        return None, (jsonify({"message": "cambios es requerido para actualizar"}), 400)
+    return (operation, ids, filters, changes), None
+
+
+def _parse_filter_date(filters, field_name):
+    value = filters.get(field_name)
+    if value is None:
+        return None, None
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date(), None
+    except (TypeError, ValueError):
+        return None, (jsonify({"message": f"Filtro {field_name} inválido", "detalle": "Use formato d/m/yyyy"}), 400)
+
+
+def _load_targets(query, model, ids):
+    # Una consulta por bloque de ids (o una sola con filtro), en orden de id.
+    if ids is None:
+        targets = query.order_by(model.id.asc()).limit(MAX_BATCH_ITEMS + 1).all()
+        if len(targets) > MAX_BATCH_ITEMS:
+            return None, (jsonify({"message": "Demasiados elementos en el lote", "maximo": MAX_BATCH_ITEMS}), 413)
+        return targets, None
+    targets = []
+    for chunk in chunks(sorted(ids), LOOKUP_CHUNK_SIZE):
+        targets.extend(query.filter(model.id.in_(chunk)).order_by(model.id.asc()))
+    return targets, None
+
+
+def _flush_every(count):
+    if count % BATCH_FLUSH_SIZE == 0:
+        db.session.flush()
+
+
+def _run_batch(apply, ids, targets, missing_state):
+    # Todo el lote es una transacción: un IntegrityError en cualquier flush
+    # revierte también los elementos ya aplicados.
+    try:
+        results = apply()
+        found = {target.id for target in targets}
+        # Los ids pedidos que no existen se informan al final, en el orden recibido.
+        for missing in (item for item in ids or () if item not in found):
+            results.append({"id": missing, "estado": missing_state})
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({
+            "message": "Conflicto detectado con otra solicitud",
+            "detalle": "No se aplicó ningún cambio del lote",
+        }), 409
+
+    summary = defaultdict(int)
+    for entry in results:
+        summary[entry["estado"]] += 1
+    return jsonify({
+        "message": "Lote procesado",
+        "resumen": dict(summary, total=len(results)),
+        "resultados": results,
+    }), 200
+
+
+def batch_users():
+    error = require_admin_claim()
+    if error:
+        return error
+    parsed, error = _parse_batch_request()
+    if error:
+        return error
+    operation, ids, filters, changes = parsed
+
+    values, mode = {}, None
+    if operation == "actualizar":
+        unknown = sorted(set(changes) - set(USER_BATCH_FIELDS))
+        if unknown:
+            return jsonify({
+                "message": "Campos no permitidos en lote",
+                "campos": unknown,
+                "permitidos": list(USER_BATCH_FIELDS),
+            }), 400
+        values = {field: str(value).strip() for field, value in changes.items() if value and str(value).strip()}
+        if not values:
+            return jsonify({"message": "cambios no puede estar vacío"}), 400
+    else:
+        # El modo solo aplica a la eliminación; get_json() ya fue validado como objeto.
+        mode = resolve_delete_mode(current_app, request.get_json(silent=True).get("modo"))
+        if mode is None:
+            return jsonify({"message": "Modo de eliminación inválido", "permitidos": list(DELETE_MODES)}), 400
+
+    query = User.active()
+    if filters is not None:
+        unknown = sorted(set(filters) - {"carrera", "creado_hasta"})
+        if unknown:
+            return jsonify({"message": "Criterios de filtro desconocidos", "campos": unknown}), 400
+        if filters.get("carrera"):
+            query = query.filter(User.carrera == str(filters["carrera"]).strip())
+        creado_hasta, error = _parse_filter_date(filters, "creado_hasta")
+        if error:
+            return error
+        if creado_hasta:
+            query = query.filter(User.created_at < creado_hasta + timedelta(days=1))
+
+    begin_immediate(db.session)
+    targets, error = _load_targets(query, User, ids)
+    if error:
+        db.session.rollback()
+        return error
+
+    response = _run_batch(lambda: _apply_user_batch(targets, operation, values, mode), ids, targets, "no_encontrado")
+    if operation == "eliminar" and mode == "diferido":
+        wake_purger(current_app)
+    return response
+
+
+def _apply_user_batch(targets, operation, values, mode):
+    if operation == "eliminar":
+        # Sin cargar reservas: DELETE (o marca de eliminación diferida) por bloques de ids.
+        user_ids = [user.id for user in targets]
+        for chunk in chunks(user_ids, LOOKUP_CHUNK_SIZE):
+            delete_users(chunk, mode)
+        estado = "marcado" if mode == "diferido" else "eliminado"
+        return [{"id": user_id, "estado": estado} for user_id in user_ids]
+
+    results = []
+    for count, user in enumerate(targets, start=1):
+        for field, value in values.items():
+            setattr(user, field, value)
+        results.append({"id": user.id, "estado": "actualizado"})
+        _flush_every(count)
+    return results
+
+
+def _load_day_slots(keys):
+    # {(laboratorio, fecha): {id: (inicio, fin)}} de todas las reservas de esos días.
+    slots = defaultdict(dict)
+    for chunk in chunks(sorted(keys), LOOKUP_CHUNK_SIZE):
+        query = db.session.query(
+            LaboratoryRequest.id,
+            LaboratoryRequest.laboratorio,
+            LaboratoryRequest.fecha_prestamo,
+            LaboratoryRequest.inicio_minutos,
+            LaboratoryRequest.fin_minutos,
+        ).filter(tuple_(LaboratoryRequest.laboratorio, LaboratoryRequest.fecha_prestamo).in_(chunk))
+        for row_id, laboratorio, fecha, start, end in query:
+            slots[(laboratorio, fecha)][row_id] = (start, end)
+    return slots
+
+
+def _new_key(target, values):
+    return (
+        values.get("laboratorio", target.laboratorio),
+        values.get("fecha_prestamo", target.fecha_prestamo),
+    )
+
+
+def _find_conflict(day_slots, own_id, start, end):
+    for other_id, (other_start, other_end) in day_slots.items():
+        if other_id != own_id and other_start < end and other_end > start:
+            return other_id
+    return None
+
+
+def batch_laboratories():
+    error = require_admin_claim()
+    if error:
+        return error
+    parsed, error = _parse_batch_request()
+    if error:
+        return error
+    operation, ids, filters, changes = parsed
+
+    values = {}
+    if operation == "actualizar":
+        values, errors = RESERVATION_VALIDATOR.validate(changes, partial=True)
+        if errors:
+            return jsonify(error_payload(errors)), 400
+
+    query = LaboratoryRequest.query
+    if filters is not None:
+        unknown = sorted(set(filters) - {"laboratorio", "desde", "hasta", "usuario_id"})
+        if unknown:
+            return jsonify({"message": "Criterios de filtro desconocidos", "campos": unknown}), 400
+        if "laboratorio" in filters:
+            laboratorio, error = RESERVATION_VALIDATOR.choice("laboratorio", filters["laboratorio"])
+            if error:
+                return jsonify(error), 400
+            query = query.filter(LaboratoryRequest.laboratorio == laboratorio)
+        desde, error = _parse_filter_date(filters, "desde")
+        if error:
+            return error
+        if desde:
+            query = query.filter(LaboratoryRequest.fecha_prestamo >= desde)
+        hasta, error = _parse_filter_date(filters, "hasta")
+        if error:
+            return error
+        if hasta:
+            query = query.filter(LaboratoryRequest.fecha_prestamo <= hasta)
+        if "usuario_id" in filters:
+            try:
+                query = query.filter(LaboratoryRequest.user_id == int(filters["usuario_id"]))
+            except (TypeError, ValueError):
+                return jsonify({"message": "Filtro usuario_id inválido"}), 400
+
+    begin_immediate(db.session)
+    targets, error = _load_targets(query, LaboratoryRequest, ids)
+    if error:
+        db.session.rollback()
+        return error
+
+    day_slots = None
+    if any(field in values for field in SLOT_FIELDS):
+        # Con el bloqueo de escritura tomado, los horarios de los días afectados
+        # se validan en memoria y en orden de id, como si cada cambio fuera una
+        # petición individual: un elemento que libera un horario lo deja
+        # disponible para los siguientes.
+        keys = set()
+        for target in targets:
+            keys.add((target.laboratorio, target.fecha_prestamo))
+            keys.add(_new_key(target, values))
+        day_slots = _load_day_slots(keys)
+
+    return _run_batch(
+        lambda: _apply_reservation_batch(targets, operation, values, day_slots), ids, targets, "no_encontrada"
+    )
+
+
+def _apply_reservation_batch(targets, operation, values, day_slots):
+    results = []
+    applied = 0
+    for target in targets:
+        if operation == "eliminar":
+            db.session.delete(target)
+            results.append({"id": target.id, "estado": "eliminada"})
+            applied += 1
+            _flush_every(applied)
+            continue
+
+        if day_slots is not None:
+            new_key = _new_key(target, values)
+            start = values.get("inicio_minutos", target.inicio_minutos)
+            end = values.get("fin_minutos", target.fin_minutos)
+            conflict_id = _find_conflict(day_slots[new_key], target.id, start, end)
+            if conflict_id is not None:
+                # Incluye los choques con uq_lab_schedule: mismo laboratorio,
+                # fecha y horario implica solapamiento.
+                results.append({
+                    "id": target.id,
+                    "estado": "conflicto",
+                    "message": "Horario ya reservado",
+                    "conflicto_con": conflict_id,
+                })
+                continue
+            day_slots[(target.laboratorio, target.fecha_prestamo)].pop(target.id, None)
+            day_slots[new_key][target.id] = (start, end)
+
+        for field, value in values.items():
+            setattr(target, field, value)
+        results.append({"id": target.id, "estado": "actualizada"})
+        applied += 1
+        _flush_every(applied)
+    return results
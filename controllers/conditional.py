@@ -0,0 +1,39 @@
+import hashlib
+
+from flask import current_app, make_response, request
+
+from database.data_version import RESERVATIONS_SCOPE, get_data_version
+
+
+def _etag_for(scope):
+    # La versión de datos cambia con cada escritura; los parámetros de la
+    # consulta (página, cursor, total) distinguen respuestas de la misma versión.
+    args = "&".join(f"{key}={value}" for key, value in sorted(request.args.items(multi=True)))
+    digest = hashlib.sha1(f"{request.endpoint}?{args}".encode("utf-8")).hexdigest()[:16]
+    return f"{scope}-{get_data_version(scope)}-{digest}"
+
+
+def check_not_modified(scope=RESERVATIONS_SCOPE):
+    # Devuelve (etag, respuesta_304 o None). Se lee la versión antes de consultar
+    # los datos: si una escritura ocurre en medio, el ETag queda más viejo que el
+    # cuerpo y el siguiente sondeo recibe un 200, nunca un 304 incorrecto.
+    etag = _etag_for(scope)
+    # Comparación débil (RFC 9110): la versión comprimida del cuerpo se publica
+    # con el mismo ETag marcado como W/.
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        _set_cache_headers(response, etag)
+        return etag, response
+    return etag, None
+
+
+def with_etag(result, etag):
+    response = make_response(result)
+    if response.status_code == 200:
+        _set_cache_headers(response, etag)
+    return response
+
+
+def _set_cache_headers(response, etag):
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
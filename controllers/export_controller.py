@@ -0,0 +1,123 @@
+import csv
+import io
+import json
+
+from flask import Response, jsonify, request, stream_with_context
+
+from config.options import EXPORT_BATCH_SIZE
+from controllers.reservation_validator import RESERVATION_VALIDATOR
+from controllers.shared import parse_query_date, require_admin_claim
+from database import db
+from database.models import LaboratoryRequest
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Mismas claves y orden que LaboratoryRequest.to_dict().
+EXPORT_COLUMNS = (
+    ("id", LaboratoryRequest.id),
+    ("usuario_id", LaboratoryRequest.user_id),
+    ("correo_institucional", LaboratoryRequest.correo_institucional),
+    ("nombres_completos", LaboratoryRequest.nombres_completos),
+    ("cargo", LaboratoryRequest.cargo),
+    ("carrera", LaboratoryRequest.carrera),
+    ("nivel", LaboratoryRequest.nivel),
+    ("discapacidad", LaboratoryRequest.discapacidad),
+    ("materia_motivo", LaboratoryRequest.materia_motivo),
+    ("numero_estudiantes", LaboratoryRequest.numero_estudiantes),
+    ("fecha_prestamo", LaboratoryRequest.fecha_prestamo),
+    ("horario_uso", LaboratoryRequest.horario_uso),
+    ("descripcion_actividades", LaboratoryRequest.descripcion_actividades),
+    ("laboratorio", LaboratoryRequest.laboratorio),
+    ("equipo", LaboratoryRequest.equipo),
+    ("created_at", LaboratoryRequest.created_at),
+)
+EXPORT_FIELD_NAMES = tuple(name for name, _column in EXPORT_COLUMNS)
+# Una hoja de cálculo interpreta como fórmula la celda que empieza así.
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _export_rows(filters):
+    # yield_per hace que el cursor entregue lotes de EXPORT_BATCH_SIZE filas en
+    # lugar de materializar todo el resultado antes del primer byte.
+    query = (
+        db.session.query(*(column for _name, column in EXPORT_COLUMNS))
+        .filter(*filters)
+        .order_by(LaboratoryRequest.id.asc())
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    for row in query:
+        yield [value.isoformat() if hasattr(value, "isoformat") else value for value in row]
+
+
+def _ndjson_stream(rows):
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps(dict(zip(EXPORT_FIELD_NAMES, row)), ensure_ascii=False))
+        if len(buffer) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(buffer) + "\n"
+            buffer = []
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def _csv_safe(value):
+    # Los textos libres (materia_motivo, descripcion_actividades...) vienen del
+    # usuario; con el apóstrofo inicial se muestran como texto y no se evalúan.
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELD_NAMES)
+    pending = 0
+    for row in rows:
+        writer.writerow([_csv_safe(value) for value in row])
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue()
+
+
+def export_laboratory_requests():
+    error = require_admin_claim()
+    if error:
+        return error
+
+    data_format = (request.args.get("formato") or "ndjson").lower()
+    if data_format not in EXPORT_FORMATS:
+        return jsonify({"message": "Formato de exportación no soportado", "permitidos": sorted(EXPORT_FORMATS)}), 400
+
+    filters = []
+    if request.args.get("desde"):
+        desde, error = parse_query_date("desde")
+        if error:
+            return error
+        filters.append(LaboratoryRequest.fecha_prestamo >= desde)
+    if request.args.get("hasta"):
+        hasta, error = parse_query_date("hasta")
+        if error:
+            return error
+        filters.append(LaboratoryRequest.fecha_prestamo <= hasta)
+
+    if request.args.get("laboratorio"):
+        laboratorio, error = RESERVATION_VALIDATOR.choice("laboratorio", request.args.get("laboratorio"))
+        if error:
+            return jsonify(error), 400
+        filters.append(LaboratoryRequest.laboratorio == laboratorio)
+
+    stream = _csv_stream if data_format == "csv" else _ndjson_stream
+    response = Response(
+        stream_with_context(stream(_export_rows(filters))),
+        content_type=EXPORT_FORMATS[data_format],
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="reservas.{data_format}"'
+    return response
@@ -0,0 +1,251 @@
+import csv
+import io
+import json
+from collections import defaultdict
+
+from flask import jsonify, request
+from sqlalchemy import and_, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from config.options import IMPORT_BATCH_SIZE, MAX_IMPORT_BYTES, MAX_IMPORT_ROWS
+from controllers.laboratory_controller import validate_reservation_payload
+from controllers.shared import LOOKUP_CHUNK_SIZE, chunks, require_admin_claim
+from database import db
+from database.models import LaboratoryRequest, User
+from database.occupancy import refresh_occupancy
+
+SUPPORTED_FORMATS = ("csv", "jsonl")
+
+
+def _detect_format():
+    requested = (request.args.get("formato") or "").lower()
+    if requested:
+        return requested
+    mimetype = request.mimetype or ""
+    if mimetype in ("text/csv", "application/csv"):
+        return "csv"
+    if mimetype in ("application/x-ndjson", "application/jsonl", "application/x-jsonlines"):
+        return "jsonl"
+    return None
+
+
+def _parse_rows(raw_text, data_format):
+    # Devuelve (fila, payload, error) conservando la numeración del archivo.
+    if data_format == "csv":
+        reader = csv.DictReader(io.StringIO(raw_text))
+        for line_number, row in enumerate(reader, start=2):
+            yield line_number, {key.strip(): value for key, value in row.items() if key}, None
+        return
+
+    for line_number, line in enumerate(raw_text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+        except ValueError:
+            yield line_number, None, {"message": "JSON inválido"}
+            continue
+        if not isinstance(payload, dict):
+            yield line_number, None, {"message": "Cada línea debe ser un objeto JSON"}
+            continue
+        yield line_number, payload, None
+
+
+def _resolve_users(rows):
+    ids = set()
+    correos = set()
+    for row in rows:
+        if row["usuario_id"] is not None:
+            ids.add(row["usuario_id"])
+        else:
+            correos.add(row["values"]["correo_institucional"])
+
+    known_ids = set()
+    for chunk in chunks(sorted(ids), LOOKUP_CHUNK_SIZE):
+        query = db.session.query(User.id).filter(User.id.in_(chunk), User.eliminado_en.is_(None))
+        known_ids.update(user_id for (user_id,) in query)
+
+    ids_by_correo = {}
+    for chunk in chunks(sorted(correos), LOOKUP_CHUNK_SIZE):
+        ids_by_correo.update(db.session.query(User.correo, User.id).filter(
+            User.correo.in_(chunk), User.eliminado_en.is_(None)
+        ))
+
+    for row in rows:
+        if row["usuario_id"] is not None:
+            row["user_id"] = row["usuario_id"] if row["usuario_id"] in known_ids else None
+        else:
+            row["user_id"] = ids_by_correo.get(row["values"]["correo_institucional"])
+
+
+def _load_occupied_slots(keys):
+    occupied = defaultdict(list)
+    for chunk in chunks(sorted(keys), LOOKUP_CHUNK_SIZE):
+        query = db.session.query(
+            LaboratoryRequest.laboratorio,
+            LaboratoryRequest.fecha_prestamo,
+            LaboratoryRequest.inicio_minutos,
+            LaboratoryRequest.fin_minutos,
+        ).filter(tuple_(LaboratoryRequest.laboratorio, LaboratoryRequest.fecha_prestamo).in_(chunk))
+        for laboratorio, fecha, start, end in query:
+            occupied[(laboratorio, fecha)].append((start, end))
+    return occupied
+
+
+def _overlaps(slots, start, end):
+    return any(
+        slot_start is not None and slot_start < end and slot_end > start
+        for slot_start, slot_end in slots
+    )
+
+
+def _find_raced_conflicts(inserted_ids):
+    # Tras el flush se tiene el bloqueo de escritura: cualquier solapamiento con
+    # filas ajenas al lote se confirmó entre la validación y el INSERT. Las filas
+    # del lote no se solapan entre sí (se validaron juntas), así que los pares
+    # con otra fila del lote se descartan en Python en lugar de enviar los ids
+    # otra vez como parámetros.
+    new = aliased(LaboratoryRequest)
+    other = aliased(LaboratoryRequest)
+    inserted = set(inserted_ids)
+    raced = set()
+    for chunk in chunks(inserted_ids, LOOKUP_CHUNK_SIZE):
+        query = (
+            db.session.query(new.id, other.id)
+            .join(other, and_(
+                other.laboratorio == new.laboratorio,
+                other.fecha_prestamo == new.fecha_prestamo,
+                other.inicio_minutos < new.fin_minutos,
+                other.fin_minutos > new.inicio_minutos,
+                other.id != new.id,
+            ))
+            .filter(new.id.in_(chunk))
+        )
+        raced.update(new_id for new_id, other_id in query if other_id not in inserted)
+    return raced
+
+
+def _insert_batch(batch, results):
+    records = [LaboratoryRequest(user_id=row["user_id"], **row["values"]) for row in batch]
+    try:
+        db.session.add_all(records)
+        db.session.flush()
+        inserted_ids = [record.id for record in records]
+        raced = _find_raced_conflicts(inserted_ids)
+        if raced:
+            db.session.query(LaboratoryRequest).filter(LaboratoryRequest.id.in_(raced)).delete(
+                synchronize_session=False
+            )
+            # El DELETE masivo no pasa por el flush: se recalculan esos días.
+            refresh_occupancy(
+                (record.laboratorio, record.fecha_prestamo) for record in records if record.id in raced
+            )
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        if len(batch) == 1:
+            results[batch[0]["fila"]] = {"estado": "conflicto", "message": "Horario ya reservado"}
+            return
+        # Una fila choca con uq_lab_schedule por una escritura concurrente; se
+        # reintenta en mitades para aislarla sin perder el resto del lote.
+        middle = len(batch) // 2
+        _insert_batch(batch[:middle], results)
+        _insert_batch(batch[middle:], results)
+        return
+
+    for row, record_id in zip(batch, inserted_ids):
+        if record_id in raced:
+            results[row["fila"]] = {"estado": "conflicto", "message": "Horario ya reservado"}
+        else:
+            results[row["fila"]] = {"estado": "creada", "id": record_id}
+    db.session.expunge_all()
+
+
+def import_laboratory_requests():
+    error = require_admin_claim()
+    if error:
+        return error
+
+    data_format = _detect_format()
+    if data_format not in SUPPORTED_FORMATS:
+        return jsonify({
+            "message": "Formato de importación no soportado",
+            "permitidos": list(SUPPORTED_FORMATS),
+        }), 415
+
+    too_large = (jsonify({"message": "Archivo de importación demasiado grande", "maximo_bytes": MAX_IMPORT_BYTES}), 413)
+    if request.content_length is not None and request.content_length > MAX_IMPORT_BYTES:
+        return too_large
+    # Sin Content-Length (transferencia por partes) el límite se aplica al leer.
+    request.max_content_length = MAX_IMPORT_BYTES
+    try:
+        raw_text = request.get_data(as_text=True)
+    except RequestEntityTooLarge:
+        return too_large
+    results = {}
+    candidates = []
+
+    for line_number, payload, parse_error in _parse_rows(raw_text, data_format):
+        if len(results) + len(candidates) >= MAX_IMPORT_ROWS:
+            return jsonify({"message": "Demasiadas filas en la importación", "maximo": MAX_IMPORT_ROWS}), 413
+        if parse_error:
+            results[line_number] = {"estado": "error", **parse_error}
+            continue
+
+        values, validation_error = validate_reservation_payload(payload)
+        if validation_error:
+            results[line_number] = {"estado": "error", **validation_error}
+            continue
+
+        usuario_id = payload.get("usuario_id")
+        if usuario_id not in (None, ""):
+            try:
+                usuario_id = int(usuario_id)
+            except (TypeError, ValueError):
+                results[line_number] = {"estado": "error", "message": "usuario_id inválido"}
+                continue
+        else:
+            usuario_id = None
+
+        candidates.append({"fila": line_number, "values": values, "usuario_id": usuario_id})
+
+    _resolve_users(candidates)
+    occupied = _load_occupied_slots({
+        (row["values"]["laboratorio"], row["values"]["fecha_prestamo"]) for row in candidates
+    })
+
+    accepted = []
+    for row in candidates:
+        if row["user_id"] is None:
+            results[row["fila"]] = {"estado": "error", "message": "Usuario no encontrado"}
+            continue
+        values = row["values"]
+        key = (values["laboratorio"], values["fecha_prestamo"])
+        start, end = values["inicio_minutos"], values["fin_minutos"]
+        if _overlaps(occupied[key], start, end):
+            results[row["fila"]] = {"estado": "conflicto", "message": "Horario ya reservado"}
+            continue
+        # Las filas aceptadas ocupan su horario para las siguientes del mismo lote.
+        occupied[key].append((start, end))
+        accepted.append(row)
+
+    for batch in chunks(accepted, IMPORT_BATCH_SIZE):
+        _insert_batch(batch, results)
+
+    report = [{"fila": line_number, **results[line_number]} for line_number in sorted(results)]
+    summary = defaultdict(int)
+    for entry in report:
+        summary[entry["estado"]] += 1
+
+    return jsonify({
+        "message": "Importación procesada",
+        "resumen": {
+            "creadas": summary["creada"],
+            "conflictos": summary["conflicto"],
+            "errores": summary["error"],
+            "total": len(report),
+        },
+        "resultados": report,
+    }), 200
@@ -1,117 +1,45 @@
-import unicodedata
-from datetime import datetime
+from datetime import timedelta
 
 from flask import jsonify, request
 from flask_jwt_extended import get_jwt_identity
 from sqlalchemy.exc import IntegrityError
 
 from config.options import (
-    CARGO_OPTIONS,
-    CARRERA_OPTIONS,
     DATE_FORMAT,
-    DISCAPACIDAD_OPTIONS,
-    EMAIL_ALLOWED_DOMAINS,
-    EQUIPO_OPTIONS,
-    HORARIO_PATTERN,
-    LABORATORIO_OPTIONS,
-    MAX_ESTUDIANTES,
-    NIVEL_OPTIONS,
+    DEFAULT_FREE_SLOT_RESULTS,
+    FREE_SLOT_SEARCH_HOURS,
+    MAX_FREE_SLOT_RESULTS,
 )
+from controllers.conditional import check_not_modified, with_etag
+from controllers.reservation_validator import RESERVATION_VALIDATOR, error_payload
+from controllers.serialization import SLOT_SERIALIZER, json_list_response
+from controllers.shared import parse_availability_query
 from database import db
 from database.models import LaboratoryRequest, User
-REQUIRED_FIELDS = {
-    "correo_institucional",
-    "nombres_completos",
-    "cargo",
-    "carrera",
-    "nivel",
-    "discapacidad",
-    "materia_motivo",
-    "numero_estudiantes",
-    "fecha_prestamo",
-    "horario_uso",
-    "descripcion_actividades",
-    "laboratorio",
-    "equipo",
-}
-
-
-def _normalize(text_value):
-    normalized = unicodedata.normalize("NFKD", text_value or "")
-    return "".join(char for char in normalized if not unicodedata.combining(char)).strip().upper()
-
-
-def _validate_choice(payload_value, options, field_name):
-    key = _normalize(payload_value)
-    if key not in options:
-        return None, jsonify({
-            "message": f"Valor no permitido para {field_name}",
-            "permitidos": sorted(options.values()),
-        }), 400
-    return options[key], None
-
+from database.occupancy import (
+    SLOT_MINUTES,
+    encode_bitmap,
+    equipment_bitmaps,
+    free_starts,
+    get_bitmaps,
+    is_slot_free,
+)
+from database.schedule import MINUTES_PER_DAY, find_overlapping_request, format_horario
 
-def create_laboratory_request():
-    payload = request.get_json(silent=True) or {}
 
-    missing_fields = REQUIRED_FIELDS.difference(payload.keys())
-    if missing_fields:
-        return jsonify({"message": "Campos requeridos faltantes", "faltantes": sorted(missing_fields)}), 400
+def validate_reservation_payload(payload):
+    values, errors = RESERVATION_VALIDATOR.validate(payload)
+    if errors:
+        return None, error_payload(errors)
+    return values, None
 
-    correo = (payload.get("correo_institucional") or "").lower().strip()
-    if not correo.endswith(EMAIL_ALLOWED_DOMAINS):
-        return jsonify({"message": "Correo institucional inválido", "detalle": "Debe pertenecer a @est.ups.edu.ec o @ups.edu.ec"}), 400
 
-    cargo, error = _validate_choice(payload.get("cargo"), CARGO_OPTIONS, "cargo")
-    if error:
-        return error
-
-    carrera, error = _validate_choice(payload.get("carrera"), CARRERA_OPTIONS, "carrera")
-    if error:
-        return error
-
-    nivel, error = _validate_choice(payload.get("nivel"), NIVEL_OPTIONS, "nivel")
-    if error:
-        return error
-
-    discapacidad, error = _validate_choice(payload.get("discapacidad"), DISCAPACIDAD_OPTIONS, "discapacidad")
-    if error:
-        return error
-
-    laboratorio, error = _validate_choice(payload.get("laboratorio"), LABORATORIO_OPTIONS, "laboratorio")
-    if error:
-        return error
+def create_laboratory_request():
+    payload = request.get_json(silent=True) or {}
 
-    equipo, error = _validate_choice(payload.get("equipo"), EQUIPO_OPTIONS, "equipo")
+    values, error = validate_reservation_payload(payload)
     if error:
-        return error
-
-    nombres = (payload.get("nombres_completos") or "").strip()
-    materia_motivo = (payload.get("materia_motivo") or "").strip()
-    descripcion = (payload.get("descripcion_actividades") or "").strip()
-    horario = (payload.get("horario_uso") or "").strip()
-
-    if not nombres or not materia_motivo or not descripcion or not horario:
-        return jsonify({"message": "Los campos de texto no pueden estar vacíos"}), 400
-
-    if not HORARIO_PATTERN.fullmatch(horario):
-        return jsonify({"message": "Formato de horario inválido", "detalle": "Use HH:MM - HH:MM"}), 400
-
-    try:
-        numero_estudiantes = int(payload.get("numero_estudiantes"))
-    except (TypeError, ValueError):
-        return jsonify({"message": "Número de estudiantes inválido"}), 400
-
-    if numero_estudiantes <= 0:
-        return jsonify({"message": "El número de estudiantes debe ser mayor que cero"}), 400
-
-    if numero_estudiantes > MAX_ESTUDIANTES:
-        return jsonify({"message": "Número de estudiantes excede la capacidad", "maximo": MAX_ESTUDIANTES}), 400
-
-    try:
-        fecha_prestamo = datetime.strptime(payload.get("fecha_prestamo"), DATE_FORMAT).date()
-    except (TypeError, ValueError):
-        return jsonify({"message": "Fecha de préstamo inválida", "detalle": "Use formato d/m/yyyy"}), 400
+        return jsonify(error), 400
 
     identity = get_jwt_identity()
     try:
@@ -119,40 +47,39 @@ def create_laboratory_request():
     except (TypeError, ValueError):
         return jsonify({"message": "Identidad de usuario inválida"}), 401
 
-    user = User.query.get(user_id)
+    user = User.get_active(user_id)
     if not user:
         return jsonify({"message": "Usuario no encontrado"}), 404
 
-    existing_request = LaboratoryRequest.query.filter_by(
-        laboratorio=laboratorio,
-        fecha_prestamo=fecha_prestamo,
-        horario_uso=horario,
-    ).first()
-    if existing_request:
+    # El bitmap del día descarta sin escribir los choques evidentes; la
+    # verificación definitiva sigue siendo la consulta posterior al flush.
+    if not is_slot_free(
+        values["laboratorio"], values["fecha_prestamo"], values["inicio_minutos"], values["fin_minutos"]
+    ):
         return jsonify({
             "message": "Horario ya reservado",
-            "detalle": "Existe una solicitud aprobada para el mismo laboratorio, fecha y horario",
+            "detalle": "Existe una solicitud que se superpone con el mismo laboratorio, fecha y horario",
         }), 409
 
-    request_record = LaboratoryRequest(
-        user_id=user_id,
-        correo_institucional=correo,
-        nombres_completos=nombres,
-        cargo=cargo,
-        carrera=carrera,
-        nivel=nivel,
-        discapacidad=discapacidad,
-        materia_motivo=materia_motivo,
-        numero_estudiantes=numero_estudiantes,
-        fecha_prestamo=fecha_prestamo,
-        horario_uso=horario,
-        descripcion_actividades=descripcion,
-        laboratorio=laboratorio,
-        equipo=equipo,
-    )
+    request_record = LaboratoryRequest(user_id=user_id, **values)
 
     db.session.add(request_record)
     try:
+        # El INSERT toma el bloqueo de escritura de SQLite antes de buscar
+        # solapamientos, así ninguna otra reserva puede confirmarse en medio.
+        db.session.flush()
+        if find_overlapping_request(
+            request_record.laboratorio,
+            request_record.fecha_prestamo,
+            request_record.inicio_minutos,
+            request_record.fin_minutos,
+            exclude_id=request_record.id,
+        ):
+            db.session.rollback()
+            return jsonify({
+                "message": "Horario ya reservado",
+                "detalle": "Existe una solicitud que se superpone con el mismo laboratorio, fecha y horario",
+            }), 409
         db.session.commit()
     except IntegrityError:
         db.session.rollback()
@@ -171,24 +98,170 @@ def list_reserved_laboratories_for_user():
     except (TypeError, ValueError):
         return jsonify({"message": "Acceso permitido solo para usuarios"}), 403
 
-    user = User.query.get(user_id)
-    if not user:
+    # Antes del 304: un usuario eliminado con un ETag en caché debe recibir 404.
+    if not User.get_active(user_id):
         return jsonify({"message": "Usuario no encontrado"}), 404
 
-    reservations = (
-        LaboratoryRequest.query.order_by(
-            LaboratoryRequest.fecha_prestamo.asc(),
-            LaboratoryRequest.horario_uso.asc(),
-        ).all()
+    etag, not_modified = check_not_modified()
+    if not_modified:
+        return not_modified
+
+    rows = (
+        db.session.query(*SLOT_SERIALIZER.columns)
+        .order_by(LaboratoryRequest.fecha_prestamo.asc(), LaboratoryRequest.horario_uso.asc())
+        .all()
     )
 
-    payload = []
-    for reservation in reservations:
-        fecha = reservation.fecha_prestamo.strftime(DATE_FORMAT) if reservation.fecha_prestamo else None
-        payload.append({
-            "laboratorio": reservation.laboratorio,
-            "fecha_prestamo": fecha,
-            "horario_uso": reservation.horario_uso,
-        })
+    return with_etag(json_list_response({"total": len(rows)}, "reservas", SLOT_SERIALIZER, rows), etag)
+
+
+def list_laboratory_availability():
+    identity = get_jwt_identity()
+    try:
+        user_id = int(identity)
+    except (TypeError, ValueError):
+        return jsonify({"message": "Acceso permitido solo para usuarios"}), 403
+
+    query, error = parse_availability_query()
+    if error:
+        return error
+    desde, hasta, laboratorios = query
+
+    if not User.get_active(user_id):
+        return jsonify({"message": "Usuario no encontrado"}), 404
+
+    # El IN sobre el catálogo permite usar ix_laboratory_requests_slot
+    # también cuando no se filtra por laboratorio.
+    rows = (
+        db.session.query(*SLOT_SERIALIZER.columns)
+        .filter(
+            LaboratoryRequest.laboratorio.in_(laboratorios),
+            LaboratoryRequest.fecha_prestamo >= desde,
+            LaboratoryRequest.fecha_prestamo <= hasta,
+        )
+        .order_by(LaboratoryRequest.fecha_prestamo.asc(), LaboratoryRequest.horario_uso.asc())
+        .all()
+    )
+
+    return json_list_response({
+        "total": len(rows),
+        "desde": desde.strftime(DATE_FORMAT),
+        "hasta": hasta.strftime(DATE_FORMAT),
+    }, "reservas", SLOT_SERIALIZER, rows)
+
+
+def list_laboratory_occupancy():
+    identity = get_jwt_identity()
+    try:
+        user_id = int(identity)
+    except (TypeError, ValueError):
+        return jsonify({"message": "Acceso permitido solo para usuarios"}), 403
+
+    query, error = parse_availability_query()
+    if error:
+        return error
+    desde, hasta, laboratorios = query
+
+    if not User.get_active(user_id):
+        return jsonify({"message": "Usuario no encontrado"}), 404
+
+    # Un bitmap por laboratorio y día con reservas: el bit i (de menor a mayor
+    # peso) marca el bloque que empieza en el minuto i * resolucion_minutos.
+    bitmaps = get_bitmaps(laboratorios, desde, hasta)
+    payload = [
+        {
+            "laboratorio": laboratorio,
+            "fecha_prestamo": fecha.strftime(DATE_FORMAT),
+            "bitmap": encode_bitmap(bitmap).hex(),
+        }
+        for (laboratorio, fecha), bitmap in sorted(bitmaps.items(), key=lambda item: (item[0][1], item[0][0]))
+    ]
+
+    return jsonify({
+        "ocupacion": payload,
+        "resolucion_minutos": SLOT_MINUTES,
+        "desde": desde.strftime(DATE_FORMAT),
+        "hasta": hasta.strftime(DATE_FORMAT),
+    }), 200
+
+
+def _parse_positive_int(field_name, default, maximum):
+    raw = request.args.get(field_name)
+    if raw is None or raw == "":
+        if default is None:
+            return None, (jsonify({"message": f"Parámetro {field_name} requerido"}), 400)
+        return default, None
+    try:
+        value = int(raw)
+    except ValueError:
+        value = 0
+    if not 0 < value <= maximum:
+        return None, (jsonify({"message": f"Parámetro {field_name} inválido", "maximo": maximum}), 400)
+    return value, None
+
+
+def search_free_slots():
+    identity = get_jwt_identity()
+    try:
+        user_id = int(identity)
+    except (TypeError, ValueError):
+        return jsonify({"message": "Acceso permitido solo para usuarios"}), 403
+
+    query, error = parse_availability_query()
+    if error:
+        return error
+    desde, hasta, laboratorios = query
+
+    duracion, error = _parse_positive_int("duracion", None, MINUTES_PER_DAY)
+    if error:
+        return error
+    limite, error = _parse_positive_int("limite", DEFAULT_FREE_SLOT_RESULTS, MAX_FREE_SLOT_RESULTS)
+    if error:
+        return error
+
+    # numero_estudiantes, equipo y franja se validan con las mismas reglas que
+    # el formulario de reserva.
+    filters = {"horario_uso": request.args.get("franja") or FREE_SLOT_SEARCH_HOURS}
+    for field in ("numero_estudiantes", "equipo"):
+        if request.args.get(field):
+            filters[field] = request.args.get(field)
+    values, errors = RESERVATION_VALIDATOR.validate(filters, partial=True)
+    if errors:
+        return jsonify(error_payload(errors)), 400
+    window_start, window_end = values["inicio_minutos"], values["fin_minutos"]
+
+    if not User.get_active(user_id):
+        return jsonify({"message": "Usuario no encontrado"}), 404
 
-    return jsonify({"reservas": payload, "total": len(payload)}), 200
+    # Dos consultas en total sin importar el rango: los bitmaps de ocupación de
+    # los laboratorios y, si se pide un equipo, los tramos en que ya está prestado.
+    occupancy = get_bitmaps(laboratorios, desde, hasta)
+    equipo = values.get("equipo")
+    busy_equipment = equipment_bitmaps(equipo, desde, hasta) if equipo and equipo != "Ninguno" else {}
+
+    candidates = []
+    fecha = desde
+    while fecha <= hasta and len(candidates) < limite:
+        equipment_mask = busy_equipment.get(fecha, 0)
+        day = sorted(
+            (start, position, laboratorio)
+            for position, laboratorio in enumerate(laboratorios)
+            for start in free_starts(
+                occupancy.get((laboratorio, fecha), 0) | equipment_mask, duracion, window_start, window_end
+            )
+        )
+        for start, _position, laboratorio in day[:limite - len(candidates)]:
+            candidates.append({
+                "laboratorio": laboratorio,
+                "fecha_prestamo": fecha.strftime(DATE_FORMAT),
+                "horario_uso": format_horario(start, start + duracion),
+            })
+        fecha += timedelta(days=1)
+
+    return jsonify({
+        "candidatos": candidates,
+        "total": len(candidates),
+        "duracion_minutos": duracion,
+        "desde": desde.strftime(DATE_FORMAT),
+        "hasta": hasta.strftime(DATE_FORMAT),
+    }), 200
@@ -0,0 +1,100 @@
+import base64
+import binascii
+from datetime import datetime
+
+from flask import jsonify, request
+from sqlalchemy import and_, func, or_, text
+
+from config.options import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from database import db
+
+TOTAL_MODES = ("estimado", "exacto", "ninguno")
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_raw, row_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_raw), int(row_id)
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise CursorError(str(exc)) from exc
+
+
+def parse_page_args():
+    try:
+        limit = int(request.args.get("limite", DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return None, (jsonify({"message": "Parámetro limite inválido"}), 400)
+    if limit <= 0:
+        return None, (jsonify({"message": "Parámetro limite inválido"}), 400)
+
+    cursor = None
+    token = request.args.get("cursor")
+    if token:
+        try:
+            cursor = decode_cursor(token)
+        except CursorError:
+            return None, (jsonify({"message": "Cursor inválido"}), 400)
+
+    total_mode = request.args.get("total", "estimado").lower()
+    if total_mode not in TOTAL_MODES:
+        return None, (jsonify({"message": "Parámetro total inválido", "permitidos": list(TOTAL_MODES)}), 400)
+
+    return {"limit": min(limit, MAX_PAGE_SIZE), "cursor": cursor, "total": total_mode}, None
+
+
+def keyset_page(query, model, limit, cursor=None):
+    # Orden (created_at DESC, id DESC) resuelto con el índice compuesto del modelo;
+    # se pide una fila extra para saber si hay página siguiente sin contar.
+    if cursor is not None:
+        created_at, row_id = cursor
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id),
+        ))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+def _analyzed_row_count(table_name):
+    # Filas de la tabla según el último ANALYZE: el primer número de cada fila
+    # de sqlite_stat1 es el total de entradas del índice (o de la tabla). None
+    # si la base no es SQLite o la tabla nunca se analizó.
+    if db.engine.dialect.name != "sqlite":
+        return None
+    connection = db.session.connection()
+    if connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first() is None:
+        return None
+    counts = [
+        int(stat.split()[0])
+        for (stat,) in connection.execute(text("SELECT stat FROM sqlite_stat1 WHERE tbl = :tbl"), {"tbl": table_name})
+        if stat and stat.split()[0].isdigit()
+    ]
+    return max(counts) if counts else None
+
+
+def count_total(model, mode, *criteria):
+    # Devuelve (total, es_estimado). `criteria` restringe las filas contadas
+    # (p. ej. excluir usuarios eliminados); sqlite_stat1 no sabe filtrar, así que
+    # con criterios o sin estadísticas el modo "estimado" cuenta de verdad.
+    if mode == "ninguno":
+        return None, False
+    if mode == "estimado" and not criteria:
+        estimate = _analyzed_row_count(model.__tablename__)
+        if estimate is not None:
+            return estimate, True
+    return db.session.query(func.count(model.id)).filter(*criteria).scalar() or 0, False
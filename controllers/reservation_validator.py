@@ -0,0 +1,180 @@
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+
+from config.options import (
+    CARGO_OPTIONS,
+    CARRERA_OPTIONS,
+    DATE_FORMAT,
+    DISCAPACIDAD_OPTIONS,
+    EMAIL_ALLOWED_DOMAINS,
+    EQUIPO_OPTIONS,
+    HORARIO_PATTERN,
+    LABORATORIO_OPTIONS,
+    MAX_ESTUDIANTES,
+    NIVEL_OPTIONS,
+)
+from database.schedule import format_horario, parse_horario
+
+REQUIRED_FIELDS = frozenset({
+    "correo_institucional",
+    "nombres_completos",
+    "cargo",
+    "carrera",
+    "nivel",
+    "discapacidad",
+    "materia_motivo",
+    "numero_estudiantes",
+    "fecha_prestamo",
+    "horario_uso",
+    "descripcion_actividades",
+    "laboratorio",
+    "equipo",
+})
+
+CHOICE_FIELDS = (
+    ("cargo", CARGO_OPTIONS),
+    ("carrera", CARRERA_OPTIONS),
+    ("nivel", NIVEL_OPTIONS),
+    ("discapacidad", DISCAPACIDAD_OPTIONS),
+    ("laboratorio", LABORATORIO_OPTIONS),
+    ("equipo", EQUIPO_OPTIONS),
+)
+
+TEXT_FIELDS = ("nombres_completos", "materia_motivo", "descripcion_actividades")
+
+# Mensajes fijos; se comparten entre respuestas porque jsonify no los modifica.
+INVALID_EMAIL_ERROR = {
+    "message": "Correo institucional inválido",
+    "detalle": "Debe pertenecer a @est.ups.edu.ec o @ups.edu.ec",
+}
+EMPTY_TEXT_ERROR = {"message": "Los campos de texto no pueden estar vacíos"}
+INVALID_HORARIO_ERROR = {"message": "Formato de horario inválido", "detalle": "Use HH:MM - HH:MM"}
+INVALID_NUMERO_ERROR = {"message": "Número de estudiantes inválido"}
+NON_POSITIVE_NUMERO_ERROR = {"message": "El número de estudiantes debe ser mayor que cero"}
+EXCEEDED_NUMERO_ERROR = {"message": "Número de estudiantes excede la capacidad", "maximo": MAX_ESTUDIANTES}
+INVALID_FECHA_ERROR = {"message": "Fecha de préstamo inválida", "detalle": "Use formato d/m/yyyy"}
+MISSING_FIELD_ERROR = {"message": "Campo requerido"}
+
+
+@lru_cache(maxsize=1024)
+def fold_choice(value):
+    normalized = unicodedata.normalize("NFKD", value)
+    return "".join(char for char in normalized if not unicodedata.combining(char)).strip().upper()
+
+
+class ReservationValidator:
+    def __init__(self, choice_fields):
+        self._lookups = {}
+        self._choice_errors = {}
+        for field, options in choice_fields:
+            lookup = {}
+            for key, label in options.items():
+                # Se aceptan la clave, la etiqueta visible y sus formas sin tildes.
+                for alias in (key, label):
+                    lookup[alias] = label
+                    lookup[alias.upper()] = label
+                    lookup[fold_choice(alias)] = label
+            self._lookups[field] = lookup
+            self._choice_errors[field] = {
+                "message": f"Valor no permitido para {field}",
+                "permitidos": sorted(options.values()),
+            }
+
+    def choice(self, field, value):
+        lookup = self._lookups[field]
+        if not isinstance(value, str):
+            return None, self._choice_errors[field]
+        label = lookup.get(value) or lookup.get(value.strip().upper())
+        if label is None and not value.isascii():
+            label = lookup.get(fold_choice(value))
+        if label is None:
+            return None, self._choice_errors[field]
+        return label, None
+
+    def validate(self, payload, partial=False):
+        # Recorre todos los campos y devuelve (valores, errores por campo); en modo
+        # parcial solo se validan los campos presentes, como en las ediciones.
+        values = {}
+        errors = {}
+
+        missing = [] if partial else sorted(REQUIRED_FIELDS.difference(payload.keys()))
+        for field in missing:
+            errors[field] = MISSING_FIELD_ERROR
+
+        if "correo_institucional" in payload:
+            correo = str(payload.get("correo_institucional") or "").lower().strip()
+            if correo.endswith(EMAIL_ALLOWED_DOMAINS):
+                values["correo_institucional"] = correo
+            else:
+                errors["correo_institucional"] = INVALID_EMAIL_ERROR
+
+        for field, _options in CHOICE_FIELDS:
+            if field not in payload:
+                continue
+            label, error = self.choice(field, payload.get(field))
+            if error:
+                errors[field] = error
+            else:
+                values[field] = label
+
+        for field in TEXT_FIELDS:
+            if field not in payload:
+                continue
+            text = str(payload.get(field) or "").strip()
+            if text:
+                values[field] = text
+            elif not partial:
+                errors[field] = EMPTY_TEXT_ERROR
+
+        if "horario_uso" in payload:
+            horario = str(payload.get("horario_uso") or "").strip()
+            if not horario and not partial:
+                errors["horario_uso"] = EMPTY_TEXT_ERROR
+            elif not HORARIO_PATTERN.fullmatch(horario):
+                errors["horario_uso"] = INVALID_HORARIO_ERROR
+            else:
+                try:
+                    inicio_minutos, fin_minutos = parse_horario(horario)
+                except ValueError as exc:
+                    errors["horario_uso"] = {"message": "Formato de horario inválido", "detalle": str(exc)}
+                else:
+                    values["horario_uso"] = format_horario(inicio_minutos, fin_minutos)
+                    values["inicio_minutos"] = inicio_minutos
+                    values["fin_minutos"] = fin_minutos
+
+        if "numero_estudiantes" in payload:
+            try:
+                numero_estudiantes = int(payload.get("numero_estudiantes"))
+            except (TypeError, ValueError):
+                errors["numero_estudiantes"] = INVALID_NUMERO_ERROR
+            else:
+                if numero_estudiantes <= 0:
+                    errors["numero_estudiantes"] = NON_POSITIVE_NUMERO_ERROR
+                elif numero_estudiantes > MAX_ESTUDIANTES:
+                    errors["numero_estudiantes"] = EXCEEDED_NUMERO_ERROR
+                else:
+                    values["numero_estudiantes"] = numero_estudiantes
+
+        if "fecha_prestamo" in payload:
+            try:
+                values["fecha_prestamo"] = datetime.strptime(payload.get("fecha_prestamo"), DATE_FORMAT).date()
+            except (TypeError, ValueError):
+                errors["fecha_prestamo"] = INVALID_FECHA_ERROR
+
+        return values, errors
+
+
+def error_payload(errors):
+    # Mantiene en el nivel superior el primer error (forma de respuesta previa)
+    # y agrega el detalle completo en "errores".
+    missing = [field for field, error in errors.items() if error is MISSING_FIELD_ERROR]
+    if missing:
+        body = {"message": "Campos requeridos faltantes", "faltantes": sorted(missing)}
+    else:
+        body = dict(next(iter(errors.values())))
+    body["errores"] = errors
+    return body
+
+
+RESERVATION_VALIDATOR = ReservationValidator(CHOICE_FIELDS)
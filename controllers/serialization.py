@@ -0,0 +1,138 @@
+import json
+from json.encoder import encode_basestring_ascii
+
+from flask import current_app
+
+from config.options import DATE_FORMAT
+from database.models import LaboratoryRequest, User
+
+# Tope de fragmentos memorizados por columna; las columnas de catálogo
+# (laboratorio, carrera, equipo...) tienen pocas decenas de valores distintos.
+MEMO_MAX_ENTRIES = 4096
+_MASK_PADDING = tuple("X" * length for length in range(64))
+
+
+def encode_int(value):
+    return "null" if value is None else str(value)
+
+
+def encode_text(value):
+    return "null" if value is None else encode_basestring_ascii(value)
+
+
+class Memoized:
+    # Para columnas que repiten pocos valores: cada valor se codifica una vez
+    # por serialización.
+    def __init__(self, encode):
+        self.encode = encode
+
+    def bind(self):
+        cache = {}
+        encode = self.encode
+
+        def encoder(value):
+            fragment = cache.get(value)
+            if fragment is None:
+                fragment = encode(value)
+                if len(cache) < MEMO_MAX_ENTRIES:
+                    cache[value] = fragment
+            return fragment
+
+        return encoder
+
+
+def encode_iso(value):
+    return "null" if value is None else f'"{value.isoformat()}"'
+
+
+def encode_date_display(value):
+    return "null" if value is None else f'"{value.strftime(DATE_FORMAT)}"'
+
+
+def encode_masked_cedula(value):
+    # Igual que mask_cedula(), con el relleno de X precalculado.
+    cleaned = (value or "").strip()
+    length = len(cleaned)
+    if length <= 3:
+        return encode_basestring_ascii(cleaned)
+    padding = _MASK_PADDING[length - 3] if length - 3 < len(_MASK_PADDING) else "X" * (length - 3)
+    return encode_basestring_ascii(f"{cleaned[:2]}{padding}{cleaned[-1]}")
+
+
+CHOICE = Memoized(encode_text)
+DATE_ISO = Memoized(encode_iso)
+DATE_DISPLAY = Memoized(encode_date_display)
+
+
+class RowSerializer:
+    # Convierte tuplas de columnas en JSON sin pasar por objetos del ORM ni por
+    # dicts intermedios. Cada campo es (clave, columna, codificador) y la fila
+    # se arma con una sola plantilla %; `constants` agrega claves fijas.
+    def __init__(self, fields, constants=None):
+        self.names = tuple(name for name, _column, _encoder in fields)
+        self.columns = tuple(column for _name, column, _encoder in fields)
+        self._encoders = tuple(encoder for _name, _column, encoder in fields)
+        parts = [f"{encode_basestring_ascii(name)}:%s" for name in self.names]
+        for name, value in (constants or {}).items():
+            fragment = f"{encode_basestring_ascii(name)}:{json.dumps(value)}"
+            parts.append(fragment.replace("%", "%%"))
+        self._template = "{" + ",".join(parts) + "}"
+
+    def encode_rows(self, rows):
+        encoders = tuple(
+            encoder.bind() if isinstance(encoder, Memoized) else encoder for encoder in self._encoders
+        )
+        template = self._template
+        return "[" + ",".join(
+            template % tuple([encode(value) for encode, value in zip(encoders, row)]) for row in rows
+        ) + "]"
+
+
+def json_list_response(envelope, key, serializer, rows, status=200):
+    # El resto del cuerpo (totales, cursor) se codifica con json.dumps y la lista
+    # se inserta ya serializada.
+    head = json.dumps(envelope, separators=(",", ":"))
+    separator = "," if envelope else ""
+    body = f"{head[:-1]}{separator}{encode_basestring_ascii(key)}:{serializer.encode_rows(rows)}}}"
+    return current_app.response_class(body, status=status, mimetype="application/json")
+
+
+USER_LIST_SERIALIZER = RowSerializer(
+    (
+        ("id", User.id, encode_int),
+        ("nombre", User.nombre, encode_text),
+        ("apellido", User.apellido, encode_text),
+        ("correo", User.correo, encode_text),
+        ("cedula", User.cedula, encode_masked_cedula),
+        ("carrera", User.carrera, CHOICE),
+        ("created_at", User.created_at, encode_iso),
+    ),
+    constants={"password": "********"},
+)
+
+# Mismas claves que LaboratoryRequest.to_dict().
+RESERVATION_SERIALIZER = RowSerializer((
+    ("id", LaboratoryRequest.id, encode_int),
+    ("usuario_id", LaboratoryRequest.user_id, encode_int),
+    ("correo_institucional", LaboratoryRequest.correo_institucional, encode_text),
+    ("nombres_completos", LaboratoryRequest.nombres_completos, encode_text),
+    ("cargo", LaboratoryRequest.cargo, CHOICE),
+    ("carrera", LaboratoryRequest.carrera, CHOICE),
+    ("nivel", LaboratoryRequest.nivel, CHOICE),
+    ("discapacidad", LaboratoryRequest.discapacidad, CHOICE),
+    ("materia_motivo", LaboratoryRequest.materia_motivo, encode_text),
+    ("numero_estudiantes", LaboratoryRequest.numero_estudiantes, encode_int),
+    ("fecha_prestamo", LaboratoryRequest.fecha_prestamo, DATE_ISO),
+    ("horario_uso", LaboratoryRequest.horario_uso, CHOICE),
+    ("descripcion_actividades", LaboratoryRequest.descripcion_actividades, encode_text),
+    ("laboratorio", LaboratoryRequest.laboratorio, CHOICE),
+    ("equipo", LaboratoryRequest.equipo, CHOICE),
+    ("created_at", LaboratoryRequest.created_at, encode_iso),
+))
+
+# Vista reducida de los horarios ocupados (reservas y disponibilidad).
+SLOT_SERIALIZER = RowSerializer((
+    ("laboratorio", LaboratoryRequest.laboratorio, CHOICE),
+    ("fecha_prestamo", LaboratoryRequest.fecha_prestamo, DATE_DISPLAY),
+    ("horario_uso", LaboratoryRequest.horario_uso, CHOICE),
+))
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt
+
+from config.options import DATE_FORMAT, LABORATORIO_OPTIONS, MAX_AVAILABILITY_WINDOW_DAYS
+from controllers.reservation_validator import RESERVATION_VALIDATOR
+
+# Límite de parámetros por sentencia IN para no rozar SQLITE_MAX_VARIABLE_NUMBER.
+LOOKUP_CHUNK_SIZE = 400
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def require_admin_claim():
+    claims = get_jwt()
+    if not claims.get("is_admin"):
+        return jsonify({"message": "Acceso solo para administradores"}), 403
+    return None
+
+
+def parse_query_date(field_name):
+    try:
+        return datetime.strptime(request.args.get(field_name) or "", DATE_FORMAT).date(), None
+    except ValueError:
+        return None, (jsonify({
+            "message": f"Parámetro {field_name} inválido",
+            "detalle": "Use formato d/m/yyyy",
+        }), 400)
+
+
+def parse_availability_query():
+    # Devuelve (desde, hasta, laboratorios) o la respuesta de error.
+    desde, error = parse_query_date("desde")
+    if error:
+        return None, error
+    hasta, error = parse_query_date("hasta")
+    if error:
+        return None, error
+
+    if hasta < desde:
+        return None, (jsonify({"message": "Rango de fechas inválido", "detalle": "hasta debe ser posterior a desde"}), 400)
+    if (hasta - desde).days > MAX_AVAILABILITY_WINDOW_DAYS:
+        return None, (jsonify({"message": "Rango de fechas demasiado amplio", "maximo_dias": MAX_AVAILABILITY_WINDOW_DAYS}), 400)
+
+    if request.args.get("laboratorio"):
+        laboratorio, error = RESERVATION_VALIDATOR.choice("laboratorio", request.args.get("laboratorio"))
+        if error:
+            return None, (jsonify(error), 400)
+        laboratorios = [laboratorio]
+    else:
+        laboratorios = list(LABORATORIO_OPTIONS.values())
+    return (desde, hasta, laboratorios), None
@@ -0,0 +1,151 @@
+import threading
+from datetime import timedelta
+
+from flask import current_app, jsonify, request
+from sqlalchemy import func
+
+from config.options import DATE_FORMAT, STATS_CACHE_MAX_ENTRIES
+from controllers.conditional import check_not_modified, with_etag
+from controllers.shared import parse_availability_query, require_admin_claim
+from database import db
+from database.data_version import RESERVATIONS_SCOPE, get_data_version
+from database.models import LaboratoryRequest
+
+EXTENSION_KEY = "stats_cache"
+PERIODS = ("dia", "semana")
+GROUPINGS = (
+    ("por_laboratorio", "laboratorio", LaboratoryRequest.laboratorio),
+    ("por_carrera", "carrera", LaboratoryRequest.carrera),
+    ("por_equipo", "equipo", LaboratoryRequest.equipo),
+)
+
+
+# Resultados por combinación de parámetros, válidos mientras no cambie la
+# versión de datos de las reservas (uno por proceso, como la blocklist).
+class StatsCache:
+    def __init__(self, max_entries=STATS_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def put(self, key, version, payload):
+        with self._lock:
+            self._entries.pop(key, None)
+            if len(self._entries) >= self.max_entries:
+                # Las entradas de versiones anteriores ya no sirven; si no hay,
+                # se descarta la más antigua.
+                stale = [cached for cached, (cached_version, _) in self._entries.items() if cached_version != version]
+                for cached in stale or [next(iter(self._entries))]:
+                    del self._entries[cached]
+            self._entries[key] = (version, payload)
+
+
+def get_stats_cache():
+    cache = current_app.extensions.get(EXTENSION_KEY)
+    if cache is None:
+        cache = current_app.extensions[EXTENSION_KEY] = StatsCache()
+    return cache
+
+
+def _totals(reservas, minutos, minutos_estudiante):
+    return {
+        "reservas": reservas,
+        "horas_reservadas": round((minutos or 0) / 60, 2),
+        "horas_estudiante": round((minutos_estudiante or 0) / 60, 2),
+    }
+
+
+def _grouped(key_column, filters):
+    duration = LaboratoryRequest.fin_minutos - LaboratoryRequest.inicio_minutos
+    return (
+        db.session.query(
+            key_column,
+            func.count(LaboratoryRequest.id),
+            func.sum(duration),
+            func.sum(duration * LaboratoryRequest.numero_estudiantes),
+        )
+        .filter(*filters)
+        .group_by(key_column)
+        .order_by(key_column)
+        .all()
+    )
+
+
+def _period_rows(day_rows, period):
+    # La agrupación por semana (lunes a domingo) se arma sobre el GROUP BY por
+    # día, que devuelve como mucho una fila por fecha del rango.
+    if period == "dia":
+        return [(fecha, *sums) for fecha, *sums in day_rows]
+    weeks = {}
+    for fecha, reservas, minutos, minutos_estudiante in day_rows:
+        monday = fecha - timedelta(days=fecha.weekday())
+        totals = weeks.setdefault(monday, [0, 0, 0])
+        totals[0] += reservas
+        totals[1] += minutos or 0
+        totals[2] += minutos_estudiante or 0
+    return [(monday, *totals) for monday, totals in sorted(weeks.items())]
+
+
+def _compute_stats(desde, hasta, laboratorios, period):
+    # El IN sobre el catálogo permite usar ix_laboratory_requests_slot igual
+    # que en /api/auth/laboratory/availability.
+    filters = (
+        LaboratoryRequest.laboratorio.in_(laboratorios),
+        LaboratoryRequest.fecha_prestamo >= desde,
+        LaboratoryRequest.fecha_prestamo <= hasta,
+    )
+    payload = {}
+    for section, label, column in GROUPINGS:
+        payload[section] = [{label: key, **_totals(*sums)} for key, *sums in _grouped(column, filters)]
+
+    day_rows = _grouped(LaboratoryRequest.fecha_prestamo, filters)
+    payload["por_periodo"] = [
+        {"periodo": fecha.strftime(DATE_FORMAT), **_totals(*sums)}
+        for fecha, *sums in _period_rows(day_rows, period)
+    ]
+    payload["totales"] = _totals(
+        sum(row[1] for row in day_rows),
+        sum(row[2] or 0 for row in day_rows),
+        sum(row[3] or 0 for row in day_rows),
+    )
+    return payload
+
+
+def laboratory_stats():
+    error = require_admin_claim()
+    if error:
+        return error
+
+    query, error = parse_availability_query()
+    if error:
+        return error
+    desde, hasta, laboratorios = query
+
+    period = request.args.get("periodo") or "semana"
+    if period not in PERIODS:
+        return jsonify({"message": "Parámetro periodo inválido", "permitidos": list(PERIODS)}), 400
+
+    etag, not_modified = check_not_modified(RESERVATIONS_SCOPE)
+    if not_modified is not None:
+        return not_modified
+
+    cache = get_stats_cache()
+    version = get_data_version(RESERVATIONS_SCOPE)
+    key = (desde, hasta, tuple(laboratorios), period)
+    payload = cache.get(key, version)
+    if payload is None:
+        payload = _compute_stats(desde, hasta, laboratorios, period)
+        cache.put(key, version, payload)
+
+    return with_etag((jsonify({
+        **payload,
+        "periodo": period,
+        "desde": desde.strftime(DATE_FORMAT),
+        "hasta": hasta.strftime(DATE_FORMAT),
+    }), 200), etag)
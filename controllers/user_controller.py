@@ -3,8 +3,10 @@ import re
 from flask import jsonify, request
 from flask_jwt_extended import create_access_token, get_jwt, jwt_required
 
-from database import bcrypt, db
-from database.models import RevokedToken, User
+from config.hashing import get_password_hasher
+from database import db
+from database.models import User
+from database.token_blocklist import revoke_token
 
 EMAIL_ALLOWED_DOMAINS = ("@est.ups.edu.ec", "@ups.edu.ec")
 PASSWORD_PATTERN = re.compile(r"^(?=.*[A-Za-z])(?=.*\d)[A-Za-z\d]{8,12}$")
@@ -39,7 +41,7 @@ def register_user():
     if existing_user:
         return jsonify({"message": "El correo ya está registrado"}), 409
 
-    password_hash = bcrypt.generate_password_hash(contrasena, rounds=10).decode("utf-8")
+    password_hash = get_password_hasher().hash(contrasena)
 
     user = User(
         nombre=payload.get("nombre").strip(),
@@ -65,13 +67,18 @@ def login_user():
     if not correo or not contrasena:
         return jsonify({"message": "Correo y contraseña son requeridos"}), 400
 
-    user = User.query.filter_by(correo=correo).first()
+    user = User.active().filter_by(correo=correo).first()
     if not user:
         return jsonify({"message": "Credenciales inválidas"}), 401
 
-    if not bcrypt.check_password_hash(user.password_hash, contrasena):
+    password_hasher = get_password_hasher()
+    if not password_hasher.check(user.password_hash, contrasena):
         return jsonify({"message": "Credenciales inválidas"}), 401
 
+    if password_hasher.needs_rehash(user.password_hash):
+        user.password_hash = password_hasher.hash(contrasena)
+        db.session.commit()
+
     additional_claims = {
         "correo": user.correo,
         "nombre": user.nombre,
@@ -87,8 +94,6 @@ def login_user():
 
 @jwt_required()
 def logout_user():
-    jti = get_jwt().get("jti")
-    revoked = RevokedToken(jti=jti)
-    db.session.add(revoked)
-    db.session.commit()
+    claims = get_jwt()
+    revoke_token(claims.get("jti"), claims.get("exp"))
     return jsonify({"message": "Sesión cerrada"}), 200
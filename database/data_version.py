@@ -0,0 +1,65 @@
+from sqlalchemy import event, insert, update
+
+from database import db
+from database.models import DataVersion, LaboratoryRequest, RevokedToken
+
+RESERVATIONS_SCOPE = "reservas"
+REVOKED_TOKENS_SCOPE = "tokens_revocados"
+
+# Modelos cuyo cambio invalida cada ámbito versionado.
+_SCOPE_MODELS = {
+    RESERVATIONS_SCOPE: (LaboratoryRequest,),
+    REVOKED_TOKENS_SCOPE: (RevokedToken,),
+}
+
+
+def get_data_version(scope=RESERVATIONS_SCOPE):
+    version = db.session.query(DataVersion.version).filter(DataVersion.nombre == scope).scalar()
+    return version or 0
+
+
+def bump_data_version(connection, scope=RESERVATIONS_SCOPE):
+    # Se ejecuta sobre la conexión de la sesión, dentro de la misma transacción
+    # que el cambio: si este se revierte, la versión también.
+    table = DataVersion.__table__
+    result = connection.execute(
+        update(table).where(table.c.nombre == scope).values(version=table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(nombre=scope, version=1))
+
+
+def _scopes_touched_by(instances):
+    touched = set()
+    for instance in instances:
+        for scope, models in _SCOPE_MODELS.items():
+            if isinstance(instance, models):
+                touched.add(scope)
+    return touched
+
+
+def _after_flush(session, _flush_context):
+    changed = list(session.new) + list(session.deleted)
+    changed.extend(instance for instance in session.dirty if session.is_modified(instance))
+    for scope in _scopes_touched_by(changed):
+        bump_data_version(session.connection(), scope)
+
+
+def _do_orm_execute(orm_execute_state):
+    # INSERT/UPDATE/DELETE masivos (query.delete(), update(Model)...) no pasan por
+    # el flush, así que se capturan aquí.
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    for scope, models in _SCOPE_MODELS.items():
+        if issubclass(mapper.class_, models):
+            bump_data_version(orm_execute_state.session.connection(), scope)
+
+
+def install_data_version_tracking():
+    if event.contains(db.session, "after_flush", _after_flush):
+        return
+    event.listen(db.session, "after_flush", _after_flush)
+    event.listen(db.session, "do_orm_execute", _do_orm_execute)
@@ -0,0 +1,120 @@
+import os
+
+from sqlalchemy import event
+
+SQLITE_PROFILES = {
+    # Comportamiento histórico: modo rollback-journal y valores por defecto de SQLite.
+    "legacy": {
+        "journal_mode": None,
+        "busy_timeout": None,
+        "synchronous": None,
+        "cache_size": None,
+        "mmap_size": None,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+    },
+    # WAL permite lectores concurrentes con un escritor; busy_timeout hace que los
+    # escritores esperen el bloqueo en vez de fallar con "database is locked".
+    "production": {
+        "journal_mode": "WAL",
+        "busy_timeout": 5000,
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 134217728,
+        "pool_size": 8,
+        "max_overflow": 8,
+        "pool_timeout": 10,
+    },
+}
+DEFAULT_SQLITE_PROFILE = "production"
+
+_ENV_OVERRIDES = {
+    "journal_mode": ("SQLITE_JOURNAL_MODE", str),
+    "busy_timeout": ("SQLITE_BUSY_TIMEOUT_MS", int),
+    "synchronous": ("SQLITE_SYNCHRONOUS", str),
+    "cache_size": ("SQLITE_CACHE_SIZE", int),
+    "mmap_size": ("SQLITE_MMAP_SIZE", int),
+    "pool_size": ("DB_POOL_SIZE", int),
+    "max_overflow": ("DB_MAX_OVERFLOW", int),
+    "pool_timeout": ("DB_POOL_TIMEOUT", int),
+}
+_SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+_JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+
+
+def resolve_sqlite_profile(name=None, environ=None):
+    environ = os.environ if environ is None else environ
+    name = (name or environ.get("SQLITE_PROFILE") or DEFAULT_SQLITE_PROFILE).lower()
+    if name not in SQLITE_PROFILES:
+        raise ValueError(f"Perfil SQLite desconocido: {name}")
+
+    profile = dict(SQLITE_PROFILES[name], name=name)
+    for key, (env_name, cast) in _ENV_OVERRIDES.items():
+        raw = environ.get(env_name)
+        if raw not in (None, ""):
+            profile[key] = cast(raw)
+
+    if profile["synchronous"] and profile["synchronous"].upper() not in _SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Nivel synchronous inválido: {profile['synchronous']}")
+    if profile["journal_mode"] and profile["journal_mode"].upper() not in _JOURNAL_MODES:
+        raise ValueError(f"journal_mode inválido: {profile['journal_mode']}")
+    return profile
+
+
+def _is_sqlite_memory(database_url):
+    return database_url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in database_url
+
+
+def engine_options_for(profile, database_url):
+    # Las bases en memoria usan un pool de un solo hilo que no acepta estos tamaños.
+    if not database_url.startswith("sqlite") or _is_sqlite_memory(database_url):
+        return {}
+    return {
+        "pool_size": profile["pool_size"],
+        "max_overflow": profile["max_overflow"],
+        "pool_timeout": profile["pool_timeout"],
+    }
+
+
+def _pragma_statements(profile):
+    statements = []
+    if profile["busy_timeout"] is not None:
+        statements.append(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+    if profile["journal_mode"]:
+        statements.append(f"PRAGMA journal_mode = {profile['journal_mode'].upper()}")
+    if profile["synchronous"]:
+        statements.append(f"PRAGMA synchronous = {profile['synchronous'].upper()}")
+    if profile["cache_size"] is not None:
+        statements.append(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+    if profile["mmap_size"] is not None:
+        statements.append(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+    return statements
+
+
+def apply_sqlite_profile(engine, profile):
+    if engine.dialect.name != "sqlite":
+        return
+    statements = _pragma_statements(profile)
+    if not statements:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def begin_immediate(session):
+    # pysqlite abre la transacción recién con el primer INSERT/UPDATE/DELETE; con
+    # BEGIN IMMEDIATE el bloqueo de escritura se toma antes de leer, así lo que
+    # se valida en Python no puede cambiar hasta el commit.
+    connection = session.connection()
+    if connection.dialect.name != "sqlite":
+        return
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
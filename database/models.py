@@ -37,6 +37,10 @@ class Admin(db.Model):
 
 class User(db.Model):
     __tablename__ = "users"
+    __table_args__ = (
+        db.Index("ix_users_created_at_id", "created_at", "id"),
+        db.Index("ix_users_eliminado_en", "eliminado_en"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
@@ -46,6 +50,16 @@ class User(db.Model):
     cedula = db.Column(db.String(20), nullable=False)
     carrera = db.Column(db.String(120), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Eliminación diferida: el purgador en segundo plano borra la fila y sus reservas.
+    eliminado_en = db.Column(db.DateTime, nullable=True)
+
+    @classmethod
+    def active(cls):
+        return cls.query.filter(cls.eliminado_en.is_(None))
+
+    @classmethod
+    def get_active(cls, user_id):
+        return cls.active().filter(cls.id == user_id).first()
 
     def to_dict(self):
         return {
@@ -67,10 +81,36 @@ class RevokedToken(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
 
+class DataVersion(db.Model):
+    __tablename__ = "data_versions"
+
+    nombre = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class LaboratoryOccupancy(db.Model):
+    # Un bit por bloque de 15 minutos del día (96 bits); lo mantiene
+    # database/occupancy.py en la misma transacción que las reservas.
+    __tablename__ = "laboratory_occupancy"
+
+    laboratorio = db.Column(db.String(80), primary_key=True)
+    fecha_prestamo = db.Column(db.Date, primary_key=True)
+    bitmap = db.Column(db.LargeBinary(12), nullable=False)
+
+
 class LaboratoryRequest(db.Model):
     __tablename__ = "laboratory_requests"
     __table_args__ = (
         db.UniqueConstraint("laboratorio", "fecha_prestamo", "horario_uso", name="uq_lab_schedule"),
+        db.Index("ix_laboratory_requests_created_at_id", "created_at", "id"),
+        db.Index(
+            "ix_laboratory_requests_slot",
+            "laboratorio",
+            "fecha_prestamo",
+            "inicio_minutos",
+            "fin_minutos",
+        ),
+        db.Index("ix_laboratory_requests_equipo_fecha", "equipo", "fecha_prestamo"),
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -85,6 +125,8 @@ class LaboratoryRequest(db.Model):
     numero_estudiantes = db.Column(db.Integer, nullable=False)
     fecha_prestamo = db.Column(db.Date, nullable=False)
     horario_uso = db.Column(db.String(35), nullable=False)
+    inicio_minutos = db.Column(db.Integer, nullable=False)
+    fin_minutos = db.Column(db.Integer, nullable=False)
     descripcion_actividades = db.Column(db.Text, nullable=False)
     laboratorio = db.Column(db.String(80), nullable=False)
     equipo = db.Column(db.String(80), nullable=False)
@@ -0,0 +1,269 @@
+"""Bitmaps de ocupación por laboratorio y día (tabla laboratory_occupancy).
+
+Uso:
+    python -m database.occupancy   # reconstruye los bitmaps desde laboratory_requests
+
+Los bitmaps se mantienen en la misma transacción que cada alta, cambio o baja
+de reservas. La reconstrucción manual sirve para reparar la tabla si quedó
+desalineada, por ejemplo tras editar laboratory_requests fuera de la aplicación.
+"""
+import sys
+from collections import defaultdict
+
+from sqlalchemy import event, inspect, select
+
+from database import db
+from database.models import LaboratoryOccupancy, LaboratoryRequest
+from database.schedule import MINUTES_PER_DAY, find_overlapping_request
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = MINUTES_PER_DAY // SLOT_MINUTES
+BITMAP_BYTES = SLOTS_PER_DAY // 8
+FULL_DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+# Campos de una reserva que determinan los bloques que ocupa.
+SLOT_FIELDS = frozenset(("laboratorio", "fecha_prestamo", "inicio_minutos", "fin_minutos"))
+
+
+def slot_mask(start, end):
+    # Bits de los bloques de 15 minutos que el intervalo [start, end) toca.
+    first = start // SLOT_MINUTES
+    last = -(-end // SLOT_MINUTES)
+    return ((1 << last) - 1) ^ ((1 << first) - 1)
+
+
+def covered_mask(start, end):
+    # Bits de los bloques que el intervalo cubre por completo.
+    first = -(-start // SLOT_MINUTES)
+    last = end // SLOT_MINUTES
+    if last <= first:
+        return 0
+    return ((1 << last) - 1) ^ ((1 << first) - 1)
+
+
+def encode_bitmap(bitmap):
+    return bitmap.to_bytes(BITMAP_BYTES, "little")
+
+
+def decode_bitmap(raw):
+    return int.from_bytes(raw, "little") if raw else 0
+
+
+def bitmap_from_intervals(intervals):
+    bitmap = 0
+    for start, end in intervals:
+        if start is not None and end is not None:
+            bitmap |= slot_mask(start, end)
+    return bitmap
+
+
+def get_day_bitmap(laboratorio, fecha_prestamo):
+    raw = db.session.query(LaboratoryOccupancy.bitmap).filter(
+        LaboratoryOccupancy.laboratorio == laboratorio,
+        LaboratoryOccupancy.fecha_prestamo == fecha_prestamo,
+    ).scalar()
+    return decode_bitmap(raw)
+
+
+def get_bitmaps(laboratorios, desde, hasta):
+    # {(laboratorio, fecha): bitmap} para los días con alguna reserva.
+    rows = db.session.query(
+        LaboratoryOccupancy.laboratorio,
+        LaboratoryOccupancy.fecha_prestamo,
+        LaboratoryOccupancy.bitmap,
+    ).filter(
+        LaboratoryOccupancy.laboratorio.in_(laboratorios),
+        LaboratoryOccupancy.fecha_prestamo >= desde,
+        LaboratoryOccupancy.fecha_prestamo <= hasta,
+    )
+    return {(laboratorio, fecha): decode_bitmap(raw) for laboratorio, fecha, raw in rows}
+
+
+def slot_status(bitmap, start, end):
+    # True: libre con certeza; False: ocupado con certeza; None: solo una
+    # reserva que no está alineada a 15 minutos toca los bloques de los bordes.
+    if not bitmap & slot_mask(start, end):
+        return True
+    if bitmap & covered_mask(start, end):
+        return False
+    return None
+
+
+def is_slot_free(laboratorio, fecha_prestamo, start, end, exclude_id=None):
+    # El bitmap responde sin leer las reservas si el tramo está libre o, cuando
+    # no se excluye ninguna reserva, ocupado con certeza. Con `exclude_id` un
+    # bloque ocupado puede ser de la propia reserva, así que decide la consulta.
+    status = slot_status(get_day_bitmap(laboratorio, fecha_prestamo), start, end)
+    if status is True or (status is False and exclude_id is None):
+        return status
+    return find_overlapping_request(laboratorio, fecha_prestamo, start, end, exclude_id) is None
+
+
+def equipment_bitmaps(equipo, desde, hasta):
+    # {fecha: bitmap} con los tramos en que el equipo ya está reservado en
+    # cualquier laboratorio.
+    rows = db.session.query(
+        LaboratoryRequest.fecha_prestamo,
+        LaboratoryRequest.inicio_minutos,
+        LaboratoryRequest.fin_minutos,
+    ).filter(
+        LaboratoryRequest.equipo == equipo,
+        LaboratoryRequest.fecha_prestamo >= desde,
+        LaboratoryRequest.fecha_prestamo <= hasta,
+    )
+    bitmaps = defaultdict(int)
+    for fecha, start, end in rows:
+        bitmaps[fecha] |= slot_mask(start, end)
+    return bitmaps
+
+
+def free_starts(occupied, duration, window_start, window_end):
+    # Minutos de inicio, alineados a SLOT_MINUTES y sin solaparse entre sí, en
+    # los que caben `duration` minutos dentro de la franja sin tocar bloques
+    # ocupados. Como los inicios están alineados, un bloque libre en el bitmap
+    # garantiza que ninguna reserva lo toca y el resultado es exacto.
+    blocks = -(-duration // SLOT_MINUTES)
+    free = ~occupied & covered_mask(window_start, window_end)
+    runs = free
+    for shift in range(1, blocks):
+        runs &= free >> shift
+    while runs:
+        first = (runs & -runs).bit_length() - 1
+        yield first * SLOT_MINUTES
+        runs &= ~((1 << (first + blocks)) - 1)
+
+
+def _store_bitmaps(connection, bitmaps):
+    table = LaboratoryOccupancy.__table__
+    for (laboratorio, fecha), bitmap in bitmaps.items():
+        key = (table.c.laboratorio == laboratorio) & (table.c.fecha_prestamo == fecha)
+        if not bitmap:
+            connection.execute(table.delete().where(key))
+            continue
+        result = connection.execute(table.update().where(key).values(bitmap=encode_bitmap(bitmap)))
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(
+                laboratorio=laboratorio, fecha_prestamo=fecha, bitmap=encode_bitmap(bitmap),
+            ))
+
+
+def _recompute(connection, keys):
+    bitmaps = {}
+    requests = LaboratoryRequest.__table__
+    for laboratorio, fecha in keys:
+        rows = connection.execute(
+            select(requests.c.inicio_minutos, requests.c.fin_minutos).where(
+                requests.c.laboratorio == laboratorio,
+                requests.c.fecha_prestamo == fecha,
+            )
+        )
+        bitmaps[(laboratorio, fecha)] = bitmap_from_intervals(rows)
+    return bitmaps
+
+
+def refresh_occupancy(keys, connection=None):
+    # Recalcula los días indicados desde laboratory_requests; se usa después de
+    # DELETE/UPDATE masivos que no pasan por el flush.
+    connection = connection or db.session.connection()
+    _store_bitmaps(connection, _recompute(connection, set(keys)))
+
+
+def rebuild_occupancy():
+    # Reconstruye todos los bitmaps a partir de la tabla de reservas.
+    connection = db.session.connection()
+    requests = LaboratoryRequest.__table__
+    bitmaps = defaultdict(int)
+    rows = connection.execution_options(yield_per=5000).execute(select(
+        requests.c.laboratorio, requests.c.fecha_prestamo, requests.c.inicio_minutos, requests.c.fin_minutos,
+    ))
+    for laboratorio, fecha, start, end in rows:
+        if start is not None and end is not None:
+            bitmaps[(laboratorio, fecha)] |= slot_mask(start, end)
+    connection.execute(LaboratoryOccupancy.__table__.delete())
+    if bitmaps:
+        connection.execute(LaboratoryOccupancy.__table__.insert(), [
+            {"laboratorio": laboratorio, "fecha_prestamo": fecha, "bitmap": encode_bitmap(bitmap)}
+            for (laboratorio, fecha), bitmap in bitmaps.items()
+        ])
+    db.session.commit()
+    return len(bitmaps)
+
+
+def _slot_changed(instance):
+    state = inspect(instance)
+    return any(state.attrs[field].history.has_changes() for field in SLOT_FIELDS)
+
+
+def _before_flush(session, _flush_context, _instances):
+    # Si la instancia estaba expirada (p. ej. tras un commit) el historial no
+    # conserva el laboratorio y la fecha anteriores; se leen de la base antes
+    # de que el flush los sobrescriba.
+    ids = [
+        instance.id
+        for instance in list(session.dirty) + list(session.deleted)
+        if isinstance(instance, LaboratoryRequest) and instance.id is not None
+        and (instance in session.deleted or _slot_changed(instance))
+    ]
+    if not ids:
+        return
+    requests = LaboratoryRequest.__table__
+    rows = session.connection().execute(
+        select(requests.c.laboratorio, requests.c.fecha_prestamo).where(requests.c.id.in_(ids))
+    )
+    session.info.setdefault("occupancy_previous_keys", set()).update(tuple(row) for row in rows)
+
+
+def _after_flush(session, _flush_context):
+    added = defaultdict(int)
+    recompute = session.info.pop("occupancy_previous_keys", set())
+    for instance in session.new:
+        if isinstance(instance, LaboratoryRequest):
+            added[(instance.laboratorio, instance.fecha_prestamo)] |= slot_mask(
+                instance.inicio_minutos, instance.fin_minutos
+            )
+    for instance in session.dirty:
+        if isinstance(instance, LaboratoryRequest) and _slot_changed(instance):
+            # Al liberar bloques hay que saber si otra reserva no alineada
+            # comparte el borde, así que los días afectados se recalculan.
+            recompute.add((instance.laboratorio, instance.fecha_prestamo))
+    if not added and not recompute:
+        return
+
+    connection = session.connection()
+    bitmaps = _recompute(connection, recompute) if recompute else {}
+    pending_added = {key: mask for key, mask in added.items() if key not in bitmaps}
+    if pending_added:
+        table = LaboratoryOccupancy.__table__
+        current = {
+            (laboratorio, fecha): decode_bitmap(raw)
+            for laboratorio, fecha, raw in connection.execute(
+                select(table.c.laboratorio, table.c.fecha_prestamo, table.c.bitmap).where(
+                    table.c.laboratorio.in_({key[0] for key in pending_added}),
+                    table.c.fecha_prestamo.in_({key[1] for key in pending_added}),
+                )
+            )
+        }
+        for key, mask in pending_added.items():
+            bitmaps[key] = current.get(key, 0) | mask
+    _store_bitmaps(connection, bitmaps)
+
+
+def install_occupancy_tracking():
+    if event.contains(db.session, "after_flush", _after_flush):
+        return
+    event.listen(db.session, "before_flush", _before_flush)
+    event.listen(db.session, "after_flush", _after_flush)
+
+
+def main():
+    from server import create_app
+
+    app = create_app()
+    with app.app_context():
+        days = rebuild_occupancy()
+    print(f"Días con ocupación reconstruidos: {days}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+from database import db
+from database.models import LaboratoryRequest
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_horario(horario):
+    # Convierte "HH:MM - HH:MM" (con o sin espacios) en minutos desde medianoche.
+    try:
+        start_raw, end_raw = (part.strip() for part in (horario or "").split("-", 1))
+        start = _parse_minutes(start_raw)
+        end = _parse_minutes(end_raw)
+    except ValueError:
+        raise ValueError("Formato de horario inválido") from None
+    if start >= end:
+        raise ValueError("La hora de inicio debe ser anterior a la hora de fin")
+    return start, end
+
+
+def _parse_minutes(value):
+    hours, minutes = value.split(":")
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(value)
+    return hours * 60 + minutes
+
+
+def format_minutes(total_minutes):
+    return f"{total_minutes // 60:02d}:{total_minutes % 60:02d}"
+
+
+def format_horario(start, end):
+    return f"{format_minutes(start)} - {format_minutes(end)}"
+
+
+def find_overlapping_request(laboratorio, fecha_prestamo, start, end, exclude_id=None):
+    # Un único rango sobre ix_laboratory_requests_slot: dos intervalos [a, b) y
+    # [c, d) se solapan si a < d y c < b.
+    query = db.session.query(LaboratoryRequest.id).filter(
+        LaboratoryRequest.laboratorio == laboratorio,
+        LaboratoryRequest.fecha_prestamo == fecha_prestamo,
+        LaboratoryRequest.inicio_minutos < end,
+        LaboratoryRequest.fin_minutos > start,
+    )
+    if exclude_id is not None:
+        query = query.filter(LaboratoryRequest.id != exclude_id)
+    return query.limit(1).scalar()
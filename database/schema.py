@@ -0,0 +1,137 @@
+import logging
+
+from sqlalchemy import inspect, text
+
+from database import db
+from database.schedule import parse_horario
+
+# Versión del esquema declarado en database/models.py. Debe incrementarse cada
+# vez que se agregan tablas, columnas o índices para que el arranque migre.
+SCHEMA_VERSION = 6
+# Las bases guardadas con una versión menor se migran reconstruyendo
+# laboratory_occupancy: antes de la versión 3 la tabla no existía y, hasta la 6,
+# create_all() podía crearla vacía aunque la migración abortara después, o el
+# backfill podía dejar reservas sin minutos que los bitmaps omitían.
+OCCUPANCY_REBUILD_BELOW = 6
+# Cantidad de ids incluidos en el mensaje de SchemaMigrationError; el log los
+# registra todos.
+REPORTED_ROW_IDS = 20
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaMigrationError(RuntimeError):
+    def __init__(self, message, rows=()):
+        super().__init__(message)
+        self.rows = list(rows)
+
+
+def _add_missing_columns(connection, inspector, table):
+    added = []
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        # SQLite solo permite ADD COLUMN sin NOT NULL ni claves; la columna se
+        # agrega como nullable y se completa con un backfill.
+        column_type = column.type.compile(dialect=connection.dialect)
+        connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+        added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def _backfill_slot_minutes(connection):
+    # Completa inicio_minutos/fin_minutos a partir de horario_uso y devuelve las
+    # filas (id, horario_uso) que no se pudieron interpretar.
+    rows = connection.execute(text(
+        "SELECT id, horario_uso FROM laboratory_requests WHERE inicio_minutos IS NULL OR fin_minutos IS NULL"
+    )).fetchall()
+    updates = []
+    failed = []
+    for row_id, horario in rows:
+        try:
+            start, end = parse_horario(horario)
+        except ValueError:
+            failed.append((row_id, horario))
+            continue
+        updates.append({"id": row_id, "inicio": start, "fin": end})
+    if updates:
+        connection.execute(
+            text("UPDATE laboratory_requests SET inicio_minutos = :inicio, fin_minutos = :fin WHERE id = :id"),
+            updates,
+        )
+    return failed
+
+
+def _require_slot_minutes(connection):
+    # Una reserva sin minutos no participa en la búsqueda de solapamientos, los
+    # bitmaps de ocupación ni las estadísticas; antes que ignorarla en silencio
+    # se aborta la migración completa (nada queda aplicado) y el arranque.
+    failed = _backfill_slot_minutes(connection)
+    if not failed:
+        return
+    for row_id, horario in failed:
+        logger.error("Reserva %s: horario_uso %r no tiene el formato HH:MM - HH:MM", row_id, horario)
+    shown = ", ".join(str(row_id) for row_id, _horario in failed[:REPORTED_ROW_IDS])
+    more = f" y {len(failed) - REPORTED_ROW_IDS} más" if len(failed) > REPORTED_ROW_IDS else ""
+    raise SchemaMigrationError(
+        f"{len(failed)} reservas con horario_uso inválido no se pudieron migrar a inicio_minutos/fin_minutos "
+        f"(ids {shown}{more}). Corrija horario_uso en laboratory_requests y vuelva a iniciar.",
+        failed,
+    )
+
+
+def current_schema_version():
+    # SQLite guarda la versión en la cabecera del archivo (PRAGMA user_version),
+    # así que leerla no toca ninguna tabla. Otros motores devuelven None.
+    if db.engine.dialect.name != "sqlite":
+        return None
+    with db.engine.connect() as connection:
+        return connection.execute(text("PRAGMA user_version")).scalar()
+
+
+def _store_schema_version(connection):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"PRAGMA user_version = {int(SCHEMA_VERSION)}"))
+
+
+def ensure_schema():
+    # create_all no modifica tablas existentes (p. ej. database/app.db); aquí se
+    # agregan las columnas e índices declarados en los modelos que aún falten.
+    added_columns = []
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            added_columns.extend(_add_missing_columns(connection, inspector, table))
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+        # No solo cuando se agregan las columnas: las bases migradas antes de
+        # esta verificación pueden tener filas que quedaron en NULL.
+        _require_slot_minutes(connection)
+        _store_schema_version(connection)
+    return added_columns
+
+
+def prepare_schema():
+    # Camino rápido del arranque: si la base ya está en SCHEMA_VERSION se omiten
+    # create_all() y la inspección de columnas. Devuelve True si hubo que migrar.
+    stored_version = current_schema_version()
+    if stored_version == SCHEMA_VERSION:
+        return False
+    existing_tables = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    ensure_schema()
+    if stored_version is None:
+        # Sin PRAGMA user_version solo se sabe si la tabla ya existía.
+        rebuild = "laboratory_occupancy" not in existing_tables
+    else:
+        # La versión guardada se lee antes de migrar, así que un arranque que
+        # abortó tras create_all() vuelve a reconstruir en el siguiente intento.
+        rebuild = stored_version < OCCUPANCY_REBUILD_BELOW
+    if rebuild and "laboratory_requests" in existing_tables:
+        from database.occupancy import rebuild_occupancy
+
+        rebuild_occupancy()
+    return True
@@ -0,0 +1,133 @@
+import threading
+import time
+from datetime import timedelta, timezone
+
+from flask import current_app
+
+from database import db
+from database.data_version import REVOKED_TOKENS_SCOPE, get_data_version
+from database.models import RevokedToken
+
+EXTENSION_KEY = "revoked_token_cache"
+DEFAULT_SYNC_SECONDS = 0.0
+EVICTION_INTERVAL_SECONDS = 60.0
+
+
+# Blocklist de JTI revocados en memoria (uno por proceso). Cada logout
+# incrementa la versión de datos "tokens_revocados" en su misma transacción; en
+# cada verificación se lee esa versión (una fila por clave primaria) y solo si
+# cambió se traen las filas nuevas de revoked_tokens. Así un logout hecho en
+# otro worker se ve en la petición siguiente, sin releer la tabla entera.
+# Con sync_interval > 0 la versión se consulta como mucho una vez por
+# intervalo, a cambio de ese retraso entre procesos.
+class RevokedTokenCache:
+    def __init__(self, sync_interval=DEFAULT_SYNC_SECONDS, token_lifetime=None):
+        self.sync_interval = sync_interval
+        self.token_lifetime = token_lifetime
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._last_row_id = 0
+        self._version = None
+        self._next_sync = 0.0
+        self._next_eviction = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, jti, expires_at=None):
+        if not jti:
+            return
+        with self._lock:
+            self._entries[jti] = expires_at
+
+    def is_revoked(self, jti, now=None):
+        now = time.time() if now is None else now
+        if now >= self._next_sync:
+            self._next_sync = now + self.sync_interval
+            if get_data_version(REVOKED_TOKENS_SCOPE) != self._version:
+                self.sync(now)
+        if now >= self._next_eviction:
+            self.evict_expired(now)
+
+        if jti not in self._entries:
+            return False
+
+        expires_at = self._entries.get(jti)
+        if expires_at is not None and expires_at <= now:
+            # El token ya no pasaría la validación de `exp`; no hace falta recordarlo.
+            with self._lock:
+                self._entries.pop(jti, None)
+        return True
+
+    def evict_expired(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [
+                jti for jti, expires_at in self._entries.items()
+                if expires_at is not None and expires_at <= now
+            ]
+            for jti in expired:
+                del self._entries[jti]
+            self._next_eviction = now + EVICTION_INTERVAL_SECONDS
+        return len(expired)
+
+    def sync(self, now=None):
+        now = time.time() if now is None else now
+        self._next_sync = now + self.sync_interval
+
+        # La versión se lee antes que las filas: un logout concurrente deja la
+        # versión atrasada y solo provoca otra sincronización.
+        version = get_data_version(REVOKED_TOKENS_SCOPE)
+        rows = (
+            db.session.query(RevokedToken.id, RevokedToken.jti, RevokedToken.created_at)
+            .filter(RevokedToken.id > self._last_row_id)
+            .order_by(RevokedToken.id.asc())
+            .all()
+        )
+        with self._lock:
+            for row_id, jti, created_at in rows:
+                self._entries.setdefault(jti, self._estimate_expiry(created_at))
+                self._last_row_id = max(self._last_row_id, row_id)
+            self._version = version
+        return len(rows)
+
+    def _estimate_expiry(self, created_at):
+        # La tabla no guarda `exp`; el token se emitió antes de revocarse, así que
+        # created_at + duración del token es una cota superior segura.
+        if self.token_lifetime is None or created_at is None:
+            return None
+        # created_at es UTC sin zona (datetime.utcnow); timestamp() lo tomaría
+        # como hora local.
+        return created_at.replace(tzinfo=timezone.utc).timestamp() + self.token_lifetime
+
+
+def _token_lifetime_seconds(expires):
+    if isinstance(expires, timedelta):
+        return expires.total_seconds()
+    if isinstance(expires, (int, float)) and not isinstance(expires, bool):
+        return float(expires)
+    return None
+
+
+def init_revoked_token_cache(app):
+    sync_interval = float(app.config.get("REVOKED_TOKEN_SYNC_SECONDS", DEFAULT_SYNC_SECONDS))
+    cache = RevokedTokenCache(
+        sync_interval=sync_interval,
+        token_lifetime=_token_lifetime_seconds(app.config.get("JWT_ACCESS_TOKEN_EXPIRES")),
+    )
+    app.extensions[EXTENSION_KEY] = cache
+    return cache
+
+
+def get_revoked_token_cache():
+    return current_app.extensions[EXTENSION_KEY]
+
+
+def revoke_token(jti, expires_at=None):
+    db.session.add(RevokedToken(jti=jti))
+    db.session.commit()
+    get_revoked_token_cache().add(jti, expires_at)
+
+
+def is_token_revoked(jti):
+    return get_revoked_token_cache().is_revoked(jti)
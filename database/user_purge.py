@@ -0,0 +1,214 @@
+"""Eliminación de usuarios por conjuntos y purga diferida.
+
+Uso:
+    python -m database.user_purge   # purga los usuarios marcados como eliminados
+
+Borrar un usuario con session.delete() hace que el cascade del ORM cargue todas
+sus reservas y las elimine una por una. Aquí se borran con un DELETE ... WHERE
+user_id IN (...) y se recalculan los bitmaps de ocupación de los días afectados.
+En modo diferido la petición solo marca `eliminado_en` y un hilo en segundo
+plano borra las reservas en bloques de PURGE_CHUNK_SIZE por transacción, para no
+retener el bloqueo de escritura de SQLite.
+"""
+import logging
+import os
+import sys
+import threading
+from datetime import datetime
+
+from sqlalchemy import delete, update
+
+from database import db
+from database.models import LaboratoryRequest, User
+from database.occupancy import refresh_occupancy
+
+PURGE_CHUNK_SIZE = 2000
+PURGE_INTERVAL_SECONDS = 60.0
+EXTENSION_KEY = "user_purger"
+DELETE_MODES = ("inmediato", "diferido")
+
+logger = logging.getLogger(__name__)
+
+
+def _reservation_days(condition):
+    return set(
+        db.session.query(LaboratoryRequest.laboratorio, LaboratoryRequest.fecha_prestamo)
+        .filter(condition)
+        .distinct()
+    )
+
+
+def _delete_reservations(condition):
+    # El DELETE masivo pasa por do_orm_execute (versión de datos) pero no por el
+    # flush que mantiene laboratory_occupancy, así que esos días se recalculan.
+    days = _reservation_days(condition)
+    db.session.execute(
+        delete(LaboratoryRequest).where(condition),
+        execution_options={"synchronize_session": False},
+    )
+    refresh_occupancy(days)
+
+
+def delete_users_now(user_ids):
+    # Dos DELETE por conjunto, sin cargar las filas. El commit queda a cargo del
+    # llamador.
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    _delete_reservations(LaboratoryRequest.user_id.in_(user_ids))
+    db.session.execute(delete(User).where(User.id.in_(user_ids)), execution_options={"synchronize_session": False})
+
+
+def mark_users_deleted(user_ids, now=None):
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    db.session.execute(
+        update(User)
+        .where(User.id.in_(user_ids), User.eliminado_en.is_(None))
+        .values(eliminado_en=now or datetime.utcnow()),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def purge_deleted_users(chunk_size=PURGE_CHUNK_SIZE):
+    # Borra los usuarios marcados y sus reservas; cada transacción elimina como
+    # mucho chunk_size reservas. Devuelve la cantidad de usuarios purgados.
+    purged = 0
+    while True:
+        user_id = (
+            db.session.query(User.id)
+            .filter(User.eliminado_en.isnot(None))
+            .order_by(User.eliminado_en.asc())
+            .limit(1)
+            .scalar()
+        )
+        if user_id is None:
+            return purged
+        while True:
+            chunk = [
+                row_id for (row_id,) in db.session.query(LaboratoryRequest.id)
+                .filter(LaboratoryRequest.user_id == user_id)
+                .limit(chunk_size)
+            ]
+            if not chunk:
+                break
+            _delete_reservations(LaboratoryRequest.id.in_(chunk))
+            db.session.commit()
+        db.session.execute(delete(User).where(User.id == user_id), execution_options={"synchronize_session": False})
+        db.session.commit()
+        purged += 1
+
+
+class UserPurger:
+    # Hilo por proceso que ejecuta purge_deleted_users() cuando se lo despierta
+    # y, mientras viva, cada `interval` segundos para recoger marcas pendientes
+    # de otros procesos o de un reinicio.
+    def __init__(self, app, interval=PURGE_INTERVAL_SECONDS):
+        self.app = app
+        self.interval = interval
+        self._resumed_pid = None
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+
+    def is_running(self):
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def wake(self):
+        if self._pid != os.getpid():
+            # Tras fork() el hilo del padre no existe en el hijo.
+            self._reset()
+        self._idle.clear()
+        self._wakeup.set()
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="user-purger", daemon=True)
+                self._thread.start()
+
+    def resume_pending(self):
+        # Una vez por proceso: si quedaron usuarios marcados (de otro proceso o
+        # de antes de un reinicio) se purgan sin esperar a una nueva eliminación
+        # diferida. Se llama en la primera petición y no en create_app para no
+        # crear el hilo en el maestro antes del fork().
+        if self._resumed_pid == os.getpid():
+            return False
+        self._resumed_pid = os.getpid()
+        pending = db.session.query(User.id).filter(User.eliminado_en.isnot(None)).limit(1).scalar()
+        if pending is None:
+            return False
+        self.wake()
+        return True
+
+    def wait_idle(self, timeout=None):
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    purge_deleted_users()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Falló la purga de usuarios eliminados")
+                finally:
+                    db.session.remove()
+            if not self._wakeup.is_set():
+                self._idle.set()
+
+
+def init_user_purger(app):
+    mode = os.environ.get("USER_DELETE_MODE", "inmediato").lower()
+    if mode not in DELETE_MODES:
+        raise ValueError(f"Modo de eliminación desconocido: {mode}")
+    app.config.setdefault("USER_DELETE_MODE", mode)
+    purger = app.extensions[EXTENSION_KEY] = UserPurger(app)
+
+    @app.before_request
+    def _resume_user_purge():
+        purger.resume_pending()
+
+
+def resolve_delete_mode(app, requested=None):
+    # Devuelve el modo pedido (o el configurado) o None si no es válido.
+    if requested is not None and not isinstance(requested, str):
+        return None
+    mode = (requested or app.config.get("USER_DELETE_MODE") or "inmediato").lower()
+    return mode if mode in DELETE_MODES else None
+
+
+def delete_users(user_ids, mode):
+    # Aplica el modo de eliminación; el commit queda a cargo del llamador, que
+    # después debe llamar a wake_purger() si el modo es diferido.
+    if mode == "diferido":
+        mark_users_deleted(user_ids)
+    else:
+        delete_users_now(user_ids)
+
+
+def wake_purger(app):
+    purger = app.extensions.get(EXTENSION_KEY)
+    if purger is not None:
+        purger.wake()
+
+
+def main():
+    from server import create_app
+
+    app = create_app()
+    with app.app_context():
+        purged = purge_deleted_users()
+    print(f"Usuarios purgados: {purged}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 import api from "./axiosConfig";
 
-export const getUsers = () =>
-  api.get("/admin/users");
+export const getUsers = (cursor) =>
+  api.get("/admin/users", { params: cursor ? { cursor } : {} });
 
 export const updateUser = (id, data) =>
   api.patch(`/admin/users/${id}`, data);
@@ -9,8 +9,8 @@ export const updateUser = (id, data) =>
 export const deleteUser = (id) =>
   api.delete(`/admin/users/${id}`);
 
-export const getLaboratories = () =>
-  api.get("/admin/laboratories");
+export const getLaboratories = (cursor) =>
+  api.get("/admin/laboratories", { params: cursor ? { cursor } : {} });
 
 export const updateLaboratory = (id, data) =>
   api.patch(`/admin/laboratories/${id}`, data);
@@ -4,4 +4,9 @@ export const createLaboratory = (data) =>
   api.post("/auth/laboratory", data);
 
 export const fetchLaboratoryReservations = () =>
-  api.get("/auth/laboratory/reservations");
\ No newline at end of file
+  api.get("/auth/laboratory/reservations");
+
+export const fetchLaboratoryAvailability = (desde, hasta, laboratorio) =>
+  api.get("/auth/laboratory/availability", {
+    params: laboratorio ? { desde, hasta, laboratorio } : { desde, hasta },
+  });
@@ -4,14 +4,18 @@ import { useNavigate } from "react-router-dom";
 
 export default function LaboratoriesList() {
   const [labs, setLabs] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [showModal, setShowModal] = useState(false);
   const [editingLab, setEditingLab] = useState(null);
   const [form, setForm] = useState({});
   const navigate = useNavigate();
 
-  const fetchLabs = () => {
-    getLaboratories()
-      .then(res => setLabs(res.data.reservas))
+  const fetchLabs = (cursor = null) => {
+    getLaboratories(cursor)
+      .then(res => {
+        setLabs(prev => (cursor ? [...prev, ...res.data.reservas] : res.data.reservas));
+        setNextCursor(res.data.siguiente_cursor);
+      })
       .catch(() => alert("No autorizado o sesión expirada"));
   };
 
@@ -125,6 +129,12 @@ export default function LaboratoriesList() {
         </tbody>
       </table>
 
+      {nextCursor && (
+        <button className="btn btn-outline-secondary mb-3" onClick={() => fetchLabs(nextCursor)}>
+          Cargar más
+        </button>
+      )}
+
       {/* Modal de edición */}
       {showModal && (
         <div className="modal d-block" tabIndex="-1">
@@ -4,14 +4,18 @@ import { useNavigate } from "react-router-dom";
 
 export default function UsersList() {
   const [users, setUsers] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [showModal, setShowModal] = useState(false);
   const [editingUser, setEditingUser] = useState(null);
   const [form, setForm] = useState({});
   const navigate = useNavigate();
 
-  const fetchUsers = () => {
-    getUsers()
-      .then(res => setUsers(res.data.usuarios))
+  const fetchUsers = (cursor = null) => {
+    getUsers(cursor)
+      .then(res => {
+        setUsers(prev => (cursor ? [...prev, ...res.data.usuarios] : res.data.usuarios));
+        setNextCursor(res.data.siguiente_cursor);
+      })
       .catch(() => alert("No autorizado o sesión expirada"));
   };
 
@@ -99,6 +103,12 @@ export default function UsersList() {
         </tbody>
       </table>
 
+      {nextCursor && (
+        <button className="btn btn-outline-secondary mb-3" onClick={() => fetchUsers(nextCursor)}>
+          Cargar más
+        </button>
+      )}
+
       {/* Modal de edición */}
       {showModal && (
         <div className="modal d-block" tabIndex="-1">
@@ -1,5 +1,9 @@
 import { useEffect, useState } from "react";
-import { createLaboratory, fetchLaboratoryReservations } from "../../api/laboratoryService";
+import { createLaboratory, fetchLaboratoryAvailability } from "../../api/laboratoryService";
+
+const AVAILABILITY_WINDOW_DAYS = 90;
+
+const toApiDate = (date) => `${date.getDate()}/${date.getMonth() + 1}/${date.getFullYear()}`;
 
 export default function LaboratoryRegister() {
   const [form, setForm] = useState({
@@ -26,7 +30,10 @@ export default function LaboratoryRegister() {
 
     const loadReservations = async () => {
       try {
-        const res = await fetchLaboratoryReservations();
+        const desde = new Date();
+        const hasta = new Date();
+        hasta.setDate(hasta.getDate() + AVAILABILITY_WINDOW_DAYS);
+        const res = await fetchLaboratoryAvailability(toApiDate(desde), toApiDate(hasta));
         if (!mounted) {
           return;
         }
@@ -0,0 +1,369 @@
+"""Servidor de producción pre-fork.
+
+Uso:
+    python server.py serve --workers 4 --threads 8 --max-requests 2000
+    python -m prefork --port 8000
+
+El proceso maestro construye la aplicación una sola vez (create_app), abre el
+socket y crea los workers con fork(); cada worker atiende peticiones con el
+servidor WSGI de Werkzeug, en un hilo o con varios (--threads).
+
+Señales del maestro:
+    SIGTERM / SIGINT  apagado ordenado: los workers terminan lo que están atendiendo.
+    SIGHUP            recarga: vuelve a ejecutar create_app(), levanta una nueva
+                      generación de workers y retira la anterior sin cortar peticiones.
+    SIGTTIN / SIGTTOU agrega o quita un worker.
+
+La recarga no reimporta el código Python; para desplegar código nuevo hay que
+reiniciar el maestro.
+"""
+import argparse
+import logging
+import os
+import random
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+DEFAULT_KEEPALIVE_SECONDS = 5
+ACCEPT_POLL_SECONDS = 1.0
+
+
+class ForkSafetyError(RuntimeError):
+    pass
+
+
+def prepare_app_for_fork(app):
+    # Verifica que la configuración funcione con varios procesos y suelta las
+    # conexiones del maestro. Devuelve advertencias; lanza ForkSafetyError si
+    # no hay forma de servir con fork().
+    from config.logger import get_transaction_writer
+    from database import db
+
+    warnings = []
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == "sqlite":
+            database = engine.url.database or ""
+            if database in ("", ":memory:") or "mode=memory" in str(engine.url):
+                raise ForkSafetyError("Una base SQLite en memoria no se comparte entre procesos")
+            with engine.connect() as connection:
+                journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+                busy_timeout = connection.exec_driver_sql("PRAGMA busy_timeout").scalar()
+            if str(journal_mode).lower() != "wal":
+                warnings.append(
+                    f"journal_mode={journal_mode}: los lectores de un worker bloquean al escritor de otro; "
+                    "use SQLITE_PROFILE=production"
+                )
+            if not busy_timeout:
+                warnings.append("busy_timeout=0: las escrituras concurrentes fallarán con 'database is locked'")
+        # Las conexiones abiertas por create_app no deben heredarse: cada worker
+        # abre las suyas después del fork.
+        engine.dispose()
+
+    writer = get_transaction_writer()
+    if writer.is_running():
+        warnings.append("El escritor del log ya tiene un hilo en el maestro; cada worker iniciará el suyo")
+    return warnings
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # Sin timeout, una conexión keep-alive ociosa impediría retirar el worker.
+    timeout = DEFAULT_KEEPALIVE_SECONDS
+
+
+class _RequestCounter:
+    def __init__(self, app, limit):
+        self.app = app
+        self.limit = limit
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.count += 1
+        return self.app(environ, start_response)
+
+    @property
+    def exhausted(self):
+        return bool(self.limit) and self.count >= self.limit
+
+
+def _serve_worker(app, listen_fd, host, port, threads, max_requests):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_args: stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTTIN, signal.SIG_IGN)
+    signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+
+    counter = _RequestCounter(app, max_requests)
+    server = make_server(
+        host,
+        port,
+        counter,
+        threaded=threads > 1,
+        request_handler=_RequestHandler,
+        fd=listen_fd,
+    )
+    server.timeout = ACCEPT_POLL_SECONDS
+    # Werkzeug usa hilos daemon; sin esto server_close() no esperaría las
+    # peticiones en curso antes de que el worker termine.
+    server.daemon_threads = False
+    server.block_on_close = True
+    try:
+        while not stop.is_set() and not counter.exhausted:
+            # El socket es no bloqueante: si otro worker ganó el accept(),
+            # handle_request() vuelve sin error.
+            server.handle_request()
+    finally:
+        # En modo multihilo server_close() espera los hilos en curso.
+        server.server_close()
+        from config.logger import shutdown_transaction_log
+        from config.metrics import flush_metrics
+
+        shutdown_transaction_log()
+        # os._exit() no ejecuta atexit: el último volcado se hace aquí.
+        flush_metrics()
+
+
+class PreforkServer:
+    def __init__(
+        self,
+        app_factory,
+        host="127.0.0.1",
+        port=8000,
+        workers=2,
+        threads=1,
+        max_requests=0,
+        max_requests_jitter=0,
+        graceful_timeout=30.0,
+    ):
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.threads = max(1, threads)
+        self.max_requests = max(0, max_requests)
+        self.max_requests_jitter = max(0, max_requests_jitter)
+        self.graceful_timeout = graceful_timeout
+        self.app = None
+        self.generation = 0
+        self._children = {}
+        self._retiring = {}
+        self._signals = []
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+        self._socket = None
+
+    def log(self, message):
+        print(f"[prefork {os.getpid()}] {message}", flush=True)
+
+    def _load_app(self):
+        app = self.app_factory()
+        for warning in prepare_app_for_fork(app):
+            self.log(f"⚠️  {warning}")
+        return app
+
+    def _bind(self):
+        sock = socket.create_server((self.host, self.port), reuse_port=False, backlog=2048)
+        sock.setblocking(False)
+        os.set_inheritable(sock.fileno(), True)
+        self.port = sock.getsockname()[1]
+        return sock
+
+    def _spawn(self):
+        limit = self.max_requests
+        if limit and self.max_requests_jitter:
+            # La variación evita que todos los workers se reciclen a la vez.
+            limit += random.randint(0, self.max_requests_jitter)
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                os.close(self._wakeup_read)
+                os.close(self._wakeup_write)
+                _serve_worker(self.app, self._socket.fileno(), self.host, self.port, self.threads, limit)
+            except BaseException:  # pylint: disable=broad-except
+                logging.getLogger(__name__).exception("Worker terminado por error")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self._children[pid] = self.generation
+        return pid
+
+    def _on_signal(self, signum, _frame):
+        self._signals.append(signum)
+        try:
+            os.write(self._wakeup_write, b"!")
+        except OSError:
+            pass
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self._children.pop(pid, None)
+            self._retiring.pop(pid, None)
+            if generation is not None and os.waitstatus_to_exitcode(status) not in (0, -signal.SIGTERM):
+                self.log(f"worker {pid} terminó con código {os.waitstatus_to_exitcode(status)}")
+
+    def _current_workers(self):
+        return [
+            pid for pid, generation in self._children.items()
+            if generation == self.generation and pid not in self._retiring
+        ]
+
+    def _retire(self, pids):
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            if pid in self._retiring:
+                continue
+            self._retiring[pid] = deadline
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self._retiring.items()):
+            if now >= deadline:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def _reload(self):
+        self.log("recargando aplicación")
+        try:
+            app = self._load_app()
+        except Exception as error:  # pylint: disable=broad-except
+            self.log(f"❌ la recarga falló, se mantienen los workers actuales: {error}")
+            return
+        old_workers = list(self._children)
+        self.app = app
+        self.generation += 1
+        for _ in range(self.workers):
+            self._spawn()
+        self._retire(old_workers)
+
+    def _maintain(self):
+        current = self._current_workers()
+        for _ in range(self.workers - len(current)):
+            self._spawn()
+        if len(current) > self.workers:
+            self._retire(current[self.workers:])
+
+    def _configure_metrics(self):
+        # Los workers vuelcan sus histogramas a un directorio compartido para
+        # que /api/admin/metrics sume todos y no solo el que respondió.
+        from config.metrics import configure_multiprocess
+
+        directory = os.environ.get("METRICS_MULTIPROC_DIR")
+        owned = not directory
+        if owned:
+            directory = tempfile.mkdtemp(prefix="metrics-")
+        configure_multiprocess(directory, clear=True)
+        return directory if owned else None
+
+    def run(self):
+        self.app = self._load_app()
+        self._socket = self._bind()
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, self._on_signal)
+        self.log(
+            f"escuchando en http://{self.host}:{self.port} con {self.workers} workers x {self.threads} hilos"
+        )
+
+        metrics_dir = self._configure_metrics()
+        stopping = False
+        try:
+            self._maintain()
+            while self._children or not stopping:
+                select.select([self._wakeup_read], [], [], 1.0)
+                try:
+                    os.read(self._wakeup_read, 512)
+                except BlockingIOError:
+                    pass
+
+                while self._signals:
+                    signum = self._signals.pop(0)
+                    if signum in (signal.SIGTERM, signal.SIGINT) and not stopping:
+                        stopping = True
+                        self.log("apagando workers")
+                        self._retire(list(self._children))
+                    elif signum == signal.SIGHUP and not stopping:
+                        self._reload()
+                    elif signum == signal.SIGTTIN:
+                        self.workers += 1
+                    elif signum == signal.SIGTTOU and self.workers > 1:
+                        self.workers -= 1
+
+                self._reap()
+                self._kill_overdue()
+                if not stopping:
+                    self._maintain()
+        finally:
+            self._socket.close()
+            os.close(self._wakeup_read)
+            os.close(self._wakeup_write)
+            if metrics_dir:
+                shutil.rmtree(metrics_dir, ignore_errors=True)
+        self.log("detenido")
+        return 0
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor pre-fork de producción.")
+    parser.add_argument("--host", default=os.environ.get("SERVE_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=_env_int("SERVE_PORT", 8000))
+    parser.add_argument("--workers", type=int, default=_env_int("SERVE_WORKERS", os.cpu_count() or 2))
+    parser.add_argument("--threads", type=int, default=_env_int("SERVE_THREADS", 1))
+    parser.add_argument("--max-requests", type=int, default=_env_int("SERVE_MAX_REQUESTS", 0),
+                        help="Recicla cada worker tras N peticiones (0 = nunca)")
+    parser.add_argument("--max-requests-jitter", type=int, default=_env_int("SERVE_MAX_REQUESTS_JITTER", 0))
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.environ.get("SERVE_GRACEFUL_TIMEOUT", 30)))
+    parser.add_argument("--access-log", action="store_true", help="Muestra cada petición en la salida estándar")
+    args = parser.parse_args(argv)
+
+    if not args.access_log:
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    from server import create_app
+
+    try:
+        server = PreforkServer(
+            create_app,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            threads=args.threads,
+            max_requests=args.max_requests,
+            max_requests_jitter=args.max_requests_jitter,
+            graceful_timeout=args.graceful_timeout,
+        )
+        return server.run()
+    except ForkSafetyError as error:
+        print(f"❌ {error}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
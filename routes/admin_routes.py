@@ -4,11 +4,16 @@ from flask_jwt_extended import jwt_required
 from controllers.admin_controller import (
     delete_laboratory,
     delete_user,
+    export_metrics,
     list_laboratories,
     list_users,
     update_laboratory,
     update_user,
 )
+from controllers.batch_controller import batch_laboratories, batch_users
+from controllers.export_controller import export_laboratory_requests
+from controllers.import_controller import import_laboratory_requests
+from controllers.stats_controller import laboratory_stats
 
 admin_bp = Blueprint("admin", __name__)
 
@@ -19,6 +24,12 @@ def admin_list_users():
     return list_users()
 
 
+@admin_bp.route("/users/batch", methods=["POST"])
+@jwt_required()
+def admin_batch_users():
+    return batch_users()
+
+
 @admin_bp.route("/users/<int:user_id>", methods=["PATCH"])
 @jwt_required()
 def admin_update_user(user_id):
@@ -37,6 +48,12 @@ def admin_list_laboratories():
     return list_laboratories()
 
 
+@admin_bp.route("/laboratories/batch", methods=["POST"])
+@jwt_required()
+def admin_batch_laboratories():
+    return batch_laboratories()
+
+
 @admin_bp.route("/laboratories/<int:request_id>", methods=["PATCH"])
 @jwt_required()
 def admin_update_laboratory(request_id):
@@ -47,3 +64,27 @@ def admin_update_laboratory(request_id):
 @jwt_required()
 def admin_delete_laboratory(request_id):
     return delete_laboratory(request_id)
+
+
+@admin_bp.route("/laboratories/import", methods=["POST"])
+@jwt_required()
+def admin_import_laboratories():
+    return import_laboratory_requests()
+
+
+@admin_bp.route("/laboratories/export", methods=["GET"])
+@jwt_required()
+def admin_export_laboratories():
+    return export_laboratory_requests()
+
+
+@admin_bp.route("/laboratories/stats", methods=["GET"])
+@jwt_required()
+def admin_laboratory_stats():
+    return laboratory_stats()
+
+
+@admin_bp.route("/metrics", methods=["GET"])
+@jwt_required()
+def admin_metrics():
+    return export_metrics()
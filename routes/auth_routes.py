@@ -1,19 +1,28 @@
 from flask import Blueprint
 from flask_jwt_extended import jwt_required
 
+from config.rate_limit import rate_limited
 from controllers.admin_controller import login_admin, register_admin
-from controllers.laboratory_controller import create_laboratory_request, list_reserved_laboratories_for_user
+from controllers.laboratory_controller import (
+    create_laboratory_request,
+    list_laboratory_availability,
+    list_laboratory_occupancy,
+    list_reserved_laboratories_for_user,
+    search_free_slots,
+)
 from controllers.user_controller import login_user, logout_user, register_user
 
 auth_bp = Blueprint("auth", __name__)
 
 
 @auth_bp.route("/register", methods=["POST"])
+@rate_limited("register")
 def register():
     return register_user()
 
 
 @auth_bp.route("/login", methods=["POST"])
+@rate_limited("login")
 def login():
     return login_user()
 
@@ -24,11 +33,13 @@ def logout():
 
 
 @auth_bp.route("/register-admin", methods=["POST"])
+@rate_limited("register_admin")
 def register_admin_route():
     return register_admin()
 
 
 @auth_bp.route("/login-admin", methods=["POST"])
+@rate_limited("login_admin")
 def login_admin_route():
     return login_admin()
 
@@ -43,3 +54,21 @@ def laboratory_request():
 @jwt_required()
 def laboratory_reservations():
     return list_reserved_laboratories_for_user()
+
+
+@auth_bp.route("/laboratory/availability", methods=["GET"])
+@jwt_required()
+def laboratory_availability():
+    return list_laboratory_availability()
+
+
+@auth_bp.route("/laboratory/occupancy", methods=["GET"])
+@jwt_required()
+def laboratory_occupancy():
+    return list_laboratory_occupancy()
+
+
+@auth_bp.route("/laboratory/free-slots", methods=["GET"])
+@jwt_required()
+def laboratory_free_slots():
+    return search_free_slots()
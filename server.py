@@ -1,5 +1,7 @@
 import os
 import sys
+import time
+from contextlib import contextmanager
 from datetime import timedelta
 
 from flask import Flask, jsonify, request
@@ -7,14 +9,31 @@ from flask_cors import CORS  # IMPORTANTE
 from flask_jwt_extended import get_jwt_identity
 
 from database import db, bcrypt, jwt
+from database.data_version import install_data_version_tracking
+from database.occupancy import install_occupancy_tracking
+from database.engine import apply_sqlite_profile, engine_options_for, resolve_sqlite_profile
+from database.schema import SCHEMA_VERSION, SchemaMigrationError, current_schema_version, prepare_schema
+from database.user_purge import init_user_purger
+from database.token_blocklist import init_revoked_token_cache, is_token_revoked
+from config.compression import init_compression
+from config.hashing import HashingBusyError
 from config.logger import log_endpoint_transaction
+from config.metrics import init_metrics, instrument_engine
+from config.rate_limit import init_rate_limiter
 
+DEFAULT_JWT_SECRET = "cambie-esta-clave"
+
+
+@contextmanager
+def _timed(timings, phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = time.perf_counter() - started
 
-def _run_startup_tests():
-    if os.environ.get("SKIP_STARTUP_TESTS"):
-        print("⚠️  Startup tests skippeados por configuración de entorno.")
-        return True
 
+def _run_startup_tests():
     try:
         import pytest  # pylint: disable=import-error
     except ImportError:
@@ -36,6 +55,8 @@ def _run_startup_tests():
 
 
 def create_app():
+    timings = {}
+    started = time.perf_counter()
     app = Flask(__name__)
 
     # CORS (AQUÍ, antes de blueprints)
@@ -49,23 +70,33 @@ def create_app():
     default_db_path = os.path.join(base_dir, "database", "app.db")
     database_url = os.environ.get("DATABASE_URL") or f"sqlite:///{default_db_path}"
 
-    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", "cambie-esta-clave")
-    app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
-    app.config["JWT_DECODE_SUBJECT"] = False
-
-    db.init_app(app)
-    bcrypt.init_app(app)
-    jwt.init_app(app)
-
-    from database.models import RevokedToken
+    with _timed(timings, "configuracion"):
+        sqlite_profile = resolve_sqlite_profile()
+
+        app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options_for(sqlite_profile, database_url)
+        app.config["SQLITE_PROFILE"] = sqlite_profile["name"]
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+        app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET_KEY", DEFAULT_JWT_SECRET)
+        app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=1)
+        app.config["JWT_DECODE_SUBJECT"] = False
+        app.config["REVOKED_TOKEN_SYNC_SECONDS"] = float(os.environ.get("REVOKED_TOKEN_SYNC_SECONDS", "0"))
+
+    with _timed(timings, "extensiones"):
+        db.init_app(app)
+        bcrypt.init_app(app)
+        jwt.init_app(app)
+        init_revoked_token_cache(app)
+        init_metrics(app)
+        init_rate_limiter(app)
+        init_compression(app)
+        install_data_version_tracking()
+        install_occupancy_tracking()
+        init_user_purger(app)
 
     @jwt.token_in_blocklist_loader
     def check_if_token_revoked(jwt_header, jwt_payload):
-        jti = jwt_payload.get("jti")
-        token = RevokedToken.query.filter_by(jti=jti).first()
-        return token is not None
+        return is_token_revoked(jwt_payload.get("jti"))
 
     @jwt.invalid_token_loader
     def invalid_token_callback(reason):
@@ -75,11 +106,18 @@ def create_app():
     def missing_token_callback(reason):
         return jsonify({"message": "Token requerido", "reason": reason}), 401
 
-    from routes.admin_routes import admin_bp
-    from routes.auth_routes import auth_bp
+    @app.errorhandler(HashingBusyError)
+    def hashing_busy_callback(error):
+        response = jsonify({"message": "Servicio ocupado, intente nuevamente"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+    with _timed(timings, "blueprints"):
+        from routes.admin_routes import admin_bp
+        from routes.auth_routes import auth_bp
 
-    app.register_blueprint(auth_bp, url_prefix="/api/auth")
-    app.register_blueprint(admin_bp, url_prefix="/api/admin")
+        app.register_blueprint(auth_bp, url_prefix="/api/auth")
+        app.register_blueprint(admin_bp, url_prefix="/api/admin")
 
     @app.after_request
     def register_transaction(response):
@@ -102,15 +140,76 @@ def create_app():
             )
         return response
 
-    with app.app_context():
-        db.create_all()
+    with app.app_context(), _timed(timings, "esquema"):
+        apply_sqlite_profile(db.engine, sqlite_profile)
+        instrument_engine(db.engine)
+        app.config["SCHEMA_MIGRATED"] = prepare_schema()
 
+    timings["create_app"] = time.perf_counter() - started
+    app.config["STARTUP_TIMINGS"] = timings
     return app
 
 
+def _run_preflight(app):
+    # Verificaciones rápidas previas al arranque; reemplazan a la suite completa,
+    # que ahora solo corre con --with-tests o RUN_STARTUP_TESTS=1.
+    checks = []
+
+    secret = app.config.get("JWT_SECRET_KEY") or ""
+    if not secret:
+        checks.append(("configuración", False, "JWT_SECRET_KEY vacío"))
+    elif secret == DEFAULT_JWT_SECRET or len(secret) < 32:
+        checks.append(("configuración", None, "JWT_SECRET_KEY por defecto o menor a 32 caracteres"))
+    else:
+        checks.append(("configuración", True, f"perfil SQLite {app.config['SQLITE_PROFILE']}"))
+
+    with app.app_context():
+        try:
+            with db.engine.connect() as connection:
+                connection.exec_driver_sql("SELECT 1")
+            checks.append(("base de datos", True, db.engine.url.render_as_string(hide_password=True)))
+        except Exception as error:  # pylint: disable=broad-except
+            checks.append(("base de datos", False, str(error)))
+        else:
+            version = current_schema_version()
+            if version is None or version == SCHEMA_VERSION:
+                detail = "migrado en este arranque" if app.config.get("SCHEMA_MIGRATED") else "al día"
+                checks.append(("esquema", True, f"versión {SCHEMA_VERSION} ({detail})"))
+            else:
+                checks.append(("esquema", False, f"versión {version}, se esperaba {SCHEMA_VERSION}"))
+
+    symbols = {True: "✅", None: "⚠️ ", False: "❌"}
+    for name, status, detail in checks:
+        print(f"{symbols[status]} {name}: {detail}")
+    return all(status is not False for _name, status, _detail in checks)
+
+
+def _print_startup_report(app):
+    timings = app.config.get("STARTUP_TIMINGS", {})
+    breakdown = ", ".join(
+        f"{phase} {timings[phase] * 1000:.0f} ms"
+        for phase in ("configuracion", "extensiones", "blueprints", "esquema")
+        if phase in timings
+    )
+    print(f"⏱️  create_app en {timings.get('create_app', 0.0) * 1000:.0f} ms ({breakdown})")
+
+
 if __name__ == "__main__":
-    if not _run_startup_tests():
+    if sys.argv[1:2] == ["serve"]:
+        from prefork import main as serve_main
+
+        sys.exit(serve_main(sys.argv[2:]))
+
+    run_tests = "--with-tests" in sys.argv[1:] or os.environ.get("RUN_STARTUP_TESTS", "").lower() in ("1", "true", "yes")
+    if run_tests and not _run_startup_tests():
         sys.exit(1)
 
-    flask_app = create_app()
+    try:
+        flask_app = create_app()
+    except SchemaMigrationError as error:
+        print(f"❌ esquema: {error}")
+        sys.exit(1)
+    if not _run_preflight(flask_app):
+        sys.exit(1)
+    _print_startup_report(flask_app)
     flask_app.run(debug=True)
\ No newline at end of file
@@ -1,11 +1,21 @@
+import atexit
 import os
 import shutil
 import tempfile
 
 import pytest
 
-from server import create_app
-from database import db
+# config.logger fija la ruta del log de transacciones al importarse, así que
+# se redirige antes de importar server; de lo contrario las pruebas escriben y
+# rotan logs/transactions.log, que está versionado. El directorio se borra al
+# final, después de que el atexit del logger (registrado más tarde) lo cierre.
+_LOG_DIR = tempfile.mkdtemp(prefix="lab-tests-logs-")
+os.environ.setdefault("TRANSACTION_LOG_PATH", os.path.join(_LOG_DIR, "transactions.log"))
+os.environ.setdefault("TRANSACTION_LOG_SEGMENT_DIR", os.path.join(_LOG_DIR, "segments"))
+atexit.register(shutil.rmtree, _LOG_DIR, True)
+
+from server import create_app  # noqa: E402
+from database import db  # noqa: E402
 
 
 @pytest.fixture
@@ -1,6 +1,17 @@
+import csv
+import gzip
+import io
+import os
+import json
 import uuid
+import zlib
+from datetime import date
 
+from config.options import DATE_FORMAT
+from database import db
 from database.models import LaboratoryRequest, User
+from database.occupancy import get_day_bitmap
+from server import create_app
 
 
 def _unique_suffix():
@@ -76,6 +87,9 @@ def test_user_registration_login_and_logout_flow(client):
     assert logout_res.status_code == 200
     assert logout_res.json["message"] == "Sesión cerrada"
 
+    reuse_res = client.get("/api/auth/laboratory/reservations", headers=_auth_header(token))
+    assert reuse_res.status_code == 401
+
 
 def test_user_laboratory_reservation_flow(client, app):
     user_data = _user_payload()
@@ -182,3 +196,791 @@ def test_admin_management_flow(client, app):
 
     with app.app_context():
         assert User.query.get(user_id) is None
+
+
+def test_user_deletion_removes_reservations_in_bulk_or_deferred(client, app):
+    admin_token = _admin_token(client)
+    tokens = {}
+    user_ids = []
+    for _ in range(2):
+        user_data = _user_payload()
+        user_ids.append(client.post("/api/auth/register", json=user_data).json["usuario"]["id"])
+        token = client.post("/api/auth/login", json={
+            "correo": user_data["correo"],
+            "contrasena": user_data["contrasena"],
+        }).json["token"]
+        tokens[user_ids[-1]] = (user_data, token)
+        for horario in ("08:00 - 09:00", "09:00 - 10:00"):
+            payload = _reservation_payload(user_data["correo"])
+            payload.update({
+                "fecha_prestamo": f"{len(user_ids)}/7/2026",
+                "horario_uso": horario,
+                "laboratorio": "Laboratorio Computacion Avanzada",
+            })
+            assert client.post("/api/auth/laboratory", json=payload, headers=_auth_header(token)).status_code == 201
+
+    immediate, deferred = user_ids
+    assert client.delete(f"/api/admin/users/{immediate}", headers=_auth_header(admin_token)).status_code == 200
+    with app.app_context():
+        assert LaboratoryRequest.query.filter_by(user_id=immediate).count() == 0
+        assert get_day_bitmap("Laboratorio Computacion Avanzada", date(2026, 7, 1)) == 0
+
+    marked = client.delete(f"/api/admin/users/{deferred}?modo=diferido", headers=_auth_header(admin_token))
+    assert marked.status_code == 202
+    user_data, token = tokens[deferred]
+    assert client.post("/api/auth/login", json={
+        "correo": user_data["correo"],
+        "contrasena": user_data["contrasena"],
+    }).status_code == 401
+    assert client.get("/api/auth/laboratory/reservations", headers=_auth_header(token)).status_code == 404
+
+    assert app.extensions["user_purger"].wait_idle(timeout=5)
+    with app.app_context():
+        assert db.session.get(User, deferred) is None
+        assert LaboratoryRequest.query.filter_by(user_id=deferred).count() == 0
+        assert get_day_bitmap("Laboratorio Computacion Avanzada", date(2026, 7, 2)) == 0
+
+    invalid = client.delete(f"/api/admin/users/{deferred}?modo=papelera", headers=_auth_header(admin_token))
+    assert invalid.status_code == 400
+
+
+def test_marked_users_are_hidden_from_totals_and_purged_after_restart(client, app):
+    # Sin hilo de purga en este proceso, como si se reiniciara antes de purgar.
+    app.extensions["user_purger"].wake = lambda: None
+    admin_token = _admin_token(client)
+    user_data = _user_payload()
+    user_id = client.post("/api/auth/register", json=user_data).json["usuario"]["id"]
+    client.post(
+        "/api/admin/laboratories/import",
+        data=json.dumps(_reservation_payload(user_data["correo"])),
+        content_type="application/x-ndjson",
+        headers=_auth_header(admin_token),
+    )
+    with app.app_context():
+        assert LaboratoryRequest.query.filter_by(user_id=user_id).count() == 1
+
+    marked = client.post("/api/admin/users/batch", json={
+        "operacion": "eliminar", "ids": [user_id], "modo": "diferido",
+    }, headers=_auth_header(admin_token))
+    assert marked.json["resultados"] == [{"id": user_id, "estado": "marcado"}]
+    listing = client.get("/api/admin/users?total=exacto", headers=_auth_header(admin_token))
+    assert listing.json["total"] == 0
+    assert listing.json["usuarios"] == []
+
+    restarted = create_app()
+    try:
+        assert restarted.test_client().get("/api/admin/users", headers=_auth_header(admin_token)).status_code == 200
+        assert restarted.extensions["user_purger"].wait_idle(timeout=5)
+        with app.app_context():
+            assert db.session.get(User, user_id) is None
+            assert LaboratoryRequest.query.filter_by(user_id=user_id).count() == 0
+    finally:
+        with restarted.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+def _admin_token(client):
+    admin_data = _admin_payload()
+    client.post("/api/auth/register-admin", json=admin_data)
+    login_res = client.post("/api/auth/login-admin", json={
+        "correo": admin_data["correo"],
+        "contrasena": admin_data["contrasena"],
+    })
+    return login_res.json["token"]
+
+
+def test_admin_user_listing_keyset_pagination(client):
+    created_ids = set()
+    for _ in range(3):
+        res = client.post("/api/auth/register", json=_user_payload())
+        created_ids.add(res.json["usuario"]["id"])
+    admin_token = _admin_token(client)
+
+    first_page = client.get("/api/admin/users?limite=2&total=exacto", headers=_auth_header(admin_token))
+    assert first_page.status_code == 200
+    assert len(first_page.json["usuarios"]) == 2
+    assert first_page.json["total"] == 3
+    assert first_page.json["siguiente_cursor"]
+
+    second_page = client.get(
+        f"/api/admin/users?limite=2&cursor={first_page.json['siguiente_cursor']}",
+        headers=_auth_header(admin_token),
+    )
+    assert second_page.status_code == 200
+    assert len(second_page.json["usuarios"]) == 1
+    assert second_page.json["siguiente_cursor"] is None
+
+    seen_ids = {user["id"] for user in first_page.json["usuarios"] + second_page.json["usuarios"]}
+    assert seen_ids == created_ids
+
+    bad_cursor = client.get("/api/admin/users?cursor=%%%", headers=_auth_header(admin_token))
+    assert bad_cursor.status_code == 400
+
+
+def test_reservation_listing_total_is_exact_until_analyzed(client, app):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    token = client.post("/api/auth/login", json={
+        "correo": user_data["correo"],
+        "contrasena": user_data["contrasena"],
+    }).json["token"]
+    created = []
+    for horario in ("08:00 - 09:00", "10:00 - 11:00", "12:00 - 13:00"):
+        payload = _reservation_payload(user_data["correo"])
+        payload["horario_uso"] = horario
+        res = client.post("/api/auth/laboratory", json=payload, headers=_auth_header(token))
+        created.append(res.json["solicitud"]["id"])
+    admin_token = _admin_token(client)
+    client.delete(f"/api/admin/laboratories/{created[-1]}", headers=_auth_header(admin_token))
+
+    # Sin ANALYZE no hay estadísticas: el total por defecto es el conteo real,
+    # también después de borrar.
+    listing = client.get("/api/admin/laboratories", headers=_auth_header(admin_token))
+    assert (listing.json["total"], listing.json["total_estimado"]) == (2, False)
+
+    with app.app_context():
+        db.session.execute(db.text("ANALYZE"))
+        db.session.commit()
+    estimated = client.get("/api/admin/laboratories", headers=_auth_header(admin_token))
+    assert (estimated.json["total"], estimated.json["total_estimado"]) == (2, True)
+
+    skipped = client.get("/api/admin/laboratories?total=ninguno", headers=_auth_header(admin_token))
+    assert (skipped.json["total"], skipped.json["total_estimado"]) == (None, False)
+
+
+def test_list_serializers_match_model_dicts(client, app):
+    user_data = _user_payload()
+    user_data["nombre"] = "Begoña \"Ñ\" Peña"
+    user_id = client.post("/api/auth/register", json=user_data).json["usuario"]["id"]
+    user_token = client.post("/api/auth/login", json={
+        "correo": user_data["correo"],
+        "contrasena": user_data["contrasena"],
+    }).json["token"]
+    reservation_payload = _reservation_payload(user_data["correo"])
+    reservation_payload["materia_motivo"] = "Redes 100% \\ práctica"
+    assert client.post(
+        "/api/auth/laboratory", json=reservation_payload, headers=_auth_header(user_token)
+    ).status_code == 201
+    admin_token = _admin_token(client)
+
+    users = client.get("/api/admin/users", headers=_auth_header(admin_token)).json["usuarios"]
+    reservations = client.get("/api/admin/laboratories", headers=_auth_header(admin_token)).json["reservas"]
+    slots = client.get("/api/auth/laboratory/reservations", headers=_auth_header(user_token)).json["reservas"]
+
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        reservation = LaboratoryRequest.query.filter_by(user_id=user_id).one()
+        assert users == [dict(user.to_dict(), password="********")]
+        assert reservations == [reservation.to_dict()]
+        assert slots == [{
+            "laboratorio": reservation.laboratorio,
+            "fecha_prestamo": reservation.fecha_prestamo.strftime(DATE_FORMAT),
+            "horario_uso": reservation.horario_uso,
+        }]
+
+
+def test_laboratory_availability_window(client):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    token = client.post("/api/auth/login", json={
+        "correo": user_data["correo"],
+        "contrasena": user_data["contrasena"],
+    }).json["token"]
+
+    reservation_payload = _reservation_payload(user_data["correo"])
+    client.post("/api/auth/laboratory", json=reservation_payload, headers=_auth_header(token))
+
+    in_window = client.get(
+        "/api/auth/laboratory/availability?desde=1/2/2026&hasta=28/2/2026&laboratorio=Laboratorio Networking 1",
+        headers=_auth_header(token),
+    )
+    assert in_window.status_code == 200
+    assert in_window.json["total"] == 1
+    assert set(in_window.json["reservas"][0]) == {"laboratorio", "fecha_prestamo", "horario_uso"}
+
+    other_lab = client.get(
+        "/api/auth/laboratory/availability?desde=1/2/2026&hasta=28/2/2026&laboratorio=Laboratorio IHM",
+        headers=_auth_header(token),
+    )
+    assert other_lab.json["total"] == 0
+
+    outside = client.get(
+        "/api/auth/laboratory/availability?desde=1/3/2026&hasta=31/3/2026",
+        headers=_auth_header(token),
+    )
+    assert outside.json["total"] == 0
+
+    missing_bounds = client.get("/api/auth/laboratory/availability", headers=_auth_header(token))
+    assert missing_bounds.status_code == 400
+
+
+def test_laboratory_occupancy_returns_day_bitmaps(client):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    token = client.post("/api/auth/login", json={
+        "correo": user_data["correo"],
+        "contrasena": user_data["contrasena"],
+    }).json["token"]
+
+    reservation_payload = _reservation_payload(user_data["correo"])
+    reservation_payload.update({"fecha_prestamo": "6/5/2026", "horario_uso": "08:00 - 09:00"})
+    client.post("/api/auth/laboratory", json=reservation_payload, headers=_auth_header(token))
+
+    res = client.get(
+        "/api/auth/laboratory/occupancy?desde=1/5/2026&hasta=31/5/2026",
+        headers=_auth_header(token),
+    )
+    assert res.status_code == 200
+    assert res.json["resolucion_minutos"] == 15
+    [day] = res.json["ocupacion"]
+    assert day["fecha_prestamo"] == "06/05/2026"
+    bitmap = int.from_bytes(bytes.fromhex(day["bitmap"]), "little")
+    assert bitmap == 0b1111 << 32
+
+
+def test_free_slot_search_skips_reserved_slots(client):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    token = client.post("/api/auth/login", json={
+        "correo": user_data["correo"],
+        "contrasena": user_data["contrasena"],
+    }).json["token"]
+
+    reservation_payload = _reservation_payload(user_data["correo"])
+    reservation_payload.update({
+        "fecha_prestamo": "7/9/2026",
+        "horario_uso": "07:00 - 08:30",
+        "laboratorio": "Laboratorio IHM",
+        "equipo": "Kit Arduino",
+    })
+    assert client.post("/api/auth/laboratory", json=reservation_payload, headers=_auth_header(token)).status_code == 201
+
+    res = client.get(
+        "/api/auth/laboratory/free-slots?desde=7/9/2026&hasta=7/9/2026&laboratorio=Laboratorio IHM"
+        "&duracion=120&limite=2&numero_estudiantes=20",
+        headers=_auth_header(token),
+    )
+    assert res.status_code == 200
+    assert [c["horario_uso"] for c in res.json["candidatos"]] == ["08:30 - 10:30", "10:30 - 12:30"]
+
+    # El kit ya está prestado a las 07:00 en IHM, así que ningún laboratorio lo ofrece en esa franja.
+    with_kit = client.get(
+        "/api/auth/laboratory/free-slots?desde=7/9/2026&hasta=7/9/2026&duracion=60&limite=5&equipo=Kit Arduino",
+        headers=_auth_header(token),
+    )
+    assert {c["horario_uso"] for c in with_kit.json["candidatos"]} == {"08:30 - 09:30"}
+    assert with_kit.json["total"] == 5
+
+    semester = client.get(
+        "/api/auth/laboratory/free-slots?desde=1/9/2026&hasta=28/2/2027&duracion=90&limite=100",
+        headers=_auth_header(token),
+    )
+    assert semester.status_code == 200
+    assert semester.json["total"] == 100
+
+    too_many = client.get(
+        "/api/auth/laboratory/free-slots?desde=7/9/2026&hasta=7/9/2026&duracion=60&numero_estudiantes=99",
+        headers=_auth_header(token),
+    )
+    assert too_many.status_code == 400
+    assert client.get(
+        "/api/auth/laboratory/free-slots?desde=7/9/2026&hasta=7/9/2026",
+        headers=_auth_header(token),
+    ).status_code == 400
+
+
+def test_overlapping_reservations_are_rejected(client):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    token = client.post("/api/auth/login", json={
+        "correo": user_data["correo"],
+        "contrasena": user_data["contrasena"],
+    }).json["token"]
+
+    base_payload = _reservation_payload(user_data["correo"])
+    base_payload.update({"fecha_prestamo": "10/3/2026", "horario_uso": "08:00 - 10:00"})
+    assert client.post("/api/auth/laboratory", json=base_payload, headers=_auth_header(token)).status_code == 201
+
+    for horario in ("09:00 - 11:00", "08:00-10:00", "07:30 - 08:30"):
+        conflict = client.post(
+            "/api/auth/laboratory",
+            json={**base_payload, "horario_uso": horario},
+            headers=_auth_header(token),
+        )
+        assert conflict.status_code == 409, horario
+
+    adjacent = client.post(
+        "/api/auth/laboratory",
+        json={**base_payload, "horario_uso": "10:00-11:00"},
+        headers=_auth_header(token),
+    )
+    assert adjacent.status_code == 201
+    assert adjacent.json["solicitud"]["horario_uso"] == "10:00 - 11:00"
+
+    reversed_range = client.post(
+        "/api/auth/laboratory",
+        json={**base_payload, "horario_uso": "12:00 - 11:00"},
+        headers=_auth_header(token),
+    )
+    assert reversed_range.status_code == 400
+
+    admin_token = _admin_token(client)
+    moved = client.patch(
+        f"/api/admin/laboratories/{adjacent.json['solicitud']['id']}",
+        json={"horario_uso": "09:30 - 10:30"},
+        headers=_auth_header(admin_token),
+    )
+    assert moved.status_code == 409
+
+
+def test_admin_bulk_import_reports_each_row(client):
+    user_data = _user_payload()
+    user_id = client.post("/api/auth/register", json=user_data).json["usuario"]["id"]
+    admin_token = _admin_token(client)
+
+    base = _reservation_payload(user_data["correo"])
+    base.update({"fecha_prestamo": "20/4/2026", "laboratorio": "Laboratorio IHM"})
+    rows = [
+        {**base, "horario_uso": "08:00 - 10:00"},
+        {**base, "horario_uso": "09:00 - 10:30"},
+        {**base, "horario_uso": "10:00 - 11:00", "usuario_id": user_id},
+        {**base, "horario_uso": "11:00 - 12:00", "cargo": "Rector"},
+        {**base, "horario_uso": "12:00 - 13:00", "correo_institucional": "nadie@ups.edu.ec"},
+    ]
+    body = "\n".join(json.dumps(row) for row in rows) + "\n{no es json"
+
+    res = client.post(
+        "/api/admin/laboratories/import",
+        data=body,
+        content_type="application/x-ndjson",
+        headers=_auth_header(admin_token),
+    )
+    assert res.status_code == 200
+    estados = [entry["estado"] for entry in res.json["resultados"]]
+    assert estados == ["creada", "conflicto", "creada", "error", "error", "error"]
+    assert res.json["resumen"]["creadas"] == 2
+
+    csv_body = ",".join(base.keys()) + "\n" + ",".join(
+        str({**base, "horario_uso": "08:30 - 09:00"}[key]) for key in base
+    )
+    csv_res = client.post(
+        "/api/admin/laboratories/import",
+        data=csv_body,
+        content_type="text/csv",
+        headers=_auth_header(admin_token),
+    )
+    assert csv_res.status_code == 200
+    assert csv_res.json["resultados"] == [{"fila": 2, "estado": "conflicto", "message": "Horario ya reservado"}]
+
+
+def test_admin_import_rejects_oversized_bodies(client, monkeypatch):
+    from controllers import import_controller
+
+    monkeypatch.setattr(import_controller, "MAX_IMPORT_BYTES", 64)
+    admin_token = _admin_token(client)
+    res = client.post(
+        "/api/admin/laboratories/import",
+        data="\n".join(json.dumps(_reservation_payload("x@est.ups.edu.ec")) for _ in range(3)),
+        content_type="application/x-ndjson",
+        headers=_auth_header(admin_token),
+    )
+    assert res.status_code == 413
+    assert res.json["maximo_bytes"] == 64
+
+
+def test_raced_import_conflicts_are_found_across_chunks(app, monkeypatch):
+    from controllers import import_controller
+
+    monkeypatch.setattr(import_controller, "LOOKUP_CHUNK_SIZE", 2)
+    with app.app_context():
+        user = User(nombre="A", apellido="B", correo="raced@est.ups.edu.ec", password_hash="x",
+                    cedula="0102030405", carrera="Computacion")
+        db.session.add(user)
+        db.session.flush()
+
+        def reservation(fecha, start):
+            return LaboratoryRequest(
+                user_id=user.id, correo_institucional=user.correo, nombres_completos="A B", cargo="Estudiante",
+                carrera="Computacion", nivel="7mo", discapacidad="NO", materia_motivo="Carrera",
+                numero_estudiantes=2, fecha_prestamo=fecha,
+                horario_uso=f"{start // 60:02d}:{start % 60:02d} - {start // 60 + 1:02d}:{start % 60:02d}",
+                inicio_minutos=start, fin_minutos=start + 60, descripcion_actividades="Prueba",
+                laboratorio="Laboratorio IHM", equipo="Ninguno",
+            )
+
+        # La fila ajena que se confirmó entre la validación y el INSERT del lote.
+        db.session.add(reservation(date(2026, 9, 2), 750))
+        batch = [reservation(date(2026, 9, 1), hour * 60) for hour in range(8, 13)]
+        batch.append(reservation(date(2026, 9, 2), 720))
+        db.session.add_all(batch)
+        db.session.flush()
+
+        assert import_controller._find_raced_conflicts([record.id for record in batch]) == {batch[-1].id}
+        db.session.rollback()
+
+
+def test_admin_export_streams_filtered_reservations(client):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    admin_token = _admin_token(client)
+
+    base = _reservation_payload(user_data["correo"])
+    rows = [
+        {**base, "fecha_prestamo": "5/5/2026", "horario_uso": "08:00 - 09:00"},
+        {**base, "fecha_prestamo": "6/5/2026", "horario_uso": "08:00 - 09:00"},
+        {**base, "fecha_prestamo": "6/5/2026", "horario_uso": "09:00 - 10:00", "laboratorio": "Laboratorio IHM"},
+    ]
+    client.post(
+        "/api/admin/laboratories/import",
+        data="\n".join(json.dumps(row) for row in rows),
+        content_type="application/x-ndjson",
+        headers=_auth_header(admin_token),
+    )
+
+    ndjson_res = client.get(
+        "/api/admin/laboratories/export?desde=6/5/2026&hasta=6/5/2026",
+        headers=_auth_header(admin_token),
+    )
+    assert ndjson_res.status_code == 200
+    exported = [json.loads(line) for line in ndjson_res.get_data(as_text=True).splitlines()]
+    assert [entry["fecha_prestamo"] for entry in exported] == ["2026-05-06", "2026-05-06"]
+
+    csv_res = client.get(
+        "/api/admin/laboratories/export?formato=csv&laboratorio=Laboratorio IHM",
+        headers=_auth_header(admin_token),
+    )
+    assert csv_res.status_code == 200
+    lines = csv_res.get_data(as_text=True).splitlines()
+    assert lines[0].startswith("id,usuario_id,correo_institucional")
+    assert len(lines) == 2
+
+
+def test_admin_csv_export_neutralizes_formulas(client):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    admin_token = _admin_token(client)
+    payload = _reservation_payload(user_data["correo"])
+    payload.update({
+        "fecha_prestamo": "7/5/2026",
+        "nombres_completos": "@SUM(A1:A9)",
+        "materia_motivo": "=HYPERLINK(\"http://x\",\"clic\")",
+        "descripcion_actividades": "-2+3",
+    })
+    client.post(
+        "/api/admin/laboratories/import",
+        data=json.dumps(payload),
+        content_type="application/x-ndjson",
+        headers=_auth_header(admin_token),
+    )
+
+    csv_res = client.get("/api/admin/laboratories/export?formato=csv", headers=_auth_header(admin_token))
+    header, row = csv.reader(io.StringIO(csv_res.get_data(as_text=True)))
+    exported = dict(zip(header, row))
+    assert exported["nombres_completos"] == "'@SUM(A1:A9)"
+    assert exported["materia_motivo"] == "'=HYPERLINK(\"http://x\",\"clic\")"
+    assert exported["descripcion_actividades"] == "'-2+3"
+    assert exported["correo_institucional"] == user_data["correo"]
+
+    ndjson_res = client.get("/api/admin/laboratories/export", headers=_auth_header(admin_token))
+    assert json.loads(ndjson_res.get_data(as_text=True))["materia_motivo"] == payload["materia_motivo"]
+
+
+def test_admin_stats_group_and_refresh_after_writes(client, app):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    admin_token = _admin_token(client)
+
+    base = _reservation_payload(user_data["correo"])
+    base.update({"fecha_prestamo": "4/5/2026", "numero_estudiantes": 10})
+    rows = [
+        {**base, "horario_uso": "08:00 - 10:00"},
+        {**base, "horario_uso": "10:00 - 11:30", "laboratorio": "Laboratorio IHM", "carrera": "Sistemas"},
+        {**base, "fecha_prestamo": "12/5/2026", "horario_uso": "08:00 - 09:00", "numero_estudiantes": 30},
+    ]
+    imported = client.post(
+        "/api/admin/laboratories/import",
+        data="\n".join(json.dumps(row) for row in rows),
+        content_type="application/x-ndjson",
+        headers=_auth_header(admin_token),
+    ).json["resultados"]
+
+    url = "/api/admin/laboratories/stats?desde=1/5/2026&hasta=31/5/2026"
+    stats = client.get(url, headers=_auth_header(admin_token))
+    assert stats.status_code == 200
+    assert stats.json["totales"] == {"reservas": 3, "horas_reservadas": 4.5, "horas_estudiante": 65.0}
+    assert stats.json["por_laboratorio"] == [
+        {"laboratorio": "Laboratorio IHM", "reservas": 1, "horas_reservadas": 1.5, "horas_estudiante": 15.0},
+        {"laboratorio": "Laboratorio Networking 1", "reservas": 2, "horas_reservadas": 3.0, "horas_estudiante": 50.0},
+    ]
+    assert [(row["periodo"], row["reservas"]) for row in stats.json["por_periodo"]] == [
+        ("04/05/2026", 2), ("11/05/2026", 1),
+    ]
+    assert {row["carrera"]: row["reservas"] for row in stats.json["por_carrera"]} == {"Computacion": 2, "Sistemas": 1}
+
+    by_day = client.get(url + "&periodo=dia", headers=_auth_header(admin_token))
+    assert [row["periodo"] for row in by_day.json["por_periodo"]] == ["04/05/2026", "12/05/2026"]
+    assert len(app.extensions["stats_cache"]._entries) == 2
+
+    not_modified = client.get(url, headers={**_auth_header(admin_token), "If-None-Match": stats.headers["ETag"]})
+    assert not_modified.status_code == 304
+
+    client.delete(f"/api/admin/laboratories/{imported[2]['id']}", headers=_auth_header(admin_token))
+    refreshed = client.get(url, headers=_auth_header(admin_token))
+    assert refreshed.json["totales"]["reservas"] == 2
+    assert refreshed.headers["ETag"] != stats.headers["ETag"]
+
+    assert client.get(url + "&periodo=mes", headers=_auth_header(admin_token)).status_code == 400
+
+
+def test_admin_batch_operations_report_each_item(client, app):
+    user_data = _user_payload()
+    user_id = client.post("/api/auth/register", json=user_data).json["usuario"]["id"]
+    admin_token = _admin_token(client)
+
+    base = _reservation_payload(user_data["correo"])
+    base.update({"fecha_prestamo": "8/6/2026", "laboratorio": "Laboratorio Networking 2"})
+    rows = [
+        {**base, "horario_uso": "08:00 - 09:00"},
+        {**base, "horario_uso": "09:00 - 10:00"},
+        {**base, "horario_uso": "10:00 - 11:00"},
+    ]
+    imported = client.post(
+        "/api/admin/laboratories/import",
+        data="\n".join(json.dumps(row) for row in rows),
+        content_type="application/x-ndjson",
+        headers=_auth_header(admin_token),
+    ).json["resultados"]
+    first, second, third = (entry["id"] for entry in imported)
+
+    moved = client.post("/api/admin/laboratories/batch", json={
+        "operacion": "actualizar",
+        "ids": [second, third, 999999],
+        "cambios": {"horario_uso": "08:30 - 09:30"},
+    }, headers=_auth_header(admin_token))
+    assert moved.status_code == 200
+    assert moved.json["resultados"] == [
+        {"id": second, "estado": "conflicto", "message": "Horario ya reservado", "conflicto_con": first},
+        {"id": third, "estado": "conflicto", "message": "Horario ya reservado", "conflicto_con": first},
+        {"id": 999999, "estado": "no_encontrada"},
+    ]
+
+    # Al mover la primera, su horario queda libre para la segunda del mismo lote.
+    shifted = client.post("/api/admin/laboratories/batch", json={
+        "operacion": "actualizar",
+        "ids": [first, second],
+        "cambios": {"fecha_prestamo": "9/6/2026"},
+    }, headers=_auth_header(admin_token))
+    assert [entry["estado"] for entry in shifted.json["resultados"]] == ["actualizada", "actualizada"]
+
+    deleted = client.post("/api/admin/laboratories/batch", json={
+        "operacion": "eliminar",
+        "filtro": {"laboratorio": "Laboratorio Networking 2", "desde": "9/6/2026", "hasta": "9/6/2026"},
+    }, headers=_auth_header(admin_token))
+    assert deleted.json["resumen"] == {"eliminada": 2, "total": 2}
+    with app.app_context():
+        assert [row.id for row in LaboratoryRequest.query.filter_by(laboratorio="Laboratorio Networking 2")] == [third]
+
+    # "modo" solo se valida al eliminar.
+    updated = client.post("/api/admin/users/batch", json={
+        "operacion": "actualizar",
+        "ids": [user_id],
+        "cambios": {"carrera": "Ingenieria Civil"},
+        "modo": "papelera",
+    }, headers=_auth_header(admin_token))
+    assert updated.json["resultados"] == [{"id": user_id, "estado": "actualizado"}]
+
+    removed = client.post("/api/admin/users/batch", json={
+        "operacion": "eliminar",
+        "filtro": {"carrera": "Ingenieria Civil"},
+    }, headers=_auth_header(admin_token))
+    assert removed.json["resumen"] == {"eliminado": 1, "total": 1}
+    with app.app_context():
+        assert User.query.get(user_id) is None
+        assert LaboratoryRequest.query.filter_by(user_id=user_id).count() == 0
+
+    rejected = client.post("/api/admin/users/batch", json={
+        "operacion": "actualizar", "ids": [user_id], "cambios": {"correo": "x@ups.edu.ec"},
+    }, headers=_auth_header(admin_token))
+    assert rejected.status_code == 400
+
+
+def test_admin_metrics_exposes_latency_and_sql_histograms(client):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    user_login = client.post("/api/auth/login", json={
+        "correo": user_data["correo"],
+        "contrasena": user_data["contrasena"],
+    })
+    admin_token = _admin_token(client)
+
+    forbidden = client.get("/api/admin/metrics", headers=_auth_header(user_login.json["token"]))
+    assert forbidden.status_code == 403
+
+    res = client.get("/api/admin/metrics", headers=_auth_header(admin_token))
+    assert res.status_code == 200
+    assert res.content_type.startswith("text/plain")
+    body = res.get_data(as_text=True)
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert 'http_request_duration_seconds_count{endpoint="auth.register",method="POST",status="201"}' in body
+    assert 'http_request_db_statements_bucket{endpoint="auth.login",le="+Inf"}' in body
+    assert 'password_hash_seconds_count{operation="check"}' in body
+    assert f'metrics_worker_info{{pid="{os.getpid()}",responder="1"}} 1' in body
+
+
+def test_admin_metrics_sum_snapshots_from_other_workers(client, tmp_path):
+    from config.metrics import REQUEST_LATENCY, configure_multiprocess
+
+    admin_token = _admin_token(client)
+    client.get("/api/admin/users", headers=_auth_header(admin_token))
+    own = {tuple(labels): count for labels, _counts, _total, count in REQUEST_LATENCY.snapshot()}
+    labels = ("admin.admin_list_users", "GET", "200")
+
+    other_worker = [list(labels), [0] * (len(REQUEST_LATENCY.buckets) + 1), 0.5, 4]
+    other_worker[1][3] = 4
+    (tmp_path / "metrics-99999-abcdef12.json").write_text(json.dumps({
+        "pid": 99999, "histograms": {REQUEST_LATENCY.name: [other_worker]},
+    }))
+    configure_multiprocess(str(tmp_path))
+    try:
+        body = client.get("/api/admin/metrics", headers=_auth_header(admin_token)).get_data(as_text=True)
+    finally:
+        configure_multiprocess(None)
+
+    expected = own[labels] + 4
+    assert (
+        'http_request_duration_seconds_count{endpoint="admin.admin_list_users",method="GET",status="200"} '
+        f"{expected}"
+    ) in body
+    assert 'metrics_worker_info{pid="99999",responder="0"} 1' in body
+    assert f'metrics_worker_info{{pid="{os.getpid()}",responder="1"}} 1' in body
+    assert len(list(tmp_path.glob("metrics-*.json"))) == 2
+
+
+def test_reservation_listings_answer_conditional_requests(client):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    user_token = client.post("/api/auth/login", json={
+        "correo": user_data["correo"],
+        "contrasena": user_data["contrasena"],
+    }).json["token"]
+    admin_token = _admin_token(client)
+
+    first = client.get("/api/auth/laboratory/reservations", headers=_auth_header(user_token))
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get(
+        "/api/auth/laboratory/reservations",
+        headers={**_auth_header(user_token), "If-None-Match": etag},
+    )
+    assert cached.status_code == 304
+    assert cached.get_data() == b""
+
+    admin_first = client.get("/api/admin/laboratories?limite=5", headers=_auth_header(admin_token))
+    admin_etag = admin_first.headers["ETag"]
+    assert admin_etag != etag
+    other_page = client.get(
+        "/api/admin/laboratories?limite=10",
+        headers={**_auth_header(admin_token), "If-None-Match": admin_etag},
+    )
+    assert other_page.status_code == 200
+
+    created = client.post(
+        "/api/auth/laboratory",
+        json=_reservation_payload(user_data["correo"]),
+        headers=_auth_header(user_token),
+    )
+    assert created.status_code == 201
+
+    refreshed = client.get(
+        "/api/auth/laboratory/reservations",
+        headers={**_auth_header(user_token), "If-None-Match": etag},
+    )
+    assert refreshed.status_code == 200
+    assert refreshed.json["total"] == 1
+    assert refreshed.headers["ETag"] != etag
+
+    client.delete(f"/api/admin/laboratories/{created.json['solicitud']['id']}", headers=_auth_header(admin_token))
+    after_delete = client.get(
+        "/api/auth/laboratory/reservations",
+        headers={**_auth_header(user_token), "If-None-Match": refreshed.headers["ETag"]},
+    )
+    assert after_delete.status_code == 200
+    assert after_delete.json["total"] == 0
+
+    user_id = client.get("/api/admin/users", headers=_auth_header(admin_token)).json["usuarios"][0]["id"]
+    client.delete(f"/api/admin/users/{user_id}?modo=diferido", headers=_auth_header(admin_token))
+    gone = client.get(
+        "/api/auth/laboratory/reservations",
+        headers={**_auth_header(user_token), "If-None-Match": after_delete.headers["ETag"]},
+    )
+    assert gone.status_code == 404
+
+
+def test_api_responses_are_compressed_when_negotiated(client, app):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    admin_token = _admin_token(client)
+    base = _reservation_payload(user_data["correo"])
+    rows = [
+        {**base, "fecha_prestamo": f"{day}/8/2026", "horario_uso": "08:00 - 09:00"}
+        for day in range(1, 21)
+    ]
+    client.post(
+        "/api/admin/laboratories/import",
+        data="\n".join(json.dumps(row) for row in rows),
+        content_type="application/x-ndjson",
+        headers=_auth_header(admin_token),
+    )
+    headers = _auth_header(admin_token)
+
+    plain = client.get("/api/admin/laboratories", headers=headers)
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    gzipped = client.get("/api/admin/laboratories", headers={**headers, "Accept-Encoding": "gzip, deflate"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert int(gzipped.headers["Content-Length"]) < len(plain.get_data())
+    assert gzip.decompress(gzipped.get_data()) == plain.get_data()
+    assert gzipped.headers["ETag"] == f"W/{plain.headers['ETag']}"
+
+    cached = client.get(
+        "/api/admin/laboratories",
+        headers={**headers, "Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["ETag"]},
+    )
+    assert cached.status_code == 304
+    assert "Content-Encoding" not in cached.headers
+
+    refused = client.get("/api/admin/laboratories", headers={**headers, "Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in refused.headers
+
+    small = client.get(
+        "/api/admin/laboratories/stats?desde=1/8/2026&hasta=1/8/2026&laboratorio=Laboratorio IHM",
+        headers={**headers, "Accept-Encoding": "gzip"},
+    )
+    assert small.status_code == 200
+    assert "Content-Encoding" not in small.headers
+
+    streamed = client.get("/api/admin/laboratories/export", headers={**headers, "Accept-Encoding": "deflate"})
+    assert streamed.headers["Content-Encoding"] == "deflate"
+    assert "Content-Length" not in streamed.headers
+    exported = zlib.decompress(streamed.get_data()).decode("utf-8").splitlines()
+    assert len(exported) == len(rows)
+
+    app.config["COMPRESSION_LEVEL"] = 1
+    fast = client.get("/api/admin/laboratories", headers={**headers, "Accept-Encoding": "gzip"})
+    assert gzip.decompress(fast.get_data()) == plain.get_data()
+
+
+def test_login_is_rate_limited_per_correo(client):
+    user_data = _user_payload()
+    client.post("/api/auth/register", json=user_data)
+    credentials = {"correo": user_data["correo"], "contrasena": "Incorrecta1"}
+
+    statuses = [client.post("/api/auth/login", json=credentials).status_code for _ in range(6)]
+    assert statuses == [401] * 5 + [429]
+
+    blocked = client.post("/api/auth/login", json=credentials)
+    assert blocked.status_code == 429
+    assert int(blocked.headers["Retry-After"]) >= 1
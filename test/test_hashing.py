@@ -0,0 +1,21 @@
+from config.hashing import PasswordHasher, hash_rounds
+
+
+def test_password_hasher_roundtrip_in_worker_pool():
+    hasher = PasswordHasher(rounds=4, workers=1)
+    try:
+        password_hash = hasher.hash("Passw0rd1")
+        assert hash_rounds(password_hash) == 4
+        assert hasher.check(password_hash, "Passw0rd1")
+        assert not hasher.check(password_hash, "Otra0clave")
+    finally:
+        hasher.shutdown()
+
+
+def test_password_hasher_flags_hashes_with_other_cost():
+    old_hash = PasswordHasher(rounds=4, workers=0).hash("Passw0rd1")
+    hasher = PasswordHasher(rounds=5, workers=0)
+
+    assert hasher.needs_rehash(old_hash)
+    assert hasher.check(old_hash, "Passw0rd1")
+    assert not hasher.needs_rehash(hasher.hash("Passw0rd1"))
@@ -0,0 +1,44 @@
+from tools.log_analysis import analyze, bucket_key
+
+
+def _line(timestamp, status, endpoint, ip="10.0.0.1"):
+    return (
+        f"{timestamp} | method=POST | path=/api/auth/login | status={status} | "
+        f"identity=anonymous | ip={ip} | endpoint={endpoint}\n"
+    )
+
+
+def test_bucket_key_truncates_to_interval():
+    assert bucket_key("2024-05-06 10:37:12", 15) == "2024-05-06 10:30"
+    assert bucket_key("2024-05-06 10:37:12", 60) == "2024-05-06 10:00"
+    assert bucket_key("2024-05-06 10:37:12", 1440) == "2024-05-06"
+
+
+def test_analyze_resumes_from_saved_offset(tmp_path):
+    log_path = tmp_path / "transactions.log"
+    state_path = tmp_path / "state.json"
+    log_path.write_text(
+        _line("2024-05-06 10:01:00", 200, "auth.login")
+        + _line("2024-05-06 10:02:00", 401, "auth.login")
+        + "línea corrupta\n"
+        + _line("2024-05-06 1x:zz:00", 200, "auth.login")
+        + _line("2024-05-06 10:07:00", 200, "auth.login"),
+        encoding="utf-8",
+    )
+
+    first = analyze(str(log_path), ["endpoint", "status"], "5m", state_path=str(state_path))
+    assert first.lines_read == 3
+    assert first.lines_skipped == 2
+    assert list(first.rows()) == [
+        ("2024-05-06 10:00", "auth.login|200", 1),
+        ("2024-05-06 10:00", "auth.login|401", 1),
+        ("2024-05-06 10:05", "auth.login|200", 1),
+    ]
+
+    with open(log_path, "a", encoding="utf-8") as stream:
+        stream.write(_line("2024-05-06 10:08:00", 200, "auth.login"))
+        stream.write(_line("2024-05-06 10:09:00", 200, "auth.login")[:20])  # línea aún incompleta
+
+    second = analyze(str(log_path), ["endpoint", "status"], "5m", state_path=str(state_path))
+    assert second.lines_read == 1
+    assert ("2024-05-06 10:05", "auth.login|200", 2) in list(second.rows())
@@ -0,0 +1,161 @@
+import gzip
+import json
+import multiprocessing
+import os
+import threading
+from datetime import datetime
+
+from tools.log_analysis import analyze
+from config import log_segments
+from config.log_segments import SegmentedLog
+
+
+def _entries(hour, count, tag="a"):
+    return [
+        f"2024-05-06 {hour:02d}:{minute % 60:02d}:00 | method=GET | path=/api/{tag} | status=200 | "
+        f"identity=anonymous | ip=10.0.0.1 | endpoint=auth.{tag}"
+        for minute in range(count)
+    ]
+
+
+def test_rotation_compresses_segments_with_time_index(tmp_path):
+    log_path = str(tmp_path / "transactions.log")
+    segmented = SegmentedLog(log_path, max_bytes=2000, rotate_seconds=0, block_bytes=500)
+
+    for hour in range(10, 14):
+        segmented.write_batch(_entries(hour, 20))
+    assert segmented.wait_for_compression(timeout=5)
+
+    segments = segmented.segments()
+    assert len(segments) == 3
+    path, index = segments[0]
+    assert index["first"] == "2024-05-06 10:00:00"
+    assert index["last"] == "2024-05-06 10:19:00"
+    assert len(index["blocks"]) > 1
+    with gzip.open(path, "rt", encoding="utf-8") as stream:
+        assert len(stream.read().splitlines()) == index["lines"] == 20
+    assert not [name for name in os.listdir(segmented.segment_dir) if name.endswith(".log")]
+
+    selected = list(segmented.iter_range("2024-05-06 11:05:00", "2024-05-06 11:07:59"))
+    assert [line[:19] for line in selected] == [
+        "2024-05-06 11:05:00", "2024-05-06 11:06:00", "2024-05-06 11:07:00",
+    ]
+    assert len(list(segmented.iter_range("2024-05-06 13:00:00", None))) == 20
+
+
+def test_time_rotation_happens_once_per_interval(tmp_path):
+    log_path = str(tmp_path / "transactions.log")
+    segmented = SegmentedLog(log_path, max_bytes=0, rotate_seconds=3600)
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    segmented.write_batch(_entries(10, 2))
+    for _ in range(3):
+        segmented.write_batch([f"{now} | method=GET | path=/api/a | status=200"])
+    assert segmented.wait_for_compression(timeout=5)
+
+    assert len(segmented.segments()) == 1
+    assert len(list(segmented.iter_range(now, None))) == 3
+
+
+def test_analysis_continues_across_rotation(tmp_path):
+    log_path = str(tmp_path / "transactions.log")
+    state_path = str(tmp_path / "state.json")
+    segmented = SegmentedLog(log_path, max_bytes=1500, rotate_seconds=0)
+
+    segmented.write_batch(_entries(10, 5))
+    assert analyze(log_path, ["endpoint"], "1h", state_path=state_path).lines_read == 5
+
+    segmented.write_batch(_entries(10, 10)[5:])
+    segmented.write_batch(_entries(11, 3, tag="b"))
+
+    second = analyze(log_path, ["endpoint"], "1h", state_path=state_path)
+    assert second.lines_read == 8
+    assert dict(((bucket, group), count) for bucket, group, count in second.rows()) == {
+        ("2024-05-06 10:00", "auth.a"): 10,
+        ("2024-05-06 11:00", "auth.b"): 3,
+    }
+
+
+def test_compression_runs_off_the_write_path(tmp_path, monkeypatch):
+    log_path = str(tmp_path / "transactions.log")
+    state_path = str(tmp_path / "state.json")
+    segmented = SegmentedLog(log_path, max_bytes=1000, rotate_seconds=0)
+    release = threading.Event()
+    original = log_segments.compress_segment
+
+    def slow_compress(raw_path, *args, **kwargs):
+        assert release.wait(timeout=5)
+        return original(raw_path, *args, **kwargs)
+
+    monkeypatch.setattr(log_segments, "compress_segment", slow_compress)
+
+    segmented.write_batch(_entries(10, 5))
+    assert analyze(log_path, ["endpoint"], "1h", state_path=state_path).lines_read == 5
+    # Las dos rotaciones vuelven sin esperar a que termine la compresión.
+    segmented.write_batch(_entries(10, 10)[5:])
+    segmented.write_batch(_entries(11, 10, tag="b"))
+    segmented.write_batch(_entries(12, 1, tag="c"))
+    pending = [name for name in os.listdir(segmented.segment_dir) if name.endswith(".log")]
+    assert len(pending) == 2
+
+    assert len(list(segmented.iter_range())) == 21
+    second = analyze(log_path, ["endpoint"], "1h", state_path=state_path)
+    assert second.lines_read == 16
+    assert sum(count for _bucket, _group, count in second.rows()) == 21
+
+    release.set()
+    assert segmented.wait_for_compression(timeout=5)
+    assert len(segmented.segments()) == 2
+    assert len(list(segmented.iter_range())) == 21
+
+
+def test_analysis_does_not_resume_on_a_reused_inode(tmp_path):
+    log_path = str(tmp_path / "transactions.log")
+    state_path = str(tmp_path / "state.json")
+    segmented = SegmentedLog(log_path, max_bytes=1000, rotate_seconds=0, background_compression=False)
+
+    segmented.write_batch(_entries(10, 5))
+    analyze(log_path, ["endpoint"], "1h", state_path=state_path)
+    segmented.write_batch(_entries(10, 10)[5:])
+    segmented.write_batch(_entries(11, 8, tag="b"))
+
+    # El archivo activo nuevo recibe el inodo del segmento rotado, como cuando
+    # el sistema reutiliza el de un .log ya borrado.
+    active_inode = os.stat(log_path).st_ino
+    (segment_path, index), = segmented.segments()
+    index["inode"] = active_inode
+    with open(segment_path[: -len(".log.gz")] + ".idx.json", "w", encoding="utf-8") as stream:
+        json.dump(index, stream)
+    with open(state_path, encoding="utf-8") as stream:
+        state = json.load(stream)
+    state["inode"] = active_inode
+    with open(state_path, "w", encoding="utf-8") as stream:
+        json.dump(state, stream)
+
+    resumed = analyze(log_path, ["endpoint"], "1h", state_path=state_path)
+    assert resumed.lines_read == 13
+    assert dict(((bucket, group), count) for bucket, group, count in resumed.rows()) == {
+        ("2024-05-06 10:00", "auth.a"): 10,
+        ("2024-05-06 11:00", "auth.b"): 8,
+    }
+
+
+def _write_many(log_path, worker):
+    segmented = SegmentedLog(log_path, max_bytes=4000, rotate_seconds=0, block_bytes=1000)
+    for batch in range(40):
+        segmented.write_batch([f"2024-05-06 10:00:00 | worker={worker} | batch={batch} | status=200 | x=y"] * 5)
+    segmented.wait_for_compression(timeout=5)
+
+
+def test_concurrent_writers_lose_no_lines(tmp_path):
+    log_path = str(tmp_path / "transactions.log")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_write_many, args=(log_path, worker)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+
+    lines = list(SegmentedLog(log_path, max_bytes=4000, rotate_seconds=0).iter_range())
+    assert len(lines) == 4 * 40 * 5
+    assert all(line.endswith("x=y") for line in lines)
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from config.logger import BatchedLogWriter
+
+
+def test_batched_writer_drains_on_close():
+    batches = []
+    writer = BatchedLogWriter(batches.append, max_queue=1000, batch_size=50, flush_interval=10)
+
+    for index in range(120):
+        assert writer.submit(f"entry-{index}")
+    writer.close()
+
+    written = [entry for batch in batches for entry in batch]
+    assert written == [f"entry-{index}" for index in range(120)]
+    assert all(len(batch) <= 50 for batch in batches)
+
+
+def test_batched_writer_drop_newest_counts_overflow():
+    writer = BatchedLogWriter(lambda entries: None, max_queue=2, overflow="drop_newest")
+    # Sin hilo iniciado la cola no se vacía, así que la tercera entrada desborda.
+    writer._ensure_started = lambda: None
+
+    assert writer.submit("a")
+    assert writer.submit("b")
+    assert not writer.submit("c")
+    assert writer.dropped == 1
+
+
+def test_batched_writer_reset_after_fork_discards_parent_state():
+    batches = []
+    writer = BatchedLogWriter(batches.append, max_queue=10, flush_interval=10)
+    writer._ensure_started = lambda: None
+    writer.submit("heredada")
+
+    writer.reset_after_fork()
+    del writer._ensure_started
+    assert not writer.is_running()
+
+    writer.submit("hijo")
+    writer.close()
+    assert [entry for batch in batches for entry in batch] == ["hijo"]
+
+
+def test_batched_writer_drop_oldest_accounts_for_every_entry_across_close():
+    written = []
+    lock = threading.Lock()
+
+    def slow_sink(entries):
+        time.sleep(0.001)
+        with lock:
+            written.extend(entries)
+
+    writer = BatchedLogWriter(slow_sink, max_queue=4, batch_size=2, flush_interval=0.01, overflow="drop_oldest")
+    producers, per_producer = 8, 500
+
+    def produce():
+        for index in range(per_producer):
+            writer.submit(f"entry-{index}")
+
+    threads = [threading.Thread(target=produce) for _ in range(producers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.02)
+    started = time.monotonic()
+    # Con el centinela desalojado por un put concurrente, close() agotaba el timeout.
+    writer.close(timeout=5.0)
+    assert time.monotonic() - started < 2.0
+    for thread in threads:
+        thread.join()
+
+    assert len(written) + writer.dropped == producers * per_producer
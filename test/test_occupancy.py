@@ -0,0 +1,119 @@
+from datetime import date
+
+from database import db
+from database.models import LaboratoryOccupancy, LaboratoryRequest, User
+from database.occupancy import (
+    decode_bitmap,
+    get_day_bitmap,
+    free_starts,
+    is_slot_free,
+    main as occupancy_main,
+    rebuild_occupancy,
+    slot_mask,
+    slot_status,
+)
+
+
+def _stored_bitmaps():
+    return {
+        (row.laboratorio, row.fecha_prestamo): decode_bitmap(row.bitmap)
+        for row in LaboratoryOccupancy.query.all()
+    }
+
+
+def _reservation(user, laboratorio, fecha, start, end):
+    return LaboratoryRequest(
+        user_id=user.id,
+        correo_institucional=user.correo,
+        nombres_completos="Tester Usuario",
+        cargo="ESTUDIANTE",
+        carrera="COMPUTACION",
+        nivel="7MO",
+        discapacidad="NO",
+        materia_motivo="Pruebas",
+        numero_estudiantes=3,
+        fecha_prestamo=fecha,
+        horario_uso=f"{start // 60:02d}:{start % 60:02d} - {end // 60:02d}:{end % 60:02d}",
+        inicio_minutos=start,
+        fin_minutos=end,
+        descripcion_actividades="Pruebas",
+        laboratorio=laboratorio,
+        equipo="NINGUNO",
+    )
+
+
+def test_slot_status_is_exact_on_aligned_blocks_and_defers_on_partial_ones():
+    occupied = slot_mask(8 * 60, 9 * 60 + 10)
+    assert slot_status(occupied, 10 * 60, 11 * 60) is True
+    assert slot_status(occupied, 8 * 60 + 30, 9 * 60) is False
+    # 09:10 - 09:15 y 09:10 - 09:30 comparten el bloque 09:00-09:15 sin cubrirlo.
+    assert slot_status(occupied, 9 * 60 + 10, 9 * 60 + 15) is None
+    assert slot_status(occupied, 9 * 60 + 10, 9 * 60 + 30) is None
+
+
+def test_free_starts_skips_occupied_blocks_and_respects_the_window():
+    occupied = slot_mask(9 * 60, 10 * 60 + 10)
+    starts = list(free_starts(occupied, 60, 8 * 60, 13 * 60))
+    # 08:00-09:00 cabe; 10:10 deja ocupado el bloque 10:00-10:15.
+    assert starts == [8 * 60, 10 * 60 + 15, 11 * 60 + 15]
+    assert list(free_starts(occupied, 90, 8 * 60, 9 * 60 + 30)) == []
+
+
+def test_bitmaps_follow_create_update_delete_and_match_rebuild(app):
+    lab, other_lab = "LABORATORIO IHM", "LABORATORIO NETWORKING 1"
+    day, other_day = date(2026, 5, 4), date(2026, 5, 5)
+    with app.app_context():
+        user = User(
+            nombre="Test", apellido="User", correo="ocupacion@est.ups.edu.ec",
+            password_hash="x", cedula="0102030405", carrera="Ingenieria de Sistemas",
+        )
+        db.session.add(user)
+        db.session.commit()
+
+        first = _reservation(user, lab, day, 8 * 60, 10 * 60)
+        second = _reservation(user, lab, day, 10 * 60, 10 * 60 + 20)
+        db.session.add_all([first, second])
+        db.session.commit()
+        assert get_day_bitmap(lab, day) == slot_mask(8 * 60, 10 * 60 + 20)
+
+        first.laboratorio = other_lab
+        first.fecha_prestamo = other_day
+        db.session.commit()
+        assert get_day_bitmap(lab, day) == slot_mask(10 * 60, 10 * 60 + 20)
+        assert get_day_bitmap(other_lab, other_day) == slot_mask(8 * 60, 10 * 60)
+
+        db.session.delete(second)
+        db.session.commit()
+        assert (lab, day) not in _stored_bitmaps()
+
+        maintained = _stored_bitmaps()
+        assert rebuild_occupancy() == 1
+        assert _stored_bitmaps() == maintained
+
+
+def test_is_slot_free_ignores_the_excluded_reservation_and_cli_rebuilds(app, capsys):
+    lab, day = "LABORATORIO IHM", date(2026, 5, 4)
+    with app.app_context():
+        user = User(
+            nombre="Test", apellido="User", correo="ocupacion-cli@est.ups.edu.ec",
+            password_hash="x", cedula="0102030405", carrera="Ingenieria de Sistemas",
+        )
+        db.session.add(user)
+        db.session.commit()
+        reservation = _reservation(user, lab, day, 8 * 60, 9 * 60)
+        db.session.add(reservation)
+        db.session.commit()
+
+        assert is_slot_free(lab, day, 8 * 60, 9 * 60) is False
+        assert is_slot_free(lab, day, 8 * 60, 9 * 60, exclude_id=reservation.id) is True
+        assert is_slot_free(lab, day, 9 * 60, 10 * 60) is True
+
+        # Tabla desalineada (p. ej. una migración interrumpida): la CLI la repara.
+        LaboratoryOccupancy.query.delete()
+        db.session.commit()
+        db.session.remove()
+
+    assert occupancy_main() == 0
+    assert "reconstruidos: 1" in capsys.readouterr().out
+    with app.app_context():
+        assert get_day_bitmap(lab, day) == slot_mask(8 * 60, 9 * 60)
@@ -0,0 +1,16 @@
+import pytest
+
+from prefork import ForkSafetyError, prepare_app_for_fork
+from server import create_app
+
+
+def test_prepare_app_for_fork_accepts_wal_file_database(app):
+    warnings = prepare_app_for_fork(app)
+    # Otras pruebas del mismo proceso pueden haber iniciado el hilo del log.
+    assert all("escritor del log" in warning for warning in warnings)
+
+
+def test_prepare_app_for_fork_rejects_in_memory_sqlite(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite://")
+    with pytest.raises(ForkSafetyError):
+        prepare_app_for_fork(create_app())
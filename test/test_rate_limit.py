@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+from config.rate_limit import MemoryBucketStore, RateLimiter, SQLiteBucketStore
+
+POLICIES = {"login": {"correo": (2, 10.0), "ip": (3, 10.0)}}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path):
+    if request.param == "memory":
+        return RateLimiter(MemoryBucketStore(), POLICIES)
+    return RateLimiter(SQLiteBucketStore(str(tmp_path / "buckets.db")), POLICIES)
+
+
+def test_bucket_blocks_after_burst_and_refills(limiter, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+
+    assert limiter.check("login", "a@uide.edu.ec", "10.0.0.1") == 0
+    assert limiter.check("login", "A@uide.edu.ec ", "10.0.0.1") == 0
+    assert limiter.check("login", "a@uide.edu.ec", "10.0.0.1") == pytest.approx(10.0)
+
+    # El intento rechazado no consumió el bucket de la IP.
+    assert limiter.check("login", "b@uide.edu.ec", "10.0.0.1") == 0
+    assert limiter.check("login", "c@uide.edu.ec", "10.0.0.1") == pytest.approx(10.0)
+
+    now[0] += 10.0
+    assert limiter.check("login", "a@uide.edu.ec", "10.0.0.1") == 0
+    assert limiter.check("register", "a@uide.edu.ec", "10.0.0.1") == 0
+
+
+def test_memory_store_prunes_to_bound():
+    store = MemoryBucketStore(max_keys=10)
+    for index in range(50):
+        store.consume([(f"k{index}", 5, 1.0)], now=float(index))
+    assert len(store._buckets) <= 10
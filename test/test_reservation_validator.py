@@ -0,0 +1,30 @@
+from controllers.reservation_validator import RESERVATION_VALIDATOR, error_payload
+
+
+def test_validator_accepts_accented_and_label_aliases():
+    assert RESERVATION_VALIDATOR.choice("carrera", "Computación") == ("Computacion", None)
+    assert RESERVATION_VALIDATOR.choice("laboratorio", "laboratorio ihm") == ("Laboratorio IHM", None)
+    assert RESERVATION_VALIDATOR.choice("cargo", " estudiante ") == ("Estudiante", None)
+
+
+def test_validator_reports_every_field_error_in_one_pass():
+    values, errors = RESERVATION_VALIDATOR.validate({
+        "cargo": "Rector",
+        "numero_estudiantes": 99,
+        "fecha_prestamo": "2026-02-30",
+    }, partial=True)
+
+    assert values == {}
+    assert set(errors) == {"cargo", "numero_estudiantes", "fecha_prestamo"}
+    body = error_payload(errors)
+    assert body["message"] == "Valor no permitido para cargo"
+    assert set(body["errores"]) == set(errors)
+
+
+def test_validator_lists_missing_fields_for_full_payload():
+    _values, errors = RESERVATION_VALIDATOR.validate({"cargo": "Docente"})
+    body = error_payload(errors)
+
+    assert body["message"] == "Campos requeridos faltantes"
+    assert "cargo" not in body["faltantes"]
+    assert "laboratorio" in body["faltantes"]
@@ -0,0 +1,55 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+from database import db
+from database.occupancy import get_day_bitmap, slot_mask
+from database.schema import SCHEMA_VERSION, SchemaMigrationError, current_schema_version, prepare_schema
+from server import create_app
+
+
+def test_prepare_schema_skips_work_once_version_is_stored(app):
+    with app.app_context():
+        assert current_schema_version() == SCHEMA_VERSION
+        assert app.config["SCHEMA_MIGRATED"] is True
+        assert prepare_schema() is False
+
+
+def test_unparseable_horario_rows_abort_the_migration(tmp_path, monkeypatch, caplog):
+    db_path = tmp_path / "legacy.db"
+    with sqlite3.connect(db_path) as connection:
+        # Tabla anterior a inicio_minutos/fin_minutos.
+        connection.execute(
+            "CREATE TABLE laboratory_requests (id INTEGER PRIMARY KEY, user_id INTEGER, laboratorio TEXT, "
+            "fecha_prestamo DATE, horario_uso TEXT, created_at DATETIME)"
+        )
+        connection.executemany(
+            "INSERT INTO laboratory_requests (laboratorio, fecha_prestamo, horario_uso) VALUES (?, ?, ?)",
+            [("Laboratorio IHM", "2026-03-02", "08:00 - 09:00"), ("Laboratorio IHM", "2026-03-02", "a media mañana")],
+        )
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{db_path}")
+
+    with pytest.raises(SchemaMigrationError) as raised:
+        create_app()
+    assert raised.value.rows == [(2, "a media mañana")]
+    assert "ids 2" in str(raised.value)
+    assert "a media mañana" in caplog.text
+
+    with sqlite3.connect(db_path) as connection:
+        # La migración se revierte completa: la versión no queda guardada.
+        assert connection.execute("PRAGMA user_version").fetchone()[0] == 0
+        connection.execute("UPDATE laboratory_requests SET horario_uso = '10:00 - 11:00' WHERE id = 2")
+
+    app = create_app()
+    with app.app_context():
+        assert current_schema_version() == SCHEMA_VERSION
+        minutes = db.session.execute(db.text(
+            "SELECT inicio_minutos, fin_minutos FROM laboratory_requests ORDER BY id"
+        )).fetchall()
+        assert [tuple(row) for row in minutes] == [(480, 540), (600, 660)]
+        # create_all() ya había creado laboratory_occupancy en el intento fallido;
+        # aun así los bitmaps se reconstruyen con ambas reservas.
+        assert get_day_bitmap("Laboratorio IHM", date(2026, 3, 2)) == slot_mask(480, 540) | slot_mask(600, 660)
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,53 @@
+import os
+import time
+
+import pytest
+
+from database import db
+from database.models import RevokedToken
+from database.token_blocklist import RevokedTokenCache
+
+
+@pytest.fixture
+def tokyo_timezone():
+    previous = os.environ.get("TZ")
+    os.environ["TZ"] = "Asia/Tokyo"
+    time.tzset()
+    yield
+    if previous is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = previous
+    time.tzset()
+
+
+def test_synced_revocations_survive_eviction_outside_utc(app, tokyo_timezone):
+    with app.app_context():
+        db.session.add(RevokedToken(jti="revocado-en-otro-worker"))
+        db.session.commit()
+
+        cache = RevokedTokenCache(sync_interval=60.0, token_lifetime=3600.0)
+        now = time.time()
+        assert cache.sync(now) == 1
+        assert cache.evict_expired(now) == 0
+        assert cache.is_revoked("revocado-en-otro-worker", now)
+        assert cache.is_revoked("revocado-en-otro-worker", now + 3590)
+
+        cache.evict_expired(now + 3700)
+        assert len(cache) == 0
+
+
+def test_logout_in_another_worker_is_seen_on_the_next_check(app):
+    with app.app_context():
+        worker_a = RevokedTokenCache(token_lifetime=3600.0)
+        worker_b = RevokedTokenCache(token_lifetime=3600.0)
+        assert not worker_b.is_revoked("token-compartido")
+
+        # Logout atendido por el worker A: fila nueva y versión incrementada en
+        # la misma transacción.
+        db.session.add(RevokedToken(jti="token-compartido"))
+        db.session.commit()
+        worker_a.add("token-compartido")
+
+        assert worker_b.is_revoked("token-compartido")
+        assert len(worker_b) == 1
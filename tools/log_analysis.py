@@ -0,0 +1,266 @@
+"""Análisis incremental del log de transacciones.
+
+Uso:
+    python -m tools.log_analysis --by endpoint,status --bucket 5m
+    python -m tools.log_analysis --by ip --bucket 1h --status 4 --top 5
+    python -m tools.log_analysis --by identity --format csv --reset
+
+Lee el archivo por bloques desde el último byte procesado (guardado junto a los
+conteos en un archivo de estado), así que las corridas repetidas solo leen las
+líneas nuevas. Si el log se rotó entre corridas, primero termina el segmento
+correspondiente, comprimido o todavía sin comprimir (ver config/log_segments.py).
+El archivo se reconoce por inodo y por la huella de su primera línea, porque un
+inodo liberado al borrar un segmento puede reutilizarse. La memoria no depende
+del tamaño del log: se conservan como máximo --max-buckets intervalos y
+--max-groups grupos por intervalo.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from typing import Dict, Iterator, Optional, Tuple
+
+from config.log_segments import SEGMENT_SUFFIX, SegmentedLog, iter_source_lines, read_head, read_index
+from config.logger import LOG_FILE_PATH
+
+GROUP_FIELDS = ("endpoint", "status", "identity", "ip", "method", "path")
+BUCKET_MINUTES = {"1m": 1, "5m": 5, "15m": 15, "1h": 60, "1d": 1440}
+READ_CHUNK_SIZE = 1 << 20
+OVERFLOW_GROUP = "(otros)"
+STATE_VERSION = 1
+TIMESTAMP_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+
+
+def bucket_key(timestamp: str, minutes: int) -> str:
+    # timestamp tiene el formato "YYYY-MM-DD HH:MM:SS" de log_endpoint_transaction;
+    # se agrupa cortando la cadena para no construir un datetime por línea.
+    if minutes >= 1440:
+        return timestamp[:10]
+    if minutes >= 60:
+        return timestamp[:13] + ":00"
+    minute = int(timestamp[14:16]) // minutes * minutes
+    return f"{timestamp[:13]}:{minute:02d}"
+
+
+def parse_line(line: str) -> Optional[Dict[str, str]]:
+    # Una línea sin marca de tiempo válida se descarta aquí: bucket_key corta
+    # la cadena por posición y fallaría con ella.
+    parts = line.rstrip("\r\n").split(" | ")
+    if len(parts) < 5 or not TIMESTAMP_PATTERN.fullmatch(parts[0]):
+        return None
+    record = {"timestamp": parts[0]}
+    for part in parts[1:]:
+        key, separator, value = part.partition("=")
+        if separator:
+            record[key] = value
+    return record
+
+
+def iter_new_lines(path: str, offset: int) -> Iterator[Tuple[str, int]]:
+    # Devuelve (línea, offset posterior a la línea). Una línea final sin salto
+    # todavía se está escribiendo y se deja para la siguiente corrida.
+    with open(path, "rb") as stream:
+        stream.seek(offset)
+        pending = b""
+        position = offset
+        while True:
+            chunk = stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            pending += chunk
+            lines = pending.split(b"\n")
+            pending = lines.pop()
+            for raw in lines:
+                position += len(raw) + 1
+                yield raw.decode("utf-8", errors="replace"), position
+
+
+class TransactionAggregator:
+    def __init__(self, by, bucket="5m", max_buckets=2016, max_groups=1000, status_prefix=None):
+        unknown = [field for field in by if field not in GROUP_FIELDS]
+        if unknown:
+            raise ValueError(f"Campos de agrupación desconocidos: {', '.join(unknown)}")
+        if bucket not in BUCKET_MINUTES:
+            raise ValueError(f"Intervalo no soportado: {bucket}")
+        self.by = tuple(by)
+        self.bucket = bucket
+        self.max_buckets = max_buckets
+        self.max_groups = max_groups
+        self.status_prefix = status_prefix
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.lines_read = 0
+        self.lines_skipped = 0
+
+    def add(self, record: Dict[str, str]) -> None:
+        if self.status_prefix and not record.get("status", "").startswith(self.status_prefix):
+            return
+        bucket = bucket_key(record["timestamp"], BUCKET_MINUTES[self.bucket])
+        group = "|".join(record.get(field, "-") for field in self.by)
+
+        groups = self.counts.get(bucket)
+        if groups is None:
+            groups = self.counts[bucket] = {}
+            if len(self.counts) > self.max_buckets:
+                del self.counts[min(self.counts)]
+        if group not in groups and len(groups) >= self.max_groups:
+            group = OVERFLOW_GROUP
+        groups[group] = groups.get(group, 0) + 1
+
+    def consume(self, path: str, offset: int) -> int:
+        return self.consume_lines(iter_new_lines(path, offset), offset)
+
+    def consume_lines(self, lines, offset: int = 0) -> int:
+        for line, offset_after in lines:
+            record = parse_line(line)
+            if record is None:
+                self.lines_skipped += 1
+            else:
+                self.lines_read += 1
+                self.add(record)
+            offset = offset_after
+        return offset
+
+    def rows(self, top: Optional[int] = None):
+        for bucket in sorted(self.counts):
+            ranked = sorted(self.counts[bucket].items(), key=lambda item: (-item[1], item[0]))
+            for group, count in ranked[:top] if top else ranked:
+                yield bucket, group, count
+
+
+def default_state_path(log_path: str, by, bucket: str, status_prefix: Optional[str]) -> str:
+    name = f".analysis-{'-'.join(by)}-{bucket}{'-s' + status_prefix if status_prefix else ''}.json"
+    return os.path.join(os.path.dirname(os.path.abspath(log_path)), name)
+
+
+def load_state(state_path: str) -> Optional[Dict]:
+    try:
+        with open(state_path, encoding="utf-8") as stream:
+            state = json.load(stream)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("version") == STATE_VERSION else None
+
+
+def _same_file(identity, inode: Optional[int], head: Optional[str]) -> bool:
+    # Los estados e índices anteriores no guardan la huella; se compara solo el inodo.
+    found_inode, found_head = identity
+    return found_inode == inode and (head is None or found_head is None or found_head == head)
+
+
+def _source_identity(path: str, index: Optional[Dict]):
+    if index is not None:
+        return index.get("inode"), index.get("head")
+    try:
+        return os.stat(path).st_ino, read_head(path)
+    except FileNotFoundError:
+        index = read_index(path[: -len(".log")] + SEGMENT_SUFFIX)
+        return (index.get("inode"), index.get("head")) if index else (None, None)
+
+
+def _rotated_since(log_path: str, inode: int, head: Optional[str], segment_dir: Optional[str]):
+    # Segmentos (comprimidos o pendientes) desde el que contenía el archivo del
+    # estado (inclusive) en orden de rotación, o None si ya no aparece.
+    sources = SegmentedLog(log_path, segment_dir=segment_dir).sources()
+    for position, (path, index) in enumerate(sources):
+        if _same_file(_source_identity(path, index), inode, head):
+            return sources[position:]
+    return None
+
+
+def save_state(state_path: str, log_path: str, offset: int, aggregator: TransactionAggregator) -> None:
+    state = {
+        "version": STATE_VERSION,
+        "inode": os.stat(log_path).st_ino,
+        "head": read_head(log_path),
+        "offset": offset,
+        "counts": aggregator.counts,
+    }
+    temporary = f"{state_path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as stream:
+        json.dump(state, stream)
+    os.replace(temporary, state_path)
+
+
+def analyze(log_path, by, bucket="5m", state_path=None, reset=False, segment_dir=None, **options):
+    aggregator = TransactionAggregator(by, bucket, **options)
+    state_path = state_path or default_state_path(log_path, by, bucket, options.get("status_prefix"))
+    state = None if reset else load_state(state_path)
+
+    offset = 0
+    if state is not None:
+        stat = os.stat(log_path)
+        current = (stat.st_ino, read_head(log_path))
+        if _same_file(current, state.get("inode"), state.get("head")) and state.get("offset", 0) <= stat.st_size:
+            aggregator.counts = state.get("counts", {})
+            offset = state.get("offset", 0)
+        else:
+            # El archivo se rotó desde la última corrida: se termina de leer el
+            # segmento donde quedó el offset y los rotados después, y el archivo
+            # activo se lee desde el inicio.
+            rotated = _rotated_since(log_path, state.get("inode"), state.get("head"), segment_dir)
+            if rotated is not None:
+                aggregator.counts = state.get("counts", {})
+                for position, (path, index) in enumerate(rotated):
+                    from_offset = state.get("offset", 0) if position == 0 else 0
+                    aggregator.consume_lines(iter_source_lines(path, index, from_offset=from_offset))
+
+    offset = aggregator.consume(log_path, offset)
+    save_state(state_path, log_path, offset, aggregator)
+    return aggregator
+
+
+def _print_report(aggregator, top, output_format):
+    header = ("intervalo", "+".join(aggregator.by), "peticiones")
+    if output_format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(header)
+        writer.writerows(aggregator.rows(top))
+    elif output_format == "json":
+        json.dump([dict(zip(header, row)) for row in aggregator.rows(top)], sys.stdout, ensure_ascii=False)
+        sys.stdout.write("\n")
+    else:
+        for bucket, group, count in aggregator.rows(top):
+            print(f"{bucket:<16}  {count:>8}  {group}")
+    print(
+        f"líneas nuevas: {aggregator.lines_read} (descartadas {aggregator.lines_skipped})",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agrupa el log de transacciones por intervalos de tiempo.")
+    parser.add_argument("--log", default=LOG_FILE_PATH, help="Ruta del log (por defecto TRANSACTION_LOG_PATH)")
+    parser.add_argument("--by", default="endpoint,status", help=f"Campos separados por coma: {', '.join(GROUP_FIELDS)}")
+    parser.add_argument("--bucket", default="5m", choices=sorted(BUCKET_MINUTES))
+    parser.add_argument("--status", dest="status_prefix", help="Solo estados que empiezan así (p. ej. 5 o 429)")
+    parser.add_argument("--top", type=int, default=10, help="Grupos por intervalo en el reporte (0 = todos)")
+    parser.add_argument("--max-buckets", type=int, default=2016)
+    parser.add_argument("--max-groups", type=int, default=1000)
+    parser.add_argument("--state", help="Archivo de estado (offset y conteos acumulados)")
+    parser.add_argument("--reset", action="store_true", help="Ignora el estado y relee el log completo")
+    parser.add_argument("--format", default="table", choices=("table", "csv", "json"))
+    parser.add_argument("--segment-dir", default=os.environ.get("TRANSACTION_LOG_SEGMENT_DIR") or None)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.log):
+        print(f"No existe el log {args.log}", file=sys.stderr)
+        return 1
+    aggregator = analyze(
+        args.log,
+        [field.strip() for field in args.by.split(",") if field.strip()],
+        args.bucket,
+        state_path=args.state,
+        reset=args.reset,
+        segment_dir=args.segment_dir,
+        max_buckets=args.max_buckets,
+        max_groups=args.max_groups,
+        status_prefix=args.status_prefix,
+    )
+    _print_report(aggregator, args.top or None, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())